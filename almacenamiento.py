@@ -0,0 +1,683 @@
+import json
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from gspread.utils import rowcol_to_a1, a1_to_rowcol
+import analitica
+import historial_tipado
+
+# Encabezado por defecto de la hoja Historial (mismo orden que la tabla del Historial)
+ENCABEZADO_HISTORIAL = [
+    "Fecha", "Resp", "Cliente", "Modelo", "Tipo", "Material", "Color",
+    "Peso", "Tiempo", "Cant", "Diseño", "Total", "Unitario"
+]
+
+# Columnas de la hoja Inventario:
+# ID(1)|Fecha(2)|Marca(3)|Tipo(4)|Color(5)|Acabado(6)|Peso_In(7)|Peso_Act(8)|Precio(9)
+ENCABEZADO_INVENTARIO = [
+    "ID", "Fecha", "Marca", "Tipo", "Color", "Acabado",
+    "Peso_Inicial", "Peso_Actual", "Precio_Rollo"
+]
+
+# Se suben cuando cambia cómo se interpretan las filas (ej: qué material es cada una,
+# cómo se lee un importe): las bases con otra versión rearman el resumen / la copia tipada al abrir
+VERSION_RESUMEN = "3"
+VERSION_TIPADO = "2"
+
+
+def fila_como_texto(fila):
+    """La fila como la devuelve la API: todo texto y sin las celdas vacías del final"""
+    valores = [str(v) for v in fila]
+    while valores and valores[-1] == "":
+        valores.pop()
+    return valores
+
+
+def contiene_bloque(cola, filas):
+    """¿'filas' aparece entera, seguida y en orden, dentro de 'cola'? (comparadas como texto)"""
+    buscadas = [fila_como_texto(f) for f in filas]
+    cola = [fila_como_texto(f) for f in cola]
+    return any(cola[i:i + len(buscadas)] == buscadas for i in range(len(cola) - len(buscadas) + 1))
+
+
+def huella_filas(filas):
+    """Checksum de una lista de filas (se comparan como texto, igual que en la hoja)"""
+    h = hashlib.sha1()
+    for fila in filas:
+        h.update(json.dumps([str(v) for v in fila]).encode("utf-8"))
+    return h.hexdigest()
+
+
+class MotorAlmacenamiento:
+    """
+    Interfaz común de los motores de almacenamiento.
+    BackendGestor solo habla con estos métodos, así da igual si
+    los datos viven en SQLite o en Google Sheets.
+    """
+
+    def leer_inventario(self):
+        """Devuelve el inventario como lista de diccionarios (uno por rollo)"""
+        raise NotImplementedError
+
+    def agregar_rollo(self, fila):
+        """Agrega un rollo. 'fila' ya trae el ID en la posición 0"""
+        raise NotImplementedError
+
+    def descontar_peso(self, id_rollo, gramos):
+        """Resta gramos al Peso_Actual del rollo y devuelve el peso nuevo (None si no existe)"""
+        raise NotImplementedError
+
+    def actualizar_pesos(self, pesos):
+        """Pisa el Peso_Actual de varios rollos de una vez. 'pesos' = {id_rollo: nuevo_peso}"""
+        raise NotImplementedError
+
+    def leer_historial(self):
+        """Devuelve el historial como lista de listas, con el encabezado en la fila 0"""
+        raise NotImplementedError
+
+    def leer_historial_desde(self, desde, columnas):
+        """Filas de datos a partir de 'desde' (0 = primera debajo del encabezado), hasta la columna 'columnas'"""
+        raise NotImplementedError
+
+    def agregar_historial(self, filas):
+        """Agrega una o varias filas al final del historial"""
+        raise NotImplementedError
+
+    def historial_ya_tiene(self, filas, margen=20):
+        """True si las filas ya están, seguidas y en orden, entre las últimas del historial"""
+        raise NotImplementedError
+
+    def borrar_fila_historial(self, indice_lista, fila_esperada=None):
+        """
+        Borra la fila 'indice_lista' (0 = primera fila de datos, sin contar encabezado).
+        Con 'fila_esperada' solo borra si la fila sigue siendo esa (comparada como texto);
+        si no, devuelve False sin tocar nada.
+        """
+        raise NotImplementedError
+
+
+class MotorSQLite(MotorAlmacenamiento):
+    """
+    Motor local sobre SQLite. Es el almacén principal: lecturas y escrituras
+    en milisegundos y sin depender de la conexión.
+    """
+
+    def __init__(self, ruta_db):
+        self.ruta_db = ruta_db
+        # La conexión se comparte entre hilos, por eso el candado
+        self.lock = threading.RLock()
+        self.nivel = 0
+        self.conn = sqlite3.connect(ruta_db, check_same_thread=False)
+        self.crear_tablas()
+
+    def crear_tablas(self):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS inventario ("
+                "posicion INTEGER PRIMARY KEY, id TEXT, datos TEXT NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS historial ("
+                "posicion INTEGER PRIMARY KEY AUTOINCREMENT, datos TEXT NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT)"
+            )
+            # Altas y descuentos de stock hechos sin conexión, en orden: se suben a la
+            # Hoja 2 al reconectar (antes de bajar el inventario, que si no los pisaría)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS stock_pendiente ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, operacion TEXT, datos TEXT)"
+            )
+            # Resúmenes pre-agregados del historial (ver analitica.py)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS resumen ("
+                "dimension TEXT, clave TEXT, trabajos REAL, unidades REAL, total REAL, "
+                "gramos REAL, horas REAL, PRIMARY KEY (dimension, clave))"
+            )
+            # Copia tipada de cada fila (ver historial_tipado.py); al borrar del historial
+            # se borra sola, así nunca queda una fila tipada sin su original
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS historial_tipado (posicion INTEGER PRIMARY KEY, fecha TEXT, "
+                + ", ".join(f"{c} TEXT" for c in historial_tipado.COLUMNAS_TEXTO) + ", "
+                + ", ".join(f"{c} REAL" for c in historial_tipado.COLUMNAS_NUMERO) + ")"
+            )
+            self.conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS borrar_tipado AFTER DELETE ON historial BEGIN "
+                "DELETE FROM historial_tipado WHERE posicion = old.posicion; END"
+            )
+        # Bases de antes de los resúmenes / la copia tipada: se arman una única vez con lo que ya había
+        if self.leer_meta("resumen_listo") != VERSION_RESUMEN:
+            self.reconstruir_resumen()
+        if self.leer_meta("tipado_listo") != VERSION_TIPADO:
+            self.reconstruir_tipado()
+
+    @contextmanager
+    def transaccion(self):
+        """
+        Agrupa varias operaciones: si algo falla adentro (por ejemplo el espejo
+        en la nube) se deshace todo lo escrito en SQLite.
+        """
+        with self.lock:
+            # Las transacciones se pueden anidar: solo la más externa confirma o deshace
+            self.nivel += 1
+            try:
+                yield self
+            except:
+                self.nivel -= 1
+                if self.nivel == 0:
+                    self.conn.rollback()
+                raise
+            self.nivel -= 1
+            if self.nivel == 0:
+                self.conn.commit()
+
+    # --- INVENTARIO ---
+    def leer_inventario(self):
+        with self.lock:
+            cur = self.conn.execute("SELECT datos FROM inventario ORDER BY posicion")
+            return [json.loads(datos) for (datos,) in cur]
+
+    def agregar_rollo(self, fila):
+        registro = dict(zip(ENCABEZADO_INVENTARIO, fila))
+        with self.transaccion():
+            self.conn.execute(
+                "INSERT INTO inventario (id, datos) VALUES (?, ?)",
+                (str(registro.get("ID")), json.dumps(registro))
+            )
+
+    def descontar_peso(self, id_rollo, gramos):
+        with self.transaccion():
+            cur = self.conn.execute(
+                "SELECT posicion, datos FROM inventario WHERE id = ?", (str(id_rollo),)
+            )
+            encontrado = cur.fetchone()
+            if not encontrado:
+                return None
+            posicion, datos = encontrado
+            registro = json.loads(datos)
+            valor_actual = float(str(registro.get("Peso_Actual") or 0).replace(',', '.'))
+            nuevo_peso = int(valor_actual - float(gramos))
+            self.fijar_peso(posicion, registro, nuevo_peso)
+            return nuevo_peso
+
+    def actualizar_peso(self, id_rollo, nuevo_peso):
+        """Pisa el Peso_Actual con un valor ya calculado (por ejemplo, el que devolvió la nube)"""
+        with self.transaccion():
+            cur = self.conn.execute(
+                "SELECT posicion, datos FROM inventario WHERE id = ?", (str(id_rollo),)
+            )
+            encontrado = cur.fetchone()
+            if not encontrado:
+                return False
+            posicion, datos = encontrado
+            self.fijar_peso(posicion, json.loads(datos), nuevo_peso)
+            return True
+
+    def actualizar_pesos(self, pesos):
+        with self.transaccion():
+            # Igual que en la hoja: si falta algún ID no se toca ninguno
+            for id_rollo in pesos:
+                if not self.conn.execute("SELECT 1 FROM inventario WHERE id = ?", (str(id_rollo),)).fetchone():
+                    print(f"❌ No se encontró el ID {id_rollo} en el inventario local")
+                    return False
+            for id_rollo, peso in pesos.items():
+                self.actualizar_peso(id_rollo, peso)
+            return True
+
+    def fijar_peso(self, posicion, registro, nuevo_peso):
+        registro["Peso_Actual"] = nuevo_peso
+        self.conn.execute(
+            "UPDATE inventario SET datos = ? WHERE posicion = ?",
+            (json.dumps(registro), posicion)
+        )
+
+    def fusionar_inventario(self, registros):
+        """
+        Aplica una copia completa (la de Drive) tocando solo los rollos que cambiaron.
+        Compara el contenido de cada fila con lo guardado y devuelve la lista de IDs
+        modificados/nuevos, o None si cambió la estructura (altas intercaladas,
+        bajas, orden distinto) y hubo que reemplazar todo.
+        """
+        with self.transaccion():
+            cur = self.conn.execute("SELECT posicion, id, datos FROM inventario ORDER BY posicion")
+            locales = cur.fetchall()
+
+            ids_locales = [id_rollo for _, id_rollo, _ in locales]
+            ids_nuevos = [str(r.get("ID")) for r in registros]
+            mismo_orden = ids_nuevos[:len(ids_locales)] == ids_locales
+            if not mismo_orden or len(set(ids_nuevos)) != len(ids_nuevos):
+                self.reemplazar_inventario(registros)
+                return None
+
+            cambiados = []
+            for (posicion, id_rollo, datos), registro in zip(locales, registros):
+                nuevo = json.dumps(registro)
+                if nuevo != datos:
+                    self.conn.execute(
+                        "UPDATE inventario SET datos = ? WHERE posicion = ?", (nuevo, posicion)
+                    )
+                    cambiados.append(id_rollo)
+
+            # Rollos agregados al final de la hoja
+            for registro in registros[len(locales):]:
+                self.agregar_registro(registro)
+                cambiados.append(str(registro.get("ID")))
+            return cambiados
+
+    def agregar_registro(self, registro):
+        self.conn.execute(
+            "INSERT INTO inventario (id, datos) VALUES (?, ?)",
+            (str(registro.get("ID")), json.dumps(registro))
+        )
+
+    def anotar_stock_pendiente(self, operacion, datos):
+        """operacion = "alta" (datos = fila con ID) o "descuento" (datos = {"id", "gramos"})"""
+        with self.transaccion():
+            self.conn.execute(
+                "INSERT INTO stock_pendiente (operacion, datos) VALUES (?, ?)",
+                (operacion, json.dumps(datos))
+            )
+
+    def leer_stock_pendiente(self):
+        """[(seq, operacion, datos), ...] en el orden en que se hicieron"""
+        with self.lock:
+            cur = self.conn.execute("SELECT seq, operacion, datos FROM stock_pendiente ORDER BY seq")
+            return [(seq, operacion, json.loads(datos)) for seq, operacion, datos in cur]
+
+    def confirmar_stock_pendiente(self, seqs):
+        """Quita del pendiente las operaciones que ya llegaron a la nube"""
+        with self.transaccion():
+            self.conn.executemany("DELETE FROM stock_pendiente WHERE seq = ?", [(s,) for s in seqs])
+
+    def reemplazar_inventario(self, registros):
+        """Pisa el inventario local con una copia completa (por ejemplo, la de Drive)"""
+        with self.transaccion():
+            self.conn.execute("DELETE FROM inventario")
+            self.conn.executemany(
+                "INSERT INTO inventario (id, datos) VALUES (?, ?)",
+                [(str(r.get("ID")), json.dumps(r)) for r in registros]
+            )
+
+    # --- HISTORIAL ---
+    def leer_historial(self):
+        with self.lock:
+            encabezado = self.leer_encabezado_historial()
+            cur = self.conn.execute("SELECT datos FROM historial ORDER BY posicion")
+            return [encabezado] + [json.loads(datos) for (datos,) in cur]
+
+    def leer_encabezado_historial(self):
+        encabezado = self.leer_meta("encabezado_historial")
+        return json.loads(encabezado) if encabezado else list(ENCABEZADO_HISTORIAL)
+
+    def contar_historial(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM historial").fetchone()[0]
+
+    def leer_historial_pagina(self, desde, cantidad):
+        """Solo las filas de datos [desde, desde + cantidad), sin encabezado"""
+        with self.lock:
+            cur = self.conn.execute(
+                "SELECT datos FROM historial ORDER BY posicion LIMIT ? OFFSET ?", (cantidad, desde)
+            )
+            return [json.loads(datos) for (datos,) in cur]
+
+    def leer_historial_desde(self, desde, columnas):
+        return [fila[:columnas] for fila in self.leer_historial_pagina(desde, -1)]
+
+    def leer_historial_posiciones(self, posiciones):
+        """{posicion: fila} de las filas pedidas (búsqueda directa por clave, sin recorrer la tabla)"""
+        posiciones = [int(p) for p in posiciones]
+        filas = {}
+        with self.lock:
+            # SQLite acepta hasta 999 parámetros por consulta
+            for i in range(0, len(posiciones), 900):
+                bloque = posiciones[i:i + 900]
+                cur = self.conn.execute(
+                    "SELECT posicion, datos FROM historial WHERE posicion IN (%s)" % ", ".join("?" * len(bloque)),
+                    bloque
+                )
+                filas.update((p, json.loads(datos)) for p, datos in cur)
+        return filas
+
+    def agregar_historial(self, filas):
+        with self.transaccion():
+            self.conn.executemany(
+                "INSERT INTO historial (datos) VALUES (?)",
+                [(json.dumps(f),) for f in filas]
+            )
+            self.sumar_resumen(filas)
+            # Dentro de la transacción las filas recién agregadas son las últimas posiciones
+            cur = self.conn.execute(
+                "SELECT posicion FROM historial ORDER BY posicion DESC LIMIT ?", (len(filas),)
+            )
+            posiciones = [p for (p,) in cur][::-1]
+            self.agregar_tipado(zip(posiciones, filas))
+
+    def historial_ya_tiene(self, filas, margen=20):
+        if not filas:
+            return True
+        with self.lock:
+            cur = self.conn.execute(
+                "SELECT datos FROM historial ORDER BY posicion DESC LIMIT ?", (len(filas) + margen,)
+            )
+            cola = [json.loads(datos) for (datos,) in cur][::-1]
+        return contiene_bloque(cola, filas)
+
+    def indice_historial(self, posicion):
+        """Índice en la lista (0 = primera fila de datos) de la fila con esa posición, o None"""
+        with self.lock:
+            if not self.conn.execute("SELECT 1 FROM historial WHERE posicion = ?", (int(posicion),)).fetchone():
+                return None
+            (anteriores,) = self.conn.execute(
+                "SELECT COUNT(*) FROM historial WHERE posicion < ?", (int(posicion),)
+            ).fetchone()
+            return anteriores
+
+    def borrar_fila_historial(self, indice_lista, fila_esperada=None):
+        with self.transaccion():
+            cur = self.conn.execute(
+                "SELECT posicion, datos FROM historial ORDER BY posicion LIMIT 1 OFFSET ?",
+                (indice_lista,)
+            )
+            encontrado = cur.fetchone()
+            if not encontrado:
+                return False
+            posicion, datos = encontrado
+            if fila_esperada is not None and fila_como_texto(json.loads(datos)) != fila_como_texto(fila_esperada):
+                return False
+            self.restar_filas_resumen("WHERE posicion = ?", (posicion,))
+            self.conn.execute("DELETE FROM historial WHERE posicion = ?", (posicion,))
+            cant_nube = self.filas_nube()
+            if indice_lista < cant_nube:
+                self.guardar_meta("filas_nube", str(cant_nube - 1))
+            return True
+
+    def reemplazar_historial(self, valores):
+        """Pisa el historial local con 'valores' (lista de listas con encabezado, como get_all_values)"""
+        with self.transaccion():
+            self.conn.execute("DELETE FROM historial")
+            self.conn.execute("DELETE FROM resumen")
+            self.guardar_meta("filas_nube", "0")
+            if not valores:
+                return
+            self.guardar_meta("encabezado_historial", json.dumps(valores[0]))
+            self.anexar_historial_nube(valores[1:])
+
+    # El historial local es una copia de la Hoja 1 (las primeras 'filas_nube' filas)
+    # seguida de las filas guardadas acá que todavía no se releyeron de la nube.
+    def filas_nube(self):
+        return int(self.leer_meta("filas_nube") or 0)
+
+    def anexar_historial_nube(self, filas_nuevas, pendientes=()):
+        """
+        Agrega al final de la copia de la nube las filas nuevas de la hoja (la 'cola' de la hoja).
+        Las filas solo locales se descartan y se vuelven a poner al final las 'pendientes'.
+        """
+        with self.transaccion():
+            cant_nube = self.filas_nube()
+            cola = ("WHERE posicion IN "
+                    "(SELECT posicion FROM historial ORDER BY posicion LIMIT -1 OFFSET ?)")
+            self.restar_filas_resumen(cola, (cant_nube,))
+            self.conn.execute("DELETE FROM historial " + cola, (cant_nube,))
+            self.agregar_historial(filas_nuevas)
+            self.guardar_meta("filas_nube", str(cant_nube + len(filas_nuevas)))
+            self.agregar_historial(list(pendientes))
+
+    def huella_historial(self):
+        """Checksum de la parte del historial que vino de la nube"""
+        with self.lock:
+            cur = self.conn.execute(
+                "SELECT datos FROM historial ORDER BY posicion LIMIT ?", (self.filas_nube(),)
+            )
+            return huella_filas([json.loads(datos) for (datos,) in cur])
+
+    # --- RESÚMENES ---
+    # Se actualizan dentro de la misma transacción que la fila que entra o sale,
+    # así nunca quedan desfasados del historial.
+    def sumar_resumen(self, filas, signo=1):
+        aportes = analitica.aportes(filas, signo)
+        if not aportes:
+            return
+        with self.transaccion():
+            self.conn.executemany(
+                "INSERT INTO resumen VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (dimension, clave) DO UPDATE SET "
+                "trabajos = trabajos + excluded.trabajos, unidades = unidades + excluded.unidades, "
+                "total = total + excluded.total, gramos = gramos + excluded.gramos, "
+                "horas = horas + excluded.horas",
+                aportes
+            )
+            # Grupos que quedaron sin trabajos (se borraron todas sus filas)
+            self.conn.execute("DELETE FROM resumen WHERE trabajos < 0.5")
+
+    def restar_filas_resumen(self, condicion, parametros):
+        """Descuenta del resumen las filas del historial que cumplen 'condicion' (antes de borrarlas)"""
+        cur = self.conn.execute("SELECT datos FROM historial " + condicion, parametros)
+        self.sumar_resumen([json.loads(datos) for (datos,) in cur], signo=-1)
+
+    def reconstruir_resumen(self):
+        """Arma el resumen desde cero con todo el historial (solo la primera vez)"""
+        with self.transaccion():
+            self.conn.execute("DELETE FROM resumen")
+            cur = self.conn.execute("SELECT datos FROM historial")
+            self.sumar_resumen([json.loads(datos) for (datos,) in cur])
+            self.guardar_meta("resumen_listo", VERSION_RESUMEN)
+
+    def leer_resumen(self, dimension, desde=None, hasta=None):
+        """
+        Los grupos de una dimensión (lista de dicts, ordenados por clave).
+        'desde' / 'hasta' filtran por clave, inclusive (fechas y meses se ordenan como texto).
+        """
+        consulta = "SELECT clave, " + ", ".join(analitica.MEDIDAS) + " FROM resumen WHERE dimension = ?"
+        parametros = [dimension]
+        if desde:
+            consulta += " AND clave >= ?"
+            parametros.append(desde)
+        if hasta:
+            # Con las dimensiones cruzadas ("2026-10|PETG") el mes 'hasta' entra completo
+            consulta += " AND clave <= ?"
+            parametros.append(hasta + "\uffff")
+        with self.lock:
+            cur = self.conn.execute(consulta + " ORDER BY clave", parametros)
+            return [dict(zip(("clave",) + analitica.MEDIDAS, r)) for r in cur]
+
+    # --- HISTORIAL TIPADO ---
+    def agregar_tipado(self, posiciones_y_filas):
+        marcas = ", ".join("?" * (len(historial_tipado.COLUMNAS) + 1))
+        with self.transaccion():
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO historial_tipado VALUES ({marcas})",
+                [(p, *historial_tipado.tipar(f)) for p, f in posiciones_y_filas]
+            )
+
+    def reconstruir_tipado(self):
+        """Tipa todo el historial desde cero (solo la primera vez)"""
+        with self.transaccion():
+            self.conn.execute("DELETE FROM historial_tipado")
+            cur = self.conn.execute("SELECT posicion, datos FROM historial")
+            self.agregar_tipado((p, json.loads(datos)) for p, datos in cur.fetchall())
+            self.guardar_meta("tipado_listo", VERSION_TIPADO)
+
+    def leer_historial_tipado(self, despues_de=0):
+        """Filas tipadas (posicion, fecha, textos..., números...) en el orden del historial"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT * FROM historial_tipado WHERE posicion > ? ORDER BY posicion", (despues_de,)
+            ).fetchall()
+
+    def contar_tipado_hasta(self, posicion):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM historial_tipado WHERE posicion <= ?", (posicion,)
+            ).fetchone()[0]
+
+    # --- META ---
+    def leer_meta(self, clave):
+        with self.lock:
+            cur = self.conn.execute("SELECT valor FROM meta WHERE clave = ?", (clave,))
+            encontrado = cur.fetchone()
+            return encontrado[0] if encontrado else None
+
+    def guardar_meta(self, clave, valor):
+        with self.transaccion():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (clave, valor) VALUES (?, ?)", (clave, valor)
+            )
+
+
+class MotorSheets(MotorAlmacenamiento):
+    """
+    Adaptador de Google Sheets. Ya no es el camino principal:
+    funciona como espejo en la nube del almacén local.
+    Hoja 1 = Historial, Hoja 2 = Inventario.
+
+    Guarda un índice ID -> fila de la hoja y encabezado -> columna, armado al
+    descargar el inventario, para escribir sin tener que buscar (find) en la nube.
+
+    Si se le pasa un planificador (PlanificadorSheets), todas las llamadas
+    remotas pasan por él (cuota, reintentos y prioridades).
+    """
+
+    def __init__(self, sheet_historial, sheet_inventario=None, doc=None, planificador=None):
+        self.doc = doc
+        self.sheet_historial = sheet_historial
+        self.sheet_inventario = sheet_inventario
+        self.planificador = planificador
+        self.fila_por_id = {}
+        self.columna_por_encabezado = {
+            nombre: i + 1 for i, nombre in enumerate(ENCABEZADO_INVENTARIO)
+        }
+
+    def llamar(self, funcion, *args, clave=None, escritura=False, idempotente=True, **kwargs):
+        """Hace la llamada a Google (a través del planificador si hay uno)"""
+        if self.planificador is None:
+            return funcion(*args, **kwargs)
+        return self.planificador.ejecutar(funcion, *args, clave=clave, escritura=escritura,
+                                          idempotente=idempotente, **kwargs)
+
+    def version_remota(self):
+        """
+        Marca de última modificación del archivo (consulta liviana a Drive).
+        Si no se puede obtener devuelve None y hay que asumir que cambió.
+        OJO: es del archivo entero, no de la Hoja 2. Cualquier escritura en el historial
+        (por ejemplo cada subida de la cola) también la cambia, así que con ventas seguidas
+        el inventario se vuelve a bajar aunque no haya cambiado. Sirve para ahorrar la
+        descarga en los ratos sin movimiento, no como versión del inventario.
+        """
+        if self.doc is None:
+            return None
+        try:
+            return self.llamar(self.doc.get_lastUpdateTime, clave="version")
+        except Exception:
+            return None
+
+    # --- INVENTARIO ---
+    def leer_inventario(self):
+        if not self.sheet_inventario:
+            return []
+        registros = self.llamar(self.sheet_inventario.get_all_records, clave="inventario")
+        self.indexar_inventario(registros)
+        return registros
+
+    def indexar_inventario(self, registros):
+        """Arma los índices a partir de get_all_records (la fila 1 de la hoja es el encabezado)"""
+        if registros:
+            self.columna_por_encabezado = {nombre: i + 1 for i, nombre in enumerate(registros[0])}
+        self.fila_por_id = {str(r.get("ID")): i + 2 for i, r in enumerate(registros)}
+
+    def agregar_rollo(self, fila):
+        respuesta = self.llamar(self.sheet_inventario.append_row, fila, escritura=True, idempotente=False)
+
+        # La respuesta dice en qué rango quedó la fila (ej: "Inventario!A12:I12")
+        try:
+            rango = respuesta["updates"]["updatedRange"].split("!")[-1].split(":")[0]
+            nueva_fila, _ = a1_to_rowcol(rango)
+        except Exception:
+            nueva_fila = max(self.fila_por_id.values(), default=1) + 1
+        self.fila_por_id[str(fila[0])] = nueva_fila
+
+    def buscar_fila(self, id_rollo):
+        """Fila de la hoja para un ID. Solo si no está en el índice se busca en la nube"""
+        fila = self.fila_por_id.get(str(id_rollo))
+        if fila is None:
+            celda_id = self.llamar(self.sheet_inventario.find, str(id_rollo), clave=("find", str(id_rollo)))
+            if not celda_id:
+                return None
+            fila = self.fila_por_id[str(id_rollo)] = celda_id.row
+        return fila
+
+    def descontar_peso(self, id_rollo, gramos):
+        fila = self.buscar_fila(id_rollo)
+        if fila is None:
+            return None
+
+        col_peso_actual = self.columna_por_encabezado["Peso_Actual"]
+        valor_actual_raw = self.llamar(self.sheet_inventario.cell, fila, col_peso_actual).value
+        valor_actual = float(valor_actual_raw) if valor_actual_raw else 0
+        nuevo_peso = int(valor_actual - float(gramos))
+
+        self.actualizar_pesos({id_rollo: nuevo_peso})
+        return nuevo_peso
+
+    def actualizar_pesos(self, pesos):
+        """Una sola llamada (batch_update) para todos los rollos, sin leer la hoja antes"""
+        col_peso_actual = self.columna_por_encabezado["Peso_Actual"]
+        cambios = []
+        for id_rollo, nuevo_peso in pesos.items():
+            fila = self.buscar_fila(id_rollo)
+            if fila is None:
+                print(f"❌ No se encontró el ID {id_rollo} en Drive")
+                return False
+            cambios.append({"range": rowcol_to_a1(fila, col_peso_actual), "values": [[nuevo_peso]]})
+
+        if cambios:
+            self.llamar(self.sheet_inventario.batch_update, cambios, escritura=True)
+        return True
+
+    # --- HISTORIAL ---
+    def leer_historial(self):
+        return self.llamar(self.sheet_historial.get_all_values, clave="historial")
+
+    def leer_historial_desde(self, desde, columnas):
+        """
+        Solo las filas de datos a partir de 'desde' (0 = primera fila debajo del encabezado).
+        Es una sola llamada y trae únicamente lo nuevo.
+        """
+        ultima_col = rowcol_to_a1(1, columnas).rstrip("0123456789")
+        rango = f"A{desde + 2}:{ultima_col}"
+        filas = list(self.llamar(self.sheet_historial.get_values, rango, clave=("historial", rango)))
+        # Si no hay nada nuevo la API puede devolver [[]]
+        while filas and not any(filas[-1]):
+            filas.pop()
+        return filas
+
+    def agregar_historial(self, filas):
+        self.llamar(self.sheet_historial.append_rows, filas, escritura=True, idempotente=False)
+
+    def historial_ya_tiene(self, filas, margen=20):
+        """
+        ¿Las filas ya están subidas? Busca el bloque entero, seguido y en orden, entre las
+        últimas filas de la hoja (con 'margen' por si otra PC agregó después).
+        Sirve para saber si un append_rows que falló por un corte llegó a aplicarse.
+        """
+        if not filas:
+            return True
+        total = len(self.llamar(self.sheet_historial.col_values, 1))
+        desde = max(2, total - len(filas) - margen + 1)
+        ultima_col = rowcol_to_a1(1, max(len(f) for f in filas)).rstrip("0123456789")
+        cola = self.llamar(self.sheet_historial.get_values, f"A{desde}:{ultima_col}{total}")
+        return contiene_bloque(cola, filas)
+
+    def borrar_fila_historial(self, indice_lista, fila_esperada=None):
+        # Sumamos 2: +1 por ser base-1 (Sheets) y +1 por el encabezado
+        fila = indice_lista + 2
+        if fila_esperada is not None:
+            # Se lee justo antes de borrar: si otra PC borró o agregó en el medio, la fila es otra
+            ultima_col = rowcol_to_a1(1, max(len(fila_esperada), 1)).rstrip("0123456789")
+            actual = self.llamar(self.sheet_historial.get_values, f"A{fila}:{ultima_col}{fila}")
+            if not actual or fila_como_texto(actual[0]) != fila_como_texto(fila_esperada):
+                return False
+        self.llamar(self.sheet_historial.delete_rows, fila, escritura=True, idempotente=False)
+        return True
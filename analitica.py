@@ -0,0 +1,117 @@
+"""
+Resúmenes del Historial: ventas por día / mes, cliente, material y tipo de trabajo.
+Se guardan pre-agregados: cada fila que entra al historial suma en sus grupos
+(y cada fila que se borra resta), así consultar cuesta lo mismo con 100 filas
+que con 100.000 y nunca hace falta recorrer el historial completo.
+"""
+from datetime import datetime
+
+from modelos import nombre_material, numero, parsear_tiempo
+from historial_tipado import fecha_iso, importe
+
+# Grupos que se mantienen. Los "mes_*" cruzan el mes con cliente / material / tipo,
+# para responder cosas como "gramos de PETG este trimestre" o "mejores clientes del año".
+DIMENSIONES = ("dia", "mes", "cliente", "material", "tipo", "mes_cliente", "mes_material", "mes_tipo")
+CRUZADAS = ("cliente", "material", "tipo")
+
+# Lo que se acumula en cada grupo (mismo orden que las columnas de la tabla 'resumen')
+MEDIDAS = ("trabajos", "unidades", "total", "gramos", "horas")
+
+SIN_FECHA = "Sin fecha"
+SEPARADOR = "|"  # entre el mes y el cliente / material en las dimensiones cruzadas
+
+
+def tipo_trabajo(valor):
+    """Las ventas se guardaron como "Venta Directa" (escritorio) o "Directa" (web)"""
+    texto = str(valor or "").strip()
+    return "Venta Directa" if "directa" in texto.lower() else (texto or "Otro")
+
+
+def tipo_material(valor):
+    """'Grilon3 PETG - Negro' -> 'PETG'. Las ventas directas no tienen material ('-')"""
+    nombre = nombre_material(valor)
+    if nombre:
+        return nombre
+    return "Otro" if str(valor or "").strip(" -") else "-"
+
+
+def claves(fila):
+    """{dimension: clave} de una fila del historial"""
+    fila = list(fila) + [""] * (13 - len(fila))
+    dia = fecha_iso(fila[0]) or SIN_FECHA
+    mes = dia[:7] if dia != SIN_FECHA else SIN_FECHA
+    cliente = str(fila[2]).strip() or "Sin nombre"
+    material = tipo_material(fila[5])
+    tipo = tipo_trabajo(fila[4])
+    return {
+        "dia": dia,
+        "mes": mes,
+        "cliente": cliente,
+        "material": material,
+        "tipo": tipo,
+        "mes_cliente": mes + SEPARADOR + cliente,
+        "mes_material": mes + SEPARADOR + material,
+        "mes_tipo": mes + SEPARADOR + tipo,
+    }
+
+
+def medidas(fila):
+    """(trabajos, unidades, total, gramos, horas) con los que aporta la fila"""
+    fila = list(fila) + [""] * (13 - len(fila))
+    unidades = max(1, int(numero(fila[9], 1)))
+    return (1, unidades, importe(fila[11]), numero(fila[7]) * unidades, parsear_tiempo(fila[8]) * unidades)
+
+
+def aportes(filas, signo=1):
+    """
+    Lo que suman (signo=1) o restan (signo=-1) las filas, ya agrupado:
+    lista de (dimension, clave, trabajos, unidades, total, gramos, horas)
+    """
+    grupos = {}
+    for fila in filas:
+        valores = medidas(fila)
+        for dimension, clave in claves(fila).items():
+            acumulado = grupos.setdefault((dimension, clave), [0.0] * len(MEDIDAS))
+            for i, v in enumerate(valores):
+                acumulado[i] += signo * v
+    return [(d, c, *valores) for (d, c), valores in grupos.items()]
+
+
+def combinar(filas_resumen, desde=None, hasta=None):
+    """
+    Suma las filas de una dimensión cruzada ("mes_cliente", "mes_material", "mes_tipo")
+    de los meses entre 'desde' y 'hasta' ('2026-07', inclusive) y las agrupa
+    por cliente / material / tipo. Devuelve una lista de dicts, la de más total primero.
+    """
+    grupos = {}
+    for r in filas_resumen:
+        mes, _, clave = r["clave"].partition(SEPARADOR)
+        if (desde and mes < desde) or (hasta and mes > hasta):
+            continue
+        acumulado = grupos.setdefault(clave, dict.fromkeys(MEDIDAS, 0.0))
+        for m in MEDIDAS:
+            acumulado[m] += r[m]
+    return sorted(({"clave": c, **v} for c, v in grupos.items()), key=lambda r: -r["total"])
+
+
+def totales(filas_resumen):
+    """Suma de todas las filas de una dimensión (ej: el total del período)"""
+    resultado = dict.fromkeys(MEDIDAS, 0.0)
+    for r in filas_resumen:
+        for m in MEDIDAS:
+            resultado[m] += r[m]
+    return resultado
+
+
+def meses_del_periodo(periodo, hoy=None):
+    """(desde, hasta) en 'AAAA-MM' para "mes", "trimestre", "año" o "todo" (None, None)"""
+    hoy = hoy or datetime.now()
+    hasta = hoy.strftime("%Y-%m")
+    if periodo == "mes":
+        return hasta, hasta
+    if periodo == "trimestre":
+        inicio = (hoy.month - 1) // 3 * 3 + 1
+        return f"{hoy.year}-{inicio:02d}", hasta
+    if periodo == "año":
+        return f"{hoy.year}-01", hasta
+    return None, None
@@ -0,0 +1,141 @@
+"""
+Búsqueda en el historial mientras se escribe ("juan llav" -> los llaveros de Juan Pérez).
+IndiceHistorial se arma sobre la TablaHistorial y no recorre filas de texto al buscar:
+- Un árbol de prefijos (trie) con las palabras de cliente, modelo, material, tipo y color.
+  Cada nodo guarda qué valores distintos (códigos de categoría) tienen una palabra que
+  empieza así: buscar "llav" es bajar 4 letras y leer el nodo.
+- Fechas y totales ordenados de antemano: un rango de fechas o de importes es un
+  searchsorted, no una comparación fila por fila.
+Cuando se agregan filas al final solo se indexan los valores nuevos.
+"""
+import re
+import unicodedata
+
+from historial_tipado import requiere_numpy, HAS_NUMPY
+
+if HAS_NUMPY:
+    import numpy as np
+
+CAMPOS = ("cliente", "modelo", "material", "tipo", "color")
+FIN = ""  # Clave del nodo donde van los valores que pasan por ese prefijo (ninguna letra es "")
+
+
+def palabras(texto):
+    """'Llavero Diseño-Único' -> ['llavero', 'diseno', 'unico'] (minúsculas, sin tildes)"""
+    texto = unicodedata.normalize("NFKD", str(texto or "").lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.findall(r"\w+", texto)
+
+
+class IndiceHistorial:
+    """
+    Índice de búsqueda sobre una TablaHistorial (ver obtener_indice_historial en el backend).
+    buscar() devuelve una máscara de filas, como las de TablaHistorial.es / entre_fechas.
+    """
+
+    def __init__(self, tabla):
+        requiere_numpy()
+        self.raiz = {}
+        self.indexadas = {campo: np.zeros(0, dtype=object) for campo in CAMPOS}  # categorías ya en el trie
+        self.tabla = None
+        self.fechas = (np.zeros(0, dtype="datetime64[D]"), np.zeros(0, dtype=np.int64))  # (ordenadas, fila de cada una)
+        self.totales = (np.zeros(0, dtype=np.float64), np.zeros(0, dtype=np.int64))
+        self.extender(tabla)
+
+    # --- ARMADO ---
+    def actualizar(self, tabla):
+        """
+        El índice para 'tabla': este mismo extendido si la tabla es la anterior con filas
+        agregadas al final (TablaHistorial.con_filas), o uno nuevo si se rearmó.
+        """
+        if tabla is self.tabla:
+            return self
+        if len(tabla) >= len(self.tabla) and np.array_equal(tabla.posicion[:len(self.tabla)], self.tabla.posicion):
+            if all(np.array_equal(tabla.categorias[c][:len(self.indexadas[c])], self.indexadas[c]) for c in CAMPOS):
+                self.extender(tabla)
+                return self
+        return IndiceHistorial(tabla)
+
+    def extender(self, tabla):
+        """Indexa las categorías y filas que la tabla tiene de más respecto de la última vez"""
+        anteriores = 0 if self.tabla is None else len(self.tabla)
+        # Primero el trie: quien esté buscando con la tabla anterior ignora los códigos nuevos
+        for campo in CAMPOS:
+            categorias = tabla.categorias[campo]
+            for codigo in range(len(self.indexadas[campo]), len(categorias)):
+                self.indexar(campo, codigo, categorias[codigo])
+            self.indexadas[campo] = categorias
+        self.fechas = self.mezclar(self.fechas, tabla.fecha[anteriores:], anteriores)
+        self.totales = self.mezclar(self.totales, tabla.total[anteriores:], anteriores)
+        self.tabla = tabla
+
+    def indexar(self, campo, codigo, valor):
+        # Un mismo prefijo puede salir de dos palabras del valor: se agrega una sola vez
+        prefijos = {p[:i] for p in palabras(valor) for i in range(1, len(p) + 1)}
+        for prefijo in prefijos:
+            nodo = self.raiz
+            for letra in prefijo:
+                nodo = nodo.setdefault(letra, {})
+            nodo.setdefault(FIN, {}).setdefault(campo, []).append(codigo)
+
+    @staticmethod
+    def mezclar(ordenado, nuevos, desde):
+        """Suma valores nuevos (filas desde 'desde') a un (ordenadas, filas) sin reordenar todo"""
+        claves, filas = ordenado
+        if not len(nuevos):
+            return ordenado
+        orden = np.argsort(nuevos, kind="stable")
+        lugares = np.searchsorted(claves, nuevos[orden], side="right")
+        return np.insert(claves, lugares, nuevos[orden]), np.insert(filas, lugares, orden + desde)
+
+    # --- CONSULTA ---
+    def buscar(self, texto="", desde=None, hasta=None, minimo=None, maximo=None):
+        """
+        Filas que tienen todas las palabras de 'texto' (cada una como comienzo de alguna
+        palabra de cliente, modelo, material, tipo o color), con fecha entre 'desde' y
+        'hasta' ('2026-10-01', inclusive) y total entre 'minimo' y 'maximo'.
+        """
+        tabla = self.tabla  # La tabla de esta consulta (el índice puede extenderse mientras tanto)
+        mascara = np.ones(len(tabla), dtype=bool)
+        for palabra in palabras(texto):
+            mascara &= self.mascara_prefijo(tabla, palabra)
+        if desde or hasta:
+            mascara &= self.mascara_rango(self.fechas, len(tabla), self.dia(desde), self.dia(hasta))
+        if minimo is not None or maximo is not None:
+            mascara &= self.mascara_rango(self.totales, len(tabla), minimo, maximo)
+        return mascara
+
+    @staticmethod
+    def dia(fecha):
+        return np.datetime64(fecha, "D") if fecha else None
+
+    def mascara_prefijo(self, tabla, prefijo):
+        nodo = self.raiz
+        for letra in prefijo:
+            nodo = nodo.get(letra)
+            if nodo is None:
+                return np.zeros(len(tabla), dtype=bool)
+        mascara = np.zeros(len(tabla), dtype=bool)
+        for campo, codigos in nodo.get(FIN, {}).items():
+            # Qué valores distintos coinciden -> qué filas (una indexación, sin comparar textos)
+            coinciden = np.zeros(len(tabla.categorias[campo]), dtype=bool)
+            codigos = np.array(codigos, dtype=np.int64)
+            coinciden[codigos[codigos < len(coinciden)]] = True
+            mascara |= coinciden[tabla.codigos[campo]]
+        return mascara
+
+    @staticmethod
+    def mascara_rango(ordenado, cantidad, minimo, maximo):
+        """Filas con clave entre minimo y maximo (NaT / NaN quedan fuera: van al final del orden)"""
+        claves, filas = ordenado
+        desde = 0 if minimo is None else np.searchsorted(claves, minimo, side="left")
+        if maximo is None:
+            # Sin tope igual se cortan los vacíos del final
+            vacias = np.isnat(claves) if claves.dtype.kind == "M" else np.isnan(claves)
+            hasta = len(claves) - int(np.count_nonzero(vacias))
+        else:
+            hasta = np.searchsorted(claves, maximo, side="right")
+        elegidas = filas[desde:hasta]
+        mascara = np.zeros(cantidad, dtype=bool)
+        mascara[elegidas[elegidas < cantidad]] = True
+        return mascara
@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+
+class CacheTTL:
+    """
+    Cache en memoria con vencimiento (TTL).
+    - Dentro del TTL devuelve lo guardado, sin tocar disco ni red.
+    - Vencido devuelve lo guardado igual y lo recarga en segundo plano
+      (stale-while-revalidate), así la pantalla nunca espera.
+    - Si la recarga falla se sigue sirviendo lo último que se tuvo (sin conexión).
+    - Con max_entradas, al pasarse se descarta la entrada menos usada (LRU).
+    ttl=None = no vence nunca, solo se borra con invalidar().
+    contexto_fondo: context manager opcional que envuelve las recargas en segundo
+    plano (ej: PlanificadorSheets.de_fondo para darles prioridad baja).
+    reloj: de dónde sale la hora (time.time; en las pruebas, uno que se adelanta a mano).
+    """
+
+    def __init__(self, ttl=None, max_entradas=None, en_segundo_plano=True, contexto_fondo=None, reloj=time.time):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.en_segundo_plano = en_segundo_plano
+        self.contexto_fondo = contexto_fondo
+        self.reloj = reloj
+
+        self.datos = OrderedDict()  # clave -> (valor, guardado_en), la más usada al final
+        self.lock = threading.Lock()
+        self.recargando = set()
+
+    def vencido(self, guardado_en):
+        return self.ttl is not None and self.reloj() - guardado_en > self.ttl
+
+    def vigente(self, clave):
+        """True si 'clave' está guardada y dentro del TTL (obtener() la devolvería sin cargar nada)"""
+        with self.lock:
+            entrada = self.datos.get(clave)
+            return entrada is not None and not self.vencido(entrada[1])
+
+    def obtener(self, clave, cargar):
+        """Devuelve el valor de 'clave'; si no está, lo carga con cargar()"""
+        with self.lock:
+            entrada = self.datos.get(clave)
+            if entrada is not None:
+                self.datos.move_to_end(clave)
+                valor, guardado_en = entrada
+                if not self.vencido(guardado_en):
+                    return valor
+                if self.en_segundo_plano:
+                    if clave not in self.recargando:
+                        self.recargando.add(clave)
+                        threading.Thread(
+                            target=self.recargar, args=(clave, cargar), daemon=True
+                        ).start()
+                    return valor
+
+        # No hay nada guardado (o la recarga es en primer plano): se carga ahora
+        try:
+            valor = cargar()
+        except Exception as e:
+            if entrada is not None:
+                print(f"⚠️ No se pudo refrescar '{clave}', se usa la copia anterior: {e}")
+                return entrada[0]
+            raise
+        self.poner(clave, valor)
+        return valor
+
+    def recargar(self, clave, cargar):
+        try:
+            if self.contexto_fondo:
+                with self.contexto_fondo():
+                    valor = cargar()
+            else:
+                valor = cargar()
+            self.poner(clave, valor)
+        except Exception as e:
+            print(f"⚠️ No se pudo refrescar '{clave}': {e}")
+        finally:
+            with self.lock:
+                self.recargando.discard(clave)
+
+    def poner(self, clave, valor):
+        with self.lock:
+            self.datos[clave] = (valor, self.reloj())
+            self.datos.move_to_end(clave)
+            if self.max_entradas:
+                while len(self.datos) > self.max_entradas:
+                    self.datos.popitem(last=False)
+
+    def invalidar(self, clave=None):
+        """Borra una entrada (o todas). Se llama después de cada escritura"""
+        with self.lock:
+            if clave is None:
+                self.datos.clear()
+            else:
+                self.datos.pop(clave, None)
+
+
+class CacheArchivos:
+    """
+    Cache de archivos en disco direccionada por contenido (la clave es un hash).
+    - Si el archivo ya existe se devuelve la ruta al instante (y se marca como recién usado).
+    - Se escribe a un temporal y se renombra, así dos sesiones no se pisan a medio escribir.
+    - Tamaño acotado: al pasarse de max_bytes se borran los menos usados (LRU)
+      y todo lo que no se use hace más de max_edad segundos.
+    """
+
+    def __init__(self, carpeta, max_bytes=500 * 1024 * 1024, max_edad=7 * 24 * 3600):
+        self.carpeta = carpeta
+        self.max_bytes = max_bytes
+        self.max_edad = max_edad
+        self.lock = threading.Lock()
+        os.makedirs(carpeta, exist_ok=True)
+
+    def ruta(self, clave, extension):
+        return os.path.join(self.carpeta, f"{clave}{extension}")
+
+    def obtener(self, clave, extension, generar):
+        """Ruta del archivo para 'clave'; si no está, generar(ruta_destino) lo crea"""
+        ruta = self.ruta(clave, extension)
+        try:
+            os.utime(ruta)  # Marca de uso para el LRU
+            return ruta
+        except FileNotFoundError:
+            pass
+
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            generar(temporal)
+            os.replace(temporal, ruta)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        self.desalojar()
+        return ruta
+
+    def obtener_json(self, clave, calcular, extension=".json"):
+        """Igual que obtener() pero para datos chicos (ej: medidas de una malla)"""
+        def generar(destino):
+            with open(destino, "w", encoding="utf-8") as f:
+                json.dump(calcular(), f)
+
+        with open(self.obtener(clave, extension, generar), encoding="utf-8") as f:
+            return json.load(f)
+
+    def leer_json(self, clave, extension=".json"):
+        """Lo guardado para 'clave', o None si no está (para cuando el cálculo es en otro lado)"""
+        ruta = self.ruta(clave, extension)
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                datos = json.load(f)
+            os.utime(ruta)
+            return datos
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def guardar_json(self, clave, datos, extension=".json"):
+        return self.obtener_json(clave, lambda: datos, extension)
+
+    def desalojar(self):
+        """Borra lo vencido y, si hace falta, lo menos usado hasta entrar en max_bytes"""
+        with self.lock:
+            ahora = time.time()
+            archivos = []
+            for entrada in os.scandir(self.carpeta):
+                if not entrada.is_file() or entrada.name.endswith(".tmp"):
+                    continue
+                info = entrada.stat()
+                if self.max_edad is not None and ahora - info.st_mtime > self.max_edad:
+                    self.borrar(entrada.path)
+                else:
+                    archivos.append((info.st_mtime, info.st_size, entrada.path))
+
+            total = sum(tamano for _, tamano, _ in archivos)
+            for _, tamano, ruta in sorted(archivos):
+                if total <= self.max_bytes:
+                    break
+                self.borrar(ruta)
+                total -= tamano
+
+    @staticmethod
+    def borrar(ruta):
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass  # Otra sesión ya lo borró
@@ -0,0 +1,200 @@
+"""
+Cotización por lote: una planilla (CSV o XLSX) con muchas piezas se cotiza de una sola vez.
+Columnas reconocidas (no importa mayúsculas ni el orden):
+  pieza | gramos | tiempo | cantidad | rollo (ID) o precio_kg | diseno (horas)
+El tiempo acepta "2.5", "2,5", "2:30", "2h 30m", "2 hs" o "150m".
+"""
+import io
+import csv
+import math
+from datetime import datetime
+
+import cotizacion
+from modelos import numero, parsear_tiempo
+
+# --- BLOQUE DE SEGURIDAD PARA XLSX (sin openpyxl solo se leen CSV) ---
+try:
+    import openpyxl
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+# ---------------------------------------------------------------------
+
+# Nombre normalizado -> nombres que se aceptan en el encabezado de la planilla
+COLUMNAS = {
+    "pieza": ("pieza", "nombre", "modelo", "name", "part"),
+    "gramos": ("gramos", "peso", "peso_g", "g", "grams"),
+    "tiempo": ("tiempo", "horas", "hs", "time", "print_time"),
+    "cantidad": ("cantidad", "cant", "qty", "quantity"),
+    # Sin "id" ni "precio" a secas: en una planilla cualquiera pueden ser el ID de la
+    # pieza o el precio unitario, y se tomarían en silencio como rollo o $/kg
+    "rollo": ("rollo", "id_rollo", "roll_id", "roll"),
+    "precio_kg": ("precio_kg", "$/kg", "precio_por_kg", "price_kg"),
+    "diseno": ("diseno", "diseño", "hs_diseno", "design_hours", "design"),
+}
+
+
+def nombre_columna(encabezado):
+    k = str(encabezado or "").strip().lower()
+    for columna, alias in COLUMNAS.items():
+        if k in alias:
+            return columna
+    return None
+
+
+def leer_filas(archivo, nombre=None):
+    """
+    Filas crudas (lista de listas) de un CSV o XLSX.
+    archivo: ruta o archivo abierto en binario (ej: lo que sube Streamlit).
+    """
+    nombre = nombre or (archivo if isinstance(archivo, str) else getattr(archivo, "name", ""))
+    if str(nombre).lower().endswith((".xlsx", ".xlsm")):
+        if not HAS_OPENPYXL:
+            raise ImportError("Para leer planillas .xlsx hace falta openpyxl (pip install openpyxl)")
+        libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            return [list(f) for f in libro.active.iter_rows(values_only=True)]
+        finally:
+            libro.close()
+
+    if isinstance(archivo, str):
+        with open(archivo, "rb") as f:
+            crudo = f.read()
+    else:
+        crudo = archivo.read()
+    texto = crudo.decode("utf-8-sig") if isinstance(crudo, bytes) else crudo
+    try:
+        dialecto = csv.Sniffer().sniff(texto[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialecto = csv.excel
+    return list(csv.reader(io.StringIO(texto), dialecto))
+
+
+def leer_piezas(archivo, nombre=None):
+    """Lee la planilla y devuelve una lista de piezas (dicts con las columnas normalizadas)"""
+    # Se numeran antes de saltear las vacías: "Fila n" tiene que ser la fila de la planilla
+    filas = [(n, f) for n, f in enumerate(leer_filas(archivo, nombre), start=1)
+             if any(c not in (None, "") for c in f)]
+    if not filas:
+        return []
+
+    columnas = [nombre_columna(e) for e in filas[0][1]]
+    if "gramos" not in columnas:
+        raise ValueError("La planilla necesita al menos una columna de gramos/peso")
+
+    piezas = []
+    for n, fila in filas[1:]:
+        crudo = {c: v for c, v in zip(columnas, fila) if c}
+        piezas.append({
+            "fila": n,  # número de fila en la planilla, para los mensajes de error
+            "pieza": str(crudo.get("pieza") or f"Pieza {n - 1}").strip(),
+            "gramos": numero(crudo.get("gramos")),
+            "horas": parsear_tiempo(crudo.get("tiempo")),
+            "cantidad": max(1, int(numero(crudo.get("cantidad"), 1))),
+            "rollo": str(crudo.get("rollo") or "").strip(),
+            "precio_kg": numero(crudo.get("precio_kg"), None),
+            "hs_diseno": numero(crudo.get("diseno")),
+        })
+    return piezas
+
+
+def cotizar_piezas(piezas, cfg, buscar_rollo=None, margen_fallo=0.0):
+    """
+    Cotiza todas las piezas en una sola pasada vectorizada.
+    El $/kg sale de la columna precio_kg o, si no está, del rollo indicado.
+    Devuelve {"lineas": [...], "total": float, "gramos": float, "errores": [...]}
+    Las líneas con error (rollo inexistente, sin precio) quedan fuera del total.
+    """
+    lineas, errores = [], []
+    for p in piezas:
+        rollo = buscar_rollo(p["rollo"]) if (buscar_rollo and p["rollo"]) else None
+        precio_kg = p["precio_kg"]
+        if precio_kg is None and rollo is not None:
+            precio_kg = rollo.precio_kg
+
+        error = ""
+        if p["rollo"] and rollo is None:
+            error = f"No existe el rollo {p['rollo']}"
+        elif precio_kg is None:
+            error = "Falta el rollo o el $/kg"
+        if error:
+            errores.append(f"Fila {p['fila']}: {error}")
+
+        if rollo is not None:
+            material = f"{rollo.marca} {rollo.tipo} - {rollo.color}".strip()
+        else:
+            material = f"Manual (${precio_kg or 0:,.0f}/kg)"
+        lineas.append({**p, "precio_kg": precio_kg or 0.0, "rollo_obj": rollo,
+                       "material": material, "error": error})
+
+    if not lineas:
+        return {"lineas": [], "total": 0.0, "gramos": 0.0, "errores": errores}
+
+    r = cotizacion.calcular_lote(
+        [l["gramos"] for l in lineas],
+        [l["horas"] for l in lineas],
+        [l["precio_kg"] for l in lineas],
+        [l["cantidad"] for l in lineas],
+        margen_fallo=margen_fallo,
+        hs_diseno=[l["hs_diseno"] for l in lineas],
+        cfg=cfg
+    )
+    totales = r["total_lote"].tolist()
+    unitarios = r["unitario_final"].tolist()
+    gramos = r["peso_real"].tolist()
+
+    total = gramos_total = 0.0
+    for l, t, u, g in zip(lineas, totales, unitarios, gramos):
+        l["total"], l["unitario"] = t, u
+        l["gramos_totales"] = g * l["cantidad"]
+        if not l["error"]:
+            total += t
+            gramos_total += l["gramos_totales"]
+
+    return {"lineas": lineas, "total": total, "gramos": gramos_total, "errores": errores}
+
+
+def filas_historial(resultado, cliente, responsable="Usuario", fecha=None):
+    """Filas para el Historial (mismo formato que el Cotizador), una por línea válida"""
+    fecha = fecha or datetime.now().strftime("%d/%m/%Y")
+    filas = []
+    for l in resultado["lineas"]:
+        if l["error"]:
+            continue
+        filas.append([
+            fecha, responsable, cliente, l["pieza"], "Impresión", l["material"], "-",
+            f"{l['gramos']:g}", f"{l['horas']:.2f}h", l["cantidad"],
+            f"{l['hs_diseno']:g} hs", f"${l['total']:.2f}", f"${l['unitario']:.2f}"
+        ])
+    return filas
+
+
+def descuentos_stock(resultado):
+    """{id_rollo: gramos a descontar}, sumando las líneas que usan el mismo rollo"""
+    descuentos = {}
+    for l in resultado["lineas"]:
+        if not l["error"] and l["rollo_obj"] is not None:
+            id_rollo = l["rollo_obj"].id
+            descuentos[id_rollo] = descuentos.get(id_rollo, 0.0) + l["gramos_totales"]
+    return descuentos
+
+
+def sin_dato(valor):
+    """Los NaN de la tabla tipada (no había dato) cuentan como 0"""
+    return 0.0 if math.isnan(valor) else float(valor)
+
+
+def trabajos_desde_tabla(tabla, cantidad=20, precio_kg=0.0):
+    """
+    Los últimos 'cantidad' trabajos de impresión del historial tipado (TablaHistorial),
+    en el formato que usa cotizacion.sensibilidad().
+    El historial no guarda el $/kg, así que se usa el mismo 'precio_kg' para todos.
+    """
+    indices = tabla.es("tipo", "Impresión").nonzero()[0][::-1][:cantidad]
+    return [{
+        "peso_g": sin_dato(tabla.peso_g[i]),
+        "horas": sin_dato(tabla.minutos[i]) / 60,
+        "cantidad": int(tabla.cantidad[i]),
+        "hs_diseno": sin_dato(tabla.diseno_min[i]) / 60,
+        "precio_kg": precio_kg,
+    } for i in indices]
@@ -3,6 +3,7 @@ import sys
 import os # Importante para rutas
 from PyQt6.QtWidgets import QApplication, QMainWindow, QTabWidget, QVBoxLayout, QWidget, QLabel, QHBoxLayout
 from PyQt6.QtGui import QIcon
+from PyQt6.QtCore import QObject, pyqtSignal
 
 # --- BLOQUE DE SEGURIDAD PARA EL TEMA ---
 try:
@@ -21,11 +22,18 @@ try:
     from tabs.historial import TabHistorial
     from tabs.config import TabConfig
     from tabs.llaveros import TabLlaveros
+    from tabs.lote import TabLote
+    from tabs.resumen import TabResumen
+    from tabs.tareas import EjecutorTareas
 except ImportError as e:
     print(f"❌ ERROR CRÍTICO DE IMPORTACIÓN: {e}")
     print("Asegúrate de que la carpeta 'tabs' existe y tiene el archivo '__init__.py' dentro.")
     sys.exit(1)
 
+class AvisoBackend(QObject):
+    """Puente para avisar a la interfaz (hilo principal) que llegaron datos de Drive"""
+    conexion_terminada = pyqtSignal(bool)
+
 class VentanaPrincipal(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -36,7 +44,8 @@ class VentanaPrincipal(QMainWindow):
             self.setWindowIcon(QIcon("icono.png"))
 
         # 1. INICIAR BACKEND (Cerebro)
-        self.backend = BackendGestor() 
+        # Arranca con la copia local; la conexión a Drive va en segundo plano
+        self.backend = BackendGestor(conectar=False) 
 
         # 2. INTERFAZ PRINCIPAL
         main_widget = QWidget()
@@ -47,6 +56,11 @@ class VentanaPrincipal(QMainWindow):
         top_layout = QHBoxLayout()
         top_layout.addWidget(QLabel("<h2>🚀 Panel de Control 3D</h2>"))
         top_layout.addStretch()
+        self.lbl_tareas = QLabel("⏳ Trabajando con Drive...")
+        self.lbl_tareas.setVisible(False)
+        top_layout.addWidget(self.lbl_tareas)
+        self.lbl_estado = QLabel("🟡 Datos locales (sincronizando...)")
+        top_layout.addWidget(self.lbl_estado)
         layout.addLayout(top_layout)
 
         # 3. SISTEMA DE PESTAÑAS
@@ -56,18 +70,48 @@ class VentanaPrincipal(QMainWindow):
         self.tab_cotizador = TabCotizador(self.backend)
         self.tab_inventario = TabInventario(self.backend)
         self.tab_llaveros = TabLlaveros(self.backend)
+        self.tab_lote = TabLote(self.backend)
         self.tab_historial = TabHistorial(self.backend)
+        self.tab_resumen = TabResumen(self.backend)
         self.tab_config = TabConfig(self.backend)
 
         # Agregar pestañas
         self.tabs.addTab(self.tab_cotizador, "🖨️ Cotizador")
+        self.tabs.addTab(self.tab_lote, "🧾 Lote")
         self.tabs.addTab(self.tab_inventario, "📦 Stock")
         self.tabs.addTab(self.tab_llaveros, "🔑 Llaveros")
         self.tabs.addTab(self.tab_historial, "📋 Historial")
+        self.tabs.addTab(self.tab_resumen, "📊 Resumen")
         self.tabs.addTab(self.tab_config, "⚙️ Config")
 
         layout.addWidget(self.tabs)
 
+        # Las llamadas a la red de las pestañas van al pool de tareas (ver tabs/tareas.py)
+        self.tareas = EjecutorTareas.compartido()
+        self.tareas.ocupado.connect(self.lbl_tareas.setVisible)
+
+        # 4. CONEXIÓN EN SEGUNDO PLANO
+        self.aviso = AvisoBackend()
+        self.aviso.conexion_terminada.connect(self.al_conectar)
+        self.backend.conectar_en_segundo_plano(self.aviso.conexion_terminada.emit)
+
+    def al_conectar(self, ok):
+        """Llegaron los datos frescos de Drive (o falló la conexión)"""
+        if not ok:
+            self.lbl_estado.setText("🔴 Sin conexión (datos locales)")
+            return
+        
+        self.lbl_estado.setText("🟢 Sincronizado con Drive")
+        self.tab_inventario.actualizar_tabla()
+        self.tab_cotizador.actualizar_filtros()
+        self.tab_cotizador.actualizar_combo_stock()
+        self.tab_historial.cargar_datos(forzar=True)
+
+    def closeEvent(self, event):
+        # Lo que no arrancó se cancela; un guardado a medio camino se deja terminar
+        self.tareas.cerrar()
+        super().closeEvent(event)
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
  
@@ -1,15 +1,19 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QGroupBox, QFormLayout, QLineEdit, 
     QComboBox, QLabel, QSpinBox, QHBoxLayout, QCheckBox, 
-    QPushButton, QTextEdit, QMessageBox
+    QPushButton, QTextEdit, QMessageBox, QFileDialog
 )
 from PyQt6.QtCore import Qt
 from datetime import datetime
+import cotizacion
+import gcode
+from tabs.tareas import EjecutorTareas
 
 class TabCotizador(QWidget):
     def __init__(self, backend):
         super().__init__()
         self.backend = backend
+        self.tareas = EjecutorTareas.compartido()
         self.initUI()
 
     def initUI(self):
@@ -31,31 +35,42 @@ class TabCotizador(QWidget):
         group_mat = QGroupBox("🧶 Material y Stock")
         layout_mat = QFormLayout()
         
-        # A. Crear el Combo y Botón
+        # A. Filtros (material y color) sobre los índices del backend
+        h_filtros = QHBoxLayout()
+        self.combo_filtro_tipo = QComboBox()
+        self.combo_filtro_color = QComboBox()
+        h_filtros.addWidget(self.combo_filtro_tipo)
+        h_filtros.addWidget(self.combo_filtro_color)
+        layout_mat.addRow("Filtrar:", h_filtros)
+        self.actualizar_filtros()
+        self.combo_filtro_tipo.currentIndexChanged.connect(self.actualizar_combo_stock)
+        self.combo_filtro_color.currentIndexChanged.connect(self.actualizar_combo_stock)
+        
+        # B. Crear el Combo y Botón
         h_stock = QHBoxLayout()
         self.combo_stock = QComboBox()
         self.combo_stock.addItem("--- Seleccionar del Inventario ---", None)
         
-        btn_refresh_stock = QPushButton("🔄")
-        btn_refresh_stock.setFixedWidth(40)
-        btn_refresh_stock.setToolTip("Recargar Stock Nube")
-        btn_refresh_stock.clicked.connect(self.refrescar_stock_nube)
+        self.btn_refresh_stock = QPushButton("🔄")
+        self.btn_refresh_stock.setFixedWidth(40)
+        self.btn_refresh_stock.setToolTip("Recargar Stock Nube")
+        self.btn_refresh_stock.clicked.connect(self.refrescar_stock_nube)
         
         h_stock.addWidget(self.combo_stock)
-        h_stock.addWidget(btn_refresh_stock)
+        h_stock.addWidget(self.btn_refresh_stock)
         
         layout_mat.addRow("Stock Disponible:", h_stock)
         
-        # B. Crear la etiqueta de Info (IMPORTANTE: Crear antes de llenar datos)
+        # C. Crear la etiqueta de Info (IMPORTANTE: Crear antes de llenar datos)
         self.lbl_info = QLabel("Selecciona un material para ver detalles...")
         self.lbl_info.setStyleSheet("color: gray; font-size: 11px;")
         layout_mat.addRow("", self.lbl_info) 
 
-        # C. Conectar señales y cargar datos
+        # D. Conectar señales y cargar datos
         self.combo_stock.currentIndexChanged.connect(self.al_seleccionar_stock)
         self.actualizar_combo_stock()
 
-        # D. Costo Reposición
+        # E. Costo Reposición
         self.spin_precio_kg = QSpinBox()
         self.spin_precio_kg.setRange(0, 1000000)
         self.spin_precio_kg.setPrefix("$ ")
@@ -70,9 +85,19 @@ class TabCotizador(QWidget):
         group_tech = QGroupBox("⚙️ Parámetros de Impresión")
         layout_tech = QFormLayout()
         
+        h_peso = QHBoxLayout()
         self.input_peso = QLineEdit()
         self.input_peso.setPlaceholderText("Gramos (con soportes)")
-        layout_tech.addRow("Peso Total (g):", self.input_peso)
+        self.btn_gcode = QPushButton("📄 G-code")
+        self.btn_gcode.setToolTip("Tomar peso y tiempo del archivo del laminador")
+        self.btn_gcode.clicked.connect(self.cargar_gcode)
+        h_peso.addWidget(self.input_peso); h_peso.addWidget(self.btn_gcode)
+        layout_tech.addRow("Peso Total (g):", h_peso)
+
+        self.lbl_gcode = QLabel("")
+        self.lbl_gcode.setStyleSheet("color: gray; font-size: 11px;")
+        self.lbl_gcode.setWordWrap(True)
+        layout_tech.addRow("", self.lbl_gcode)
 
         h_time = QHBoxLayout()
         self.spin_h = QSpinBox(); self.spin_h.setSuffix(" h"); self.spin_h.setRange(0, 999)
@@ -116,11 +141,17 @@ class TabCotizador(QWidget):
         btn_calc.clicked.connect(self.calcular)
         btn_layout.addWidget(btn_calc)
 
-        btn_save = QPushButton("GUARDAR 💾")
-        btn_save.setCursor(Qt.CursorShape.PointingHandCursor)
-        btn_save.setStyleSheet("background-color: #27ae60; color: white; font-weight: bold;")
-        btn_save.clicked.connect(self.guardar)
-        btn_layout.addWidget(btn_save)
+        btn_sens = QPushButton("📈 ¿Y SI...?")
+        btn_sens.setCursor(Qt.CursorShape.PointingHandCursor)
+        btn_sens.setToolTip("Ver cómo cambia el precio si sube la luz, el filamento, etc.")
+        btn_sens.clicked.connect(self.abrir_sensibilidad)
+        btn_layout.addWidget(btn_sens)
+
+        self.btn_save = QPushButton("GUARDAR 💾")
+        self.btn_save.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_save.setStyleSheet("background-color: #27ae60; color: white; font-weight: bold;")
+        self.btn_save.clicked.connect(self.guardar)
+        btn_layout.addWidget(self.btn_save)
 
         layout.addLayout(btn_layout)
 
@@ -135,9 +166,38 @@ class TabCotizador(QWidget):
 
     # --- LÓGICA ---
     def refrescar_stock_nube(self):
-        self.backend.forzar_descarga_inventario()
+        # La descarga va en segundo plano; los combos se llenan cuando llega
+        tarea = self.tareas.lanzar(
+            self.backend.forzar_descarga_inventario, clave="refrescar_stock_cotizador",
+            al_terminar=self.al_refrescar_stock, al_fallar=lambda e: self.al_refrescar_stock(False),
+            al_finalizar=lambda: self.btn_refresh_stock.setEnabled(True)
+        )
+        if tarea:
+            self.btn_refresh_stock.setEnabled(False)
+
+    def al_refrescar_stock(self, ok):
+        self.actualizar_filtros()
         self.actualizar_combo_stock()
-        QMessageBox.information(self, "OK", "Stock actualizado.")
+        if ok:
+            QMessageBox.information(self, "OK", "Stock actualizado.")
+        else:
+            QMessageBox.warning(self, "Error", "No se pudo conectar a Drive.")
+
+    def actualizar_filtros(self):
+        """Llena los combos de filtro con los materiales y colores que hay en stock"""
+        for combo, campo, texto_todos in (
+            (self.combo_filtro_tipo, "tipo", "Todos los materiales"),
+            (self.combo_filtro_color, "color", "Todos los colores"),
+        ):
+            actual = combo.currentData()
+            combo.blockSignals(True)
+            combo.clear()
+            combo.addItem(texto_todos, None)
+            for valor in self.backend.indices.valores(campo):
+                combo.addItem(valor, valor)
+            i = combo.findData(actual)
+            combo.setCurrentIndex(i if i >= 0 else 0)
+            combo.blockSignals(False)
 
     def actualizar_combo_stock(self):
         self.combo_stock.clear()
@@ -145,48 +205,27 @@ class TabCotizador(QWidget):
         
         if not self.backend.inventario: return
 
-        for item in self.backend.inventario:
-            # Recuperar datos con seguridad
-            marca = item.get("Marca") or item.get("marca") or "Gen"
-            tipo = item.get("Tipo") or item.get("tipo") or "MAT"
-            col = item.get("Color") or item.get("color") or ""
-            id_rollo = item.get("ID") 
-            
-            try:
-                p_rollo = float(str(item.get("Precio_Rollo") or 0).replace(',', '.'))
-                p_ini = float(str(item.get("Peso_Inicial") or 1000).replace(',', '.'))
-                p_act = float(str(item.get("Peso_Actual") or p_ini).replace(',', '.'))
-            except:
-                p_rollo, p_ini, p_act = 0, 1000, 1000
-            
-            if p_act < 5: continue 
-            
-            txt = f"{marca} {tipo} - {col} ({int(p_act)}g disp.)"
-            
-            data = {
-                "id": id_rollo,
-                "precio_rollo": p_rollo, 
-                "peso_ini": p_ini,
-                "peso_act": p_act,
-                "desc": txt
-            }
-            self.combo_stock.addItem(txt, data)
+        # Los rollos ya vienen normalizados del backend (clase Rollo)
+        # y el filtrado se resuelve con los índices (sin recorrer todo el inventario)
+        rollos = self.backend.filtrar_stock(
+            tipo=self.combo_filtro_tipo.currentData(),
+            color=self.combo_filtro_color.currentData(),
+            peso_minimo=5
+        )
+        for rollo in rollos:
+            txt = f"{rollo.marca or 'Gen'} {rollo.tipo or 'MAT'} - {rollo.color} ({int(rollo.peso_actual)}g disp.)"
+            self.combo_stock.addItem(txt, rollo)
 
     def al_seleccionar_stock(self, index):
-        data = self.combo_stock.itemData(index)
-        if data:
-            if data['peso_ini'] > 0:
-                precio_kg = (data['precio_rollo'] / data['peso_ini']) * 1000
-            else:
-                precio_kg = 0
-                
-            self.spin_precio_kg.setValue(int(precio_kg))
+        rollo = self.combo_stock.itemData(index)
+        if rollo:
+            self.spin_precio_kg.setValue(int(rollo.precio_kg))
             
-            if data['peso_act'] < 100:
-                self.lbl_info.setText(f"⚠️ QUEDA MUY POCO: {int(data['peso_act'])}g")
+            if rollo.peso_actual < 100:
+                self.lbl_info.setText(f"⚠️ QUEDA MUY POCO: {int(rollo.peso_actual)}g")
                 self.lbl_info.setStyleSheet("color: red; font-weight: bold;")
             else:
-                self.lbl_info.setText(f"✅ Stock OK: {int(data['peso_act'])}g disponibles")
+                self.lbl_info.setText(f"✅ Stock OK: {int(rollo.peso_actual)}g disponibles")
                 self.lbl_info.setStyleSheet("color: #2ecc71")
         else:
             self.lbl_info.setText("Modo Manual: Precio personalizado")
@@ -210,41 +249,25 @@ class TabCotizador(QWidget):
             margen_error = self.spin_margen.value() / 100
             hs_diseno = self.spin_hs_diseno.value() if self.chk_diseno.isChecked() else 0
 
-            # --- 2. Cálculos Matemáticos ---
-            
-            # A. Material (incluyendo el fallo del 10%)
-            peso_real_calculo = peso_pieza_base * (1 + margen_error) 
-            costo_material = (peso_real_calculo / 1000) * precio_mat_kg
-            
-            # B. Máquina y Energía
-            costo_luz = horas * cfg["consumo_kw"] * cfg["precio_kwh"]
-            costo_maq = horas * cfg["precio_desgaste_hora"]
-            
-            # C. Suma de Costos Directos (Costo Puro)
-            subtotal_costo_unitario = costo_material + costo_luz + costo_maq
-            
-            # D. Aplicar Ganancia
-            ganancia_valor = subtotal_costo_unitario * (cfg["margen_ganancia"] / 100)
-            precio_venta_unitario = subtotal_costo_unitario + ganancia_valor
-            
-            # E. Extras (Diseño se cobra una sola vez por lote)
-            costo_diseno_total = hs_diseno * cfg["precio_hora_diseno"]
-            
-            # F. Totales Finales
-            total_lote = (precio_venta_unitario * cant) + costo_diseno_total
-            unitario_final_promedio = total_lote / cant
+            # --- 2. Cálculos Matemáticos (motor compartido con la versión web) ---
+            r = cotizacion.calcular(
+                peso_pieza_base, horas, precio_mat_kg, cant,
+                margen_fallo=margen_error, hs_diseno=hs_diseno, cfg=cfg
+            )
+            total_lote = r["total_lote"]
+            unitario_final_promedio = r["unitario_final"]
 
             # --- 3. Construir el Mensaje Detallado ---
             detalle = (
                 f"📊 DETALLE UNITARIO (Base {peso_pieza_base}g + {int(margen_error*100)}% fallo):\n"
-                f"   • Material: ${costo_material:,.2f}\n"
-                f"   • Luz: ${costo_luz:,.2f} | Maq: ${costo_maq:,.2f}\n"
-                f"   • Costo Puro: ${subtotal_costo_unitario:,.2f}\n"
-                f"   • Ganancia ({cfg['margen_ganancia']}%): ${ganancia_valor:,.2f}\n"
+                f"   • Material: ${r['costo_material']:,.2f}\n"
+                f"   • Luz: ${r['costo_luz']:,.2f} | Maq: ${r['costo_maq']:,.2f}\n"
+                f"   • Costo Puro: ${r['costo_puro']:,.2f}\n"
+                f"   • Ganancia ({cfg['margen_ganancia']}%): ${r['ganancia']:,.2f}\n"
                 f"----------------------------------------\n"
                 f"📦 LOTE x{cant} unid:\n"
-                f"   • Piezas: ${precio_venta_unitario * cant:,.2f}\n"
-                f"   • Diseño: ${costo_diseno_total:,.2f}\n"
+                f"   • Piezas: ${r['precio_unitario'] * cant:,.2f}\n"
+                f"   • Diseño: ${r['costo_diseno']:,.2f}\n"
                 f"========================================\n"
                 f"💰 TOTAL FINAL: ${total_lote:,.2f} (Unit: ${unitario_final_promedio:,.2f})"
             )
@@ -257,7 +280,63 @@ class TabCotizador(QWidget):
             self.txt_res.setText(f"❌ Error en cálculo: {e}")
             return 0, 0
 
+    def cargar_gcode(self):
+        ruta, _ = QFileDialog.getOpenFileName(self, "Archivo G-code", "", "G-code (*.gcode *.gco *.g);;Todos (*)")
+        if not ruta:
+            return
+        # Un archivo sin totales se recorre entero: va en segundo plano
+        tarea = self.tareas.lanzar(
+            gcode.analizar_gcode, ruta, clave="gcode",
+            al_terminar=self.al_cargar_gcode,
+            al_fallar=self.al_fallar_gcode,
+            al_finalizar=lambda: self.btn_gcode.setEnabled(True)
+        )
+        if tarea:
+            self.btn_gcode.setEnabled(False)
+            self.lbl_gcode.setText("⏳ Leyendo G-code...")
+
+    def al_fallar_gcode(self, error):
+        self.lbl_gcode.setText("")
+        QMessageBox.critical(self, "Error", f"No se pudo leer el G-code:\n{error}")
+
+    def al_cargar_gcode(self, datos):
+        minutos_totales = round(datos["horas"] * 60)
+        self.input_peso.setText(f"{datos['gramos']:.2f}")
+        self.spin_h.setValue(minutos_totales // 60)
+        self.spin_m.setValue(minutos_totales % 60)
+
+        detalle = " + ".join(f"T{m['herramienta']} {m['tipo'] or '?'} {m['gramos']:.1f}g" for m in datos["materiales"])
+        origen = "datos del laminador" if datos["origen"] == "laminador" else "estimado recorriendo el archivo"
+        self.lbl_gcode.setText(f"📄 {datos['laminador']}: {detalle or 'sin extrusión'} | "
+                               f"{minutos_totales // 60}h {minutos_totales % 60}m ({origen})")
+
+    def trabajo_actual(self):
+        """Los datos del formulario como un trabajo para el análisis de sensibilidad"""
+        try:
+            peso = float(self.input_peso.text().replace(',', '.') or 0)
+        except ValueError:
+            return None
+        if peso <= 0:
+            return None
+        return {
+            "peso_g": peso * (1 + self.spin_margen.value() / 100),
+            "horas": self.spin_h.value() + (self.spin_m.value()/60),
+            "precio_kg": self.spin_precio_kg.value(),
+            "cantidad": self.spin_cant.value(),
+            "hs_diseno": self.spin_hs_diseno.value() if self.chk_diseno.isChecked() else 0,
+        }
+
+    def abrir_sensibilidad(self):
+        try:
+            from tabs.sensibilidad import DialogoSensibilidad
+        except ImportError as e:
+            QMessageBox.warning(self, "Falta una librería", f"El análisis necesita numpy: {e}")
+            return
+        DialogoSensibilidad(self.backend, self.trabajo_actual(), self).exec()
+
     def guardar(self):
+        if self.tareas.esta_en_curso("guardar_cotizacion"):
+            return  # Ya se está guardando (doble clic)
         total, unitario = self.calcular()
         
         if total > 0:
@@ -266,25 +345,21 @@ class TabCotizador(QWidget):
                 return
 
             # --- LÓGICA DE DESCUENTO DE STOCK ---
-            data_stock = self.combo_stock.currentData()
+            rollo = self.combo_stock.currentData()
             
             peso_pieza = float(self.input_peso.text().replace(',', '.') or 0)
             margen = self.spin_margen.value() / 100
             cant = self.spin_cant.value()
             consumo_total_gramos = (peso_pieza * cant) * (1 + margen)
             
-            if data_stock:
-                if data_stock['peso_act'] < consumo_total_gramos:
+            if rollo:
+                if rollo.peso_actual < consumo_total_gramos:
                     resp = QMessageBox.question(self, "Stock Insuficiente",
-                        f"El lote requiere {int(consumo_total_gramos)}g pero solo quedan {int(data_stock['peso_act'])}g.\n"
+                        f"El lote requiere {int(consumo_total_gramos)}g pero solo quedan {int(rollo.peso_actual)}g.\n"
                         "¿Deseas guardar igual y dejar el stock en negativo?",
                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
                     if resp == QMessageBox.StandardButton.No:
                         return 
-                
-                ok_stock = self.backend.descontar_stock(data_stock['id'], consumo_total_gramos)
-                if not ok_stock:
-                    QMessageBox.warning(self, "Alerta", "Se guardará el historial, pero falló el descuento de stock en Drive.")
 
             # --- GUARDADO EN HISTORIAL ---
             cli = self.input_cliente.text()
@@ -299,12 +374,49 @@ class TabCotizador(QWidget):
                 cant, f"{hs_dis} hs", f"${total:.2f}", f"${unitario:.2f}"
             ]
             
-            ok = self.backend.guardar_fila_historial(fila)
-            
-            if ok:
-                QMessageBox.information(self, "Hecho", "✅ Guardado y Stock Actualizado.")
-                self.input_modelo.clear()
-                self.txt_res.clear()
-                self.actualizar_combo_stock()
-            else:
-                QMessageBox.critical(self, "Error", "Falló conexión Drive.")
\ No newline at end of file
+            # Descuento y guardado en segundo plano; con la clave, un doble clic no guarda dos veces
+            tarea = self.tareas.lanzar(
+                self.guardar_en_fondo, rollo.id if rollo else None, consumo_total_gramos, fila,
+                clave="guardar_cotizacion", con_progreso=True,
+                al_terminar=lambda r: self.al_guardar(*r), al_progreso=self.al_progreso_guardar,
+                al_fallar=self.al_fallar_guardar, al_finalizar=self.restaurar_boton_guardar
+            )
+            if tarea:
+                self.btn_save.setEnabled(False)
+                self.btn_save.setText("Guardando... ⏳")
+
+    def guardar_en_fondo(self, tarea, id_rollo, gramos, fila):
+        """Corre en el pool: descuenta el stock (Drive) y guarda la fila. Devuelve (ok_stock, ok)"""
+        ok_stock = True
+        if id_rollo is not None:
+            tarea.avisar(0, "Descontando stock...")
+            ok_stock = self.backend.descontar_stock(id_rollo, gramos)
+        tarea.avisar(50, "Guardando historial...")
+        return ok_stock, self.backend.guardar_fila_historial(fila)
+
+    def al_progreso_guardar(self, porcentaje, texto):
+        self.btn_save.setText(f"{texto} {porcentaje}%")
+
+    def restaurar_boton_guardar(self):
+        self.btn_save.setEnabled(True)
+        self.btn_save.setText("GUARDAR 💾")
+
+    def al_guardar(self, ok_stock, ok):
+        if not ok_stock:
+            QMessageBox.warning(self, "Alerta", "Falló el descuento de stock en Drive.")
+
+        if ok:
+            QMessageBox.information(self, "Hecho", "✅ Guardado y Stock Actualizado.")
+            self.input_modelo.clear()
+            self.txt_res.clear()
+            # El descuento pudo vaciar un rollo: cambian los materiales / colores con stock
+            self.actualizar_filtros()
+            self.actualizar_combo_stock()
+        else:
+            QMessageBox.critical(self, "Error", "Falló conexión Drive.")
+
+    def al_fallar_guardar(self, error):
+        """Se cortó a mitad de camino: no se sabe si el stock se descontó, se relee lo que haya"""
+        QMessageBox.critical(self, "Error", f"No se pudo guardar la cotización:\n{error}")
+        self.actualizar_filtros()
+        self.actualizar_combo_stock()
\ No newline at end of file
@@ -1,15 +1,159 @@
 from PyQt6.QtWidgets import (
-    QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem, 
-    QHeaderView, QPushButton, QHBoxLayout, QMessageBox, QAbstractItemView
+    QWidget, QVBoxLayout, QTableView, QHeaderView, QPushButton, QHBoxLayout,
+    QMessageBox, QAbstractItemView, QLineEdit, QLabel, QDateEdit, QSpinBox
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QAbstractTableModel, QTimer, QDate
+import numpy as np
+import historial_tipado
+from tabs.tareas import EjecutorTareas
+
+
+class ModeloHistorial(QAbstractTableModel):
+    """
+    El historial como modelo de Qt: no se crea nada por celda.
+    - Orden y filtro trabajan sobre la TablaHistorial (arrays de NumPy), así
+      ordenar por Total ordena por número y no por texto. El filtro sale del
+      IndiceHistorial (busqueda.py): palabras, rango de fechas y de total.
+    - 'orden' dice qué fila del historial va en cada renglón de la vista.
+    - Los textos se piden a la base recién cuando Qt los va a dibujar,
+      de a BLOQUE renglones, y se guardan los últimos MAX_FILAS_EN_MEMORIA.
+    """
+
+    BLOQUE = 200
+    MAX_FILAS_EN_MEMORIA = 5000
+
+    def __init__(self, backend):
+        super().__init__()
+        self.backend = backend
+        self.encabezado = list(historial_tipado.COLUMNAS)
+        self.tabla = None
+        self.indice = None
+        self.orden = np.zeros(0, dtype=np.int64)
+        self.filas = {}  # posicion en la base -> fila (lista de textos)
+        self.filtro = {}  # Argumentos de IndiceHistorial.buscar (texto, desde, hasta, minimo, maximo)
+        self.recarga_pendiente = False
+        self.columna_orden, self.sentido = None, Qt.SortOrder.AscendingOrder
+
+    # --- CARGA ---
+    def cargar(self):
+        """Arma la vista con la copia local (la sincronización con Drive se hace antes, en segundo plano)"""
+        self.recarga_pendiente = False
+        self.beginResetModel()
+        self.encabezado = self.backend.obtener_encabezado_historial()
+        self.indice = self.backend.obtener_indice_historial(sincronizar=False)
+        self.tabla = self.indice.tabla
+        self.filas = {}
+        self.orden = self.calcular_orden()
+        self.endResetModel()
+
+    def calcular_orden(self):
+        """Filas visibles (filtro) en el orden elegido (o el del historial)"""
+        indices = np.flatnonzero(self.mascara_filtro())
+        if self.columna_orden is not None and len(indices):
+            claves = self.claves_orden(self.columna_orden)[indices]
+            indices = indices[np.argsort(claves, kind="stable")]
+            if self.sentido == Qt.SortOrder.DescendingOrder:
+                indices = indices[::-1]
+        return indices
+
+    def mascara_filtro(self):
+        """Filas que coinciden con la búsqueda (sin filtro, todas)"""
+        if not self.filtro:
+            return np.ones(len(self.tabla), dtype=bool)
+        return self.indice.buscar(**self.filtro)
+
+    def claves_orden(self, columna):
+        nombre = historial_tipado.COLUMNAS[columna]
+        if nombre in historial_tipado.COLUMNAS_TEXTO:
+            # Texto: el puesto de cada valor distinto en orden alfabético
+            categorias = self.tabla.categorias[nombre]
+            puestos = np.empty(len(categorias), dtype=np.int64)
+            puestos[np.argsort([c.lower() for c in categorias], kind="stable")] = np.arange(len(categorias))
+            return puestos[self.tabla.codigos[nombre]]
+        return self.tabla.columna(nombre)
+
+    def filtrar(self, **filtro):
+        # Solo los criterios cargados (None / "" = sin ese filtro)
+        self.filtro = {k: v for k, v in filtro.items() if v not in (None, "")}
+        self.beginResetModel()
+        self.orden = self.calcular_orden()
+        self.endResetModel()
+
+    def sort(self, columna, sentido=Qt.SortOrder.AscendingOrder):
+        # Columna -1 (o una que no está en la tabla tipada) = orden del historial
+        self.columna_orden = columna if 0 <= columna < len(historial_tipado.COLUMNAS) else None
+        self.sentido = sentido
+        if self.tabla is None:
+            return
+        self.layoutAboutToBeChanged.emit()
+        self.orden = self.calcular_orden()
+        self.layoutChanged.emit()
+
+    # --- ACCESO A LAS FILAS ---
+    def posicion(self, renglon):
+        """Clave en el almacén local de la fila que se ve en ese renglón"""
+        return int(self.tabla.posicion[self.orden[renglon]])
+
+    def fila(self, renglon):
+        posicion = self.posicion(renglon)
+        if posicion not in self.filas:
+            self.traer_bloque(renglon)
+        return self.filas.get(posicion, [])
+
+    def traer_bloque(self, renglon):
+        """Trae de una sola consulta el bloque de renglones alrededor del pedido"""
+        if len(self.filas) > self.MAX_FILAS_EN_MEMORIA:
+            self.filas = {}
+        inicio = renglon - renglon % self.BLOQUE
+        posiciones = self.tabla.posicion[self.orden[inicio:inicio + self.BLOQUE]]
+        encontradas = self.backend.obtener_filas_historial(posiciones)
+        self.filas.update(encontradas)
+        # Faltan filas: el historial cambió por debajo (una sincronización) y hay que recargar
+        if len(encontradas) < len(posiciones) and not self.recarga_pendiente:
+            self.recarga_pendiente = True
+            QTimer.singleShot(0, self.cargar)
+
+    def muestra(self, renglones):
+        """Filas sueltas de la vista en una sola consulta (sin guardarlas), para medir anchos"""
+        posiciones = self.tabla.posicion[self.orden[list(renglones)]]
+        return list(self.backend.obtener_filas_historial(posiciones).values())
+
+    # --- INTERFAZ DE QT ---
+    def rowCount(self, parent=None):
+        return len(self.orden)
+
+    def columnCount(self, parent=None):
+        return len(self.encabezado)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            fila = self.fila(index.row())
+            # Protección por si la fila tiene menos columnas
+            return str(fila[index.column()]) if index.column() < len(fila) else ""
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def headerData(self, seccion, orientacion, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientacion == Qt.Orientation.Horizontal:
+            return self.encabezado[seccion] if seccion < len(self.encabezado) else ""
+        return str(int(self.orden[seccion]) + 1)
+
 
 class TabHistorial(QWidget):
+    # Para el ancho de las columnas se miden solo estas filas (principio, final y salteadas)
+    MUESTRA_ANCHOS = 200
+
     def __init__(self, backend):
         super().__init__()
         self.backend = backend
+        self.tareas = EjecutorTareas.compartido()
         self.initUI()
-        
+
         # Cargar datos automáticamente al iniciar
         self.cargar_datos()
 
@@ -18,83 +162,202 @@ class TabHistorial(QWidget):
 
         # --- 1. Botonera Superior ---
         btn_layout = QHBoxLayout()
-        
-        btn_refresh = QPushButton("🔄 Actualizar Tabla")
-        btn_refresh.clicked.connect(self.cargar_datos)
-        btn_layout.addWidget(btn_refresh)
-
-        btn_delete = QPushButton("🗑️ Eliminar Fila Seleccionada")
-        btn_delete.setStyleSheet("background-color: #c0392b; color: white; font-weight: bold;")
-        btn_delete.clicked.connect(self.borrar_fila)
-        btn_layout.addWidget(btn_delete)
-        
+
+        self.btn_refresh = QPushButton("🔄 Actualizar Tabla")
+        self.btn_refresh.clicked.connect(lambda: self.cargar_datos(forzar=True))
+        btn_layout.addWidget(self.btn_refresh)
+
+        self.input_filtro = QLineEdit()
+        self.input_filtro.setPlaceholderText("🔍 Buscar cliente, modelo, material...")
+        self.input_filtro.setClearButtonEnabled(True)
+        btn_layout.addWidget(self.input_filtro)
+
+        self.btn_delete = QPushButton("🗑️ Eliminar Fila Seleccionada")
+        self.btn_delete.setStyleSheet("background-color: #c0392b; color: white; font-weight: bold;")
+        self.btn_delete.clicked.connect(self.borrar_fila)
+        btn_layout.addWidget(self.btn_delete)
+
         layout.addLayout(btn_layout)
-        
-        # --- 2. Tabla ---
-        self.tabla = QTableWidget()
+
+        # --- Filtros de fecha y total (el valor mínimo de cada uno = sin límite) ---
+        filtros_layout = QHBoxLayout()
+        self.fecha_desde, self.fecha_hasta = self.crear_fecha(), self.crear_fecha()
+        self.spin_min, self.spin_max = self.crear_importe(), self.crear_importe()
+        for texto, widget in (("Desde:", self.fecha_desde), ("Hasta:", self.fecha_hasta),
+                              ("Total mín:", self.spin_min), ("Total máx:", self.spin_max)):
+            filtros_layout.addWidget(QLabel(texto))
+            filtros_layout.addWidget(widget)
+        btn_limpiar = QPushButton("✖ Limpiar")
+        btn_limpiar.clicked.connect(self.limpiar_filtros)
+        filtros_layout.addWidget(btn_limpiar)
+        filtros_layout.addStretch()
+        layout.addLayout(filtros_layout)
+
+        # --- 2. Tabla (modelo/vista: solo se dibujan las filas visibles) ---
+        self.modelo = ModeloHistorial(self.backend)
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
         # Configuración para seleccionar filas completas
         self.tabla.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.tabla.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
         self.tabla.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers) # No editable directo
-        
-        cols = ["Fecha", "Resp", "Cliente", "Modelo", "Tipo", "Material", "Color", "Peso", "Tiempo", "Cant", "Diseño", "Total", "Unitario"]
-        self.tabla.setColumnCount(len(cols))
-        self.tabla.setHorizontalHeaderLabels(cols)
-        
-        # Estética de columnas
+        # Arranca sin ordenar (orden del historial); un clic en el encabezado ordena
+        self.tabla.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.tabla.setSortingEnabled(True)
+
+        # Alto fijo de filas y ancho de columnas a mano: Qt no mide cada celda
         header = self.tabla.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
-        
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        header.setStretchLastSection(True)
+        self.tabla.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.tabla.verticalHeader().setDefaultSectionSize(self.fontMetrics().height() + 8)
+
         layout.addWidget(self.tabla)
+
+        self.lbl_cantidad = QLabel("")
+        self.lbl_cantidad.setStyleSheet("color: #888;")
+        layout.addWidget(self.lbl_cantidad)
         self.setLayout(layout)
 
-    def cargar_datos(self):
-        """Descarga el historial de Drive y rellena la tabla"""
-        datos_brutos = self.backend.obtener_historial_completo()
-        
-        # Limpiar tabla actual
-        self.tabla.setRowCount(0)
-        
-        if not datos_brutos:
+        # La búsqueda usa el índice (milisegundos): solo se espera a que se junten las teclas
+        self.timer_filtro = QTimer(self)
+        self.timer_filtro.setSingleShot(True)
+        self.timer_filtro.setInterval(80)
+        self.timer_filtro.timeout.connect(self.aplicar_filtro)
+        self.input_filtro.textChanged.connect(self.timer_filtro.start)
+        for fecha in (self.fecha_desde, self.fecha_hasta):
+            fecha.dateChanged.connect(self.timer_filtro.start)
+        for spin in (self.spin_min, self.spin_max):
+            spin.valueChanged.connect(self.timer_filtro.start)
+
+    def crear_fecha(self):
+        fecha = QDateEdit()
+        fecha.setCalendarPopup(True)
+        fecha.setDisplayFormat("dd/MM/yyyy")
+        fecha.setMinimumDate(QDate(2000, 1, 1))
+        fecha.setSpecialValueText("—")  # En el mínimo muestra "—" (sin límite)
+        fecha.setDate(fecha.minimumDate())
+        return fecha
+
+    def crear_importe(self):
+        spin = QSpinBox()
+        spin.setRange(0, 100000000)
+        spin.setPrefix("$ ")
+        spin.setSpecialValueText("—")
+        return spin
+
+    @staticmethod
+    def valor_fecha(fecha):
+        return None if fecha.date() == fecha.minimumDate() else fecha.date().toString("yyyy-MM-dd")
+
+    @staticmethod
+    def valor_importe(spin):
+        return None if spin.value() == spin.minimum() else spin.value()
+
+    def limpiar_filtros(self):
+        self.input_filtro.clear()
+        for fecha in (self.fecha_desde, self.fecha_hasta):
+            fecha.setDate(fecha.minimumDate())
+        for spin in (self.spin_min, self.spin_max):
+            spin.setValue(spin.minimum())
+
+    def cargar_datos(self, forzar=False):
+        """
+        Muestra el historial de la copia local al instante (sin tocar la red).
+        Si hace falta sincronizar con Drive (forzar=True, o la última sincronización
+        venció) se hace en segundo plano (y se arman tabla e índice allá), y se vuelve
+        a mostrar al terminar.
+        """
+        self.mostrar_datos()
+        if not forzar and self.backend.historial_al_dia():
             return
+        tarea = self.tareas.lanzar(
+            self.sincronizar_en_fondo, clave="cargar_historial",
+            al_terminar=lambda _: self.mostrar_datos(),
+            al_fallar=lambda e: self.mostrar_datos(),
+            al_finalizar=lambda: self.btn_refresh.setEnabled(True)
+        )
+        if tarea:
+            self.btn_refresh.setEnabled(False)
+            self.lbl_cantidad.setText("🔄 Sincronizando con Drive...")
+
+    def sincronizar_en_fondo(self):
+        """Corre en el pool: trae lo nuevo de Drive y deja tabla e índice listos en la cache"""
+        self.backend.asegurar_historial_sincronizado(forzar=True)
+        self.backend.obtener_indice_historial(sincronizar=False)
+
+    def mostrar_datos(self):
+        self.modelo.cargar()
+        self.ajustar_columnas()
+        self.actualizar_cantidad()
+        self.tabla.scrollToBottom()  # Lo más nuevo está al final
+
+    def aplicar_filtro(self):
+        self.modelo.filtrar(
+            texto=self.input_filtro.text().strip(),
+            desde=self.valor_fecha(self.fecha_desde), hasta=self.valor_fecha(self.fecha_hasta),
+            minimo=self.valor_importe(self.spin_min), maximo=self.valor_importe(self.spin_max)
+        )
+        self.actualizar_cantidad()
+
+    def actualizar_cantidad(self):
+        total = len(self.modelo.tabla) if self.modelo.tabla is not None else 0
+        visibles = self.modelo.rowCount()
+        texto = f"{total} registros" if visibles == total else f"{visibles} de {total} registros"
+        self.lbl_cantidad.setText(texto)
 
-        # Asumimos que la primera fila es el encabezado en Drive, la saltamos
-        filas_datos = datos_brutos[1:] 
+    def ajustar_columnas(self):
+        """Ancho de cada columna según el encabezado y una muestra de filas (no todas)"""
+        cantidad = self.modelo.rowCount()
+        extremos = self.MUESTRA_ANCHOS // 4
+        muestra = set(range(min(extremos, cantidad))) | set(range(max(0, cantidad - extremos), cantidad))
+        if cantidad:
+            muestra |= set(np.linspace(0, cantidad - 1, self.MUESTRA_ANCHOS // 2, dtype=int).tolist())
 
-        self.tabla.setRowCount(len(filas_datos))
-        
-        for i, fila in enumerate(filas_datos):
-            for j, valor in enumerate(fila):
-                # Protección por si la fila tiene menos columnas
-                if j < self.tabla.columnCount():
-                    item = QTableWidgetItem(str(valor))
-                    item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                    self.tabla.setItem(i, j, item)
+        filas = self.modelo.muestra(sorted(muestra))
+        medida = self.tabla.fontMetrics()
+        for j in range(self.modelo.columnCount()):
+            textos = [str(self.modelo.headerData(j, Qt.Orientation.Horizontal))]
+            textos += [str(f[j]) for f in filas if j < len(f)]
+            ancho = max(medida.horizontalAdvance(t) for t in textos) + 24
+            self.tabla.setColumnWidth(j, min(ancho, 300))
 
     def borrar_fila(self):
         """Lógica para borrar"""
         filas_seleccionadas = self.tabla.selectionModel().selectedRows()
-        
+
         if not filas_seleccionadas:
             QMessageBox.warning(self, "Alerta", "Por favor selecciona una fila para borrar.")
             return
 
-        # Obtenemos el índice visual (0, 1, 2...)
-        indice = filas_seleccionadas[0].row()
-        
+        # El renglón visible puede estar ordenado o filtrado: se borra por la clave de la fila
+        # (y con su contenido, para no borrar otra si el historial cambió mientras tanto)
+        renglon = filas_seleccionadas[0].row()
+        posicion = self.modelo.posicion(renglon)
+        fila = list(self.modelo.fila(renglon))
+
         # Confirmación de seguridad
         confirmacion = QMessageBox.question(
-            self, "Confirmar Borrado", 
+            self, "Confirmar Borrado",
             "¿Estás seguro de que quieres borrar este registro permanentemente de Google Drive?",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
-        
+
         if confirmacion == QMessageBox.StandardButton.Yes:
-            # Llamamos al backend
-            exito = self.backend.borrar_fila_historial(indice)
-            
-            if exito:
-                QMessageBox.information(self, "Listo", "Fila eliminada correctamente.")
-                self.cargar_datos() # Recargamos para ver el cambio
-            else:
-                QMessageBox.critical(self, "Error", "No se pudo borrar la fila en Drive. Revisa tu conexión.")
\ No newline at end of file
+            # Llamamos al backend (en segundo plano: borrar espera a Drive)
+            tarea = self.tareas.lanzar(
+                self.backend.borrar_fila_historial, posicion, fila, clave="borrar_historial",
+                al_terminar=self.al_borrar, al_fallar=lambda e: self.al_borrar(False),
+                al_finalizar=lambda: self.btn_delete.setEnabled(True)
+            )
+            if tarea:
+                self.btn_delete.setEnabled(False)
+
+    def al_borrar(self, exito):
+        if exito:
+            QMessageBox.information(self, "Listo", "Fila eliminada correctamente.")
+            self.cargar_datos() # Recargamos para ver el cambio
+        else:
+            QMessageBox.critical(self, "Error", "No se pudo borrar la fila en Drive. Revisa tu conexión "
+                                 "(o el historial cambió: se recarga para que elijas de nuevo).")
+            self.cargar_datos()
@@ -1,17 +1,145 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QFormLayout, QGroupBox, 
     QPushButton, QLabel, QLineEdit, QComboBox, QCheckBox, 
-    QSpinBox, QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
-    QAbstractItemView
+    QSpinBox, QTableView, QHeaderView, QMessageBox,
+    QAbstractItemView, QStyledItemDelegate, QStyle
 )
-from PyQt6.QtGui import QColor, QBrush
-from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QRect
 from datetime import datetime
+from tabs.tareas import EjecutorTareas
+
+
+class ModeloInventario(QAbstractTableModel):
+    """
+    El inventario como modelo de Qt (una fila por Rollo, sin items por celda).
+    actualizar() compara cada rollo con lo que se mostró la última vez y avisa
+    solo las filas que cambiaron: descontar stock de un rollo repinta una fila.
+    """
+
+    COLUMNAS = ["Marca", "Material", "Color", "Peso Restante", "Estado"]
+    COL_ESTADO = 4
+    ROL_ROLLO = Qt.ItemDataRole.UserRole
+
+    def __init__(self, backend):
+        super().__init__()
+        self.backend = backend
+        self.rollos = []
+        self.firmas = []  # Lo que se mostró de cada rollo (para saber qué cambió)
+
+    @staticmethod
+    def firma(rollo):
+        return (str(rollo.id), rollo.marca, rollo.tipo, rollo.color, rollo.peso_actual, rollo.peso_inicial)
+
+    def actualizar(self):
+        nuevos = list(self.backend.inventario)
+        firmas = [self.firma(r) for r in nuevos]
+        antes = len(self.rollos)
+
+        # Si se borró o se reordenó algo, se vuelve a armar todo (pasa solo al sincronizar)
+        if len(nuevos) < antes or [f[0] for f in firmas[:antes]] != [f[0] for f in self.firmas]:
+            self.beginResetModel()
+            self.rollos, self.firmas = nuevos, firmas
+            self.endResetModel()
+            return
+
+        # Filas que ya estaban: se avisan solo los tramos que cambiaron
+        cambiadas = [i for i in range(antes) if firmas[i] != self.firmas[i]]
+        self.rollos[:antes], self.firmas[:antes] = nuevos[:antes], firmas[:antes]
+        for desde, hasta in self.tramos(cambiadas):
+            self.dataChanged.emit(self.index(desde, 0), self.index(hasta, len(self.COLUMNAS) - 1))
+
+        # Rollos nuevos (se agregan al final)
+        if len(nuevos) > antes:
+            self.beginInsertRows(QModelIndex(), antes, len(nuevos) - 1)
+            self.rollos, self.firmas = nuevos, firmas
+            self.endInsertRows()
+
+    @staticmethod
+    def tramos(filas):
+        """[1, 2, 3, 7] -> [(1, 3), (7, 7)]"""
+        tramos = []
+        for i in filas:
+            if tramos and tramos[-1][1] == i - 1:
+                tramos[-1] = (tramos[-1][0], i)
+            else:
+                tramos.append((i, i))
+        return tramos
+
+    def rowCount(self, parent=None):
+        return len(self.rollos)
+
+    def columnCount(self, parent=None):
+        return len(self.COLUMNAS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        rollo = self.rollos[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return [
+                rollo.marca or "-",
+                rollo.tipo or "-",
+                rollo.color or "-",
+                f"{int(rollo.peso_actual)}g / {int(rollo.peso_inicial)}g",
+                rollo.estado
+            ][index.column()]
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            # Centrar peso y estado
+            if index.column() >= 3:
+                return Qt.AlignmentFlag.AlignCenter
+            return Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+        if role == self.ROL_ROLLO:
+            return rollo
+        return None
+
+    def headerData(self, seccion, orientacion, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientacion == Qt.Orientation.Horizontal:
+            return self.COLUMNAS[seccion]
+        return None
+
+
+class DelegadoStock(QStyledItemDelegate):
+    """
+    Dibuja las filas del stock: fondo alternado y, en la columna Estado,
+    una barra con lo que queda del rollo pintada según el semáforo.
+    Todo sale de campos ya calculados en el Rollo (porcentaje y estado).
+    """
+
+    FONDO_PAR = QColor("#2b2b2b")
+    FONDO_IMPAR = QColor("#3a3a3a")
+    TEXTO = QColor("white")
+    COLORES_ESTADO = {
+        "🟢": QColor("#27ae60"), "🟡": QColor("#d4ac0d"),
+        "🔴": QColor("#c0392b"), "⚫": QColor("#555555"),
+    }
+
+    def paint(self, painter, option, index):
+        painter.save()
+        if option.state & QStyle.StateFlag.State_Selected:
+            fondo = option.palette.highlight().color()
+        else:
+            fondo = self.FONDO_PAR if index.row() % 2 == 0 else self.FONDO_IMPAR
+        painter.fillRect(option.rect, fondo)
+
+        if index.column() == ModeloInventario.COL_ESTADO:
+            rollo = index.data(ModeloInventario.ROL_ROLLO)
+            barra = option.rect.adjusted(4, 4, -4, -4)
+            lleno = max(0.0, min(rollo.porcentaje, 100.0)) / 100
+            color = self.COLORES_ESTADO.get(rollo.estado[:1], self.COLORES_ESTADO["⚫"])
+            painter.fillRect(QRect(barra.x(), barra.y(), int(barra.width() * lleno), barra.height()), color)
+
+        painter.setPen(self.TEXTO)
+        alineacion = index.data(Qt.ItemDataRole.TextAlignmentRole)
+        painter.drawText(option.rect.adjusted(6, 0, -6, 0), alineacion, index.data())
+        painter.restore()
+
 
 class TabInventario(QWidget):
     def __init__(self, backend):
         super().__init__()
         self.backend = backend
+        self.tareas = EjecutorTareas.compartido()
         self.initUI()
 
     def initUI(self):
@@ -53,34 +181,34 @@ class TabInventario(QWidget):
         row3.addWidget(QLabel("Costo Rollo:"))
         row3.addWidget(self.spin_precio)
 
-        btn_add = QPushButton("GUARDAR EN STOCK 💾")
-        btn_add.setCursor(Qt.CursorShape.PointingHandCursor)
-        btn_add.setStyleSheet("background-color: #8e44ad; color: white; font-weight: bold; padding: 8px;")
-        btn_add.clicked.connect(self.agregar_stock)
+        self.btn_add = QPushButton("GUARDAR EN STOCK 💾")
+        self.btn_add.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_add.setStyleSheet("background-color: #8e44ad; color: white; font-weight: bold; padding: 8px;")
+        self.btn_add.clicked.connect(self.agregar_stock)
 
         form_layout = QVBoxLayout()
         form_layout.addLayout(row1)
         form_layout.addLayout(row2)
         form_layout.addLayout(row3)
-        form_layout.addWidget(btn_add)
+        form_layout.addWidget(self.btn_add)
         
         group_add.setLayout(form_layout)
         layout.addWidget(group_add)
 
         # --- 2. BARRA DE HERRAMIENTAS ---
         h_tools = QHBoxLayout()
-        btn_refresh = QPushButton("🔄 Sincronizar con Nube")
-        btn_refresh.clicked.connect(self.descargar_y_actualizar) # Conectado a la nueva función de recarga
-        h_tools.addWidget(btn_refresh)
+        self.btn_refresh = QPushButton("🔄 Sincronizar con Nube")
+        self.btn_refresh.clicked.connect(self.descargar_y_actualizar) # Conectado a la nueva función de recarga
+        h_tools.addWidget(self.btn_refresh)
         h_tools.addStretch()
         layout.addLayout(h_tools)
 
-        # --- 3. TABLA ---
-        self.tabla = QTableWidget()
-        # Nuevas columnas para mostrar estado real
-        cols = ["Marca", "Material", "Color", "Peso Restante", "Estado"]
-        self.tabla.setColumnCount(len(cols))
-        self.tabla.setHorizontalHeaderLabels(cols)
+        # --- 3. TABLA (modelo/vista: el delegado dibuja fondo y semáforo) ---
+        self.modelo = ModeloInventario(self.backend)
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
+        self.tabla.setItemDelegate(DelegadoStock(self.tabla))
+        self.tabla.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         
         self.tabla.verticalHeader().setVisible(False)
         self.tabla.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
@@ -108,9 +236,17 @@ class TabInventario(QWidget):
         # DATOS PARA DRIVE: Enviamos Peso dos veces (Inicial y Actual al principio son iguales)
         # El ID lo pone el backend al principio
         fila_drive = [fecha, marca, tipo, color, acabado, peso, peso, precio]
-        
-        ok = self.backend.agregar_stock_nube(fila_drive)
 
+        # La subida a Drive va en segundo plano; la clave evita guardar dos veces con doble clic
+        tarea = self.tareas.lanzar(
+            self.backend.agregar_stock_nube, fila_drive, clave="alta_stock",
+            al_terminar=self.al_agregar_stock, al_fallar=lambda e: self.al_agregar_stock(False),
+            al_finalizar=lambda: self.btn_add.setEnabled(True)
+        )
+        if tarea:
+            self.btn_add.setEnabled(False)
+
+    def al_agregar_stock(self, ok):
         if ok: 
             QMessageBox.information(self, "Éxito", "✅ Rollo agregado correctamente.")
             self.input_color.clear()
@@ -121,63 +257,27 @@ class TabInventario(QWidget):
         self.actualizar_tabla()
 
     def descargar_y_actualizar(self):
-        """Fuerza la descarga de datos reales desde Drive"""
-        self.tabla.setDisabled(True)
-        ok = self.backend.forzar_descarga_inventario()
+        """Fuerza la descarga de datos reales desde Drive (en segundo plano)"""
+        tarea = self.tareas.lanzar(
+            self.backend.forzar_descarga_inventario, clave="sync_inventario",
+            al_terminar=self.al_descargar, al_fallar=lambda e: self.al_descargar(False),
+            al_finalizar=lambda: self.btn_refresh.setEnabled(True)
+        )
+        if tarea:
+            self.btn_refresh.setEnabled(False)
+
+    def al_descargar(self, ok):
         if ok:
             self.actualizar_tabla()
             QMessageBox.information(self, "Sync", "Inventario actualizado desde la nube.")
         else:
             QMessageBox.warning(self, "Error", "No se pudo conectar a Drive.")
-        self.tabla.setDisabled(False)
 
     def actualizar_tabla(self):
-        self.tabla.setRowCount(0)
-        
-        bg_par = QColor("#2b2b2b")
-        bg_impar = QColor("#3a3a3a")
-        txt_color = QBrush(QColor("white"))
-
-        for item in self.backend.inventario:
-            if not isinstance(item, dict): continue
-
-            # Extraer datos seguros
-            marca = item.get("Marca") or item.get("marca") or "-"
-            tipo = item.get("Tipo") or item.get("tipo") or "-"
-            col = item.get("Color") or item.get("color") or "-"
-            
-            # Pesos
-            try:
-                p_ini = float(item.get("Peso_Inicial") or 0)
-                p_act = float(item.get("Peso_Actual") or p_ini) # Si no existe actual, asumimos lleno
-            except:
-                p_ini, p_act = 1000, 1000
-
-            # Lógica de Estado (Semáforo)
-            porcentaje = (p_act / p_ini * 100) if p_ini > 0 else 0
-            estado_txt = "🟢 Lleno"
-            if porcentaje < 50: estado_txt = "🟡 Medio"
-            if porcentaje < 20: estado_txt = "🔴 Poco"
-            if p_act <= 0: estado_txt = "⚫ Vacío"
-
-            vals = [
-                marca,
-                tipo,
-                col,
-                f"{int(p_act)}g / {int(p_ini)}g",
-                estado_txt
-            ]
-
-            row = self.tabla.rowCount()
-            self.tabla.insertRow(row)
-
-            for i, val in enumerate(vals):
-                celda = QTableWidgetItem(str(val))
-                celda.setForeground(txt_color)
-                if row % 2 == 0: celda.setBackground(bg_par)
-                else: celda.setBackground(bg_impar)
-                
-                if i >= 3: # Centrar peso y estado
-                    celda.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                
-                self.tabla.setItem(row, i, celda)
\ No newline at end of file
+        """Muestra el inventario del backend (solo se repintan los rollos que cambiaron)"""
+        self.modelo.actualizar()
+
+    def showEvent(self, event):
+        # Al volver a la pestaña se reflejan los descuentos hechos desde otras pestañas
+        super().showEvent(event)
+        self.actualizar_tabla()
@@ -0,0 +1,187 @@
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QGroupBox, QPushButton, QLabel,
+    QLineEdit, QSpinBox, QCheckBox, QTableWidget, QTableWidgetItem,
+    QHeaderView, QMessageBox, QFileDialog, QAbstractItemView
+)
+from PyQt6.QtGui import QColor, QBrush
+from PyQt6.QtCore import Qt
+import os
+import cotizacion_lote
+from tabs.tareas import EjecutorTareas
+
+
+class TabLote(QWidget):
+    """Cotiza un pedido entero desde una planilla (CSV / XLSX) de piezas"""
+
+    COLUMNAS = ["Pieza", "Material", "Gramos", "Tiempo", "Cant", "Diseño", "Unitario", "Total", "Estado"]
+
+    def __init__(self, backend):
+        super().__init__()
+        self.backend = backend
+        self.tareas = EjecutorTareas.compartido()
+        self.piezas = []
+        self.resultado = None
+        self.initUI()
+
+    def initUI(self):
+        layout = QVBoxLayout()
+
+        # --- 1. PLANILLA Y DATOS DEL PEDIDO ---
+        group = QGroupBox("📂 Pedido desde Planilla")
+        group.setStyleSheet("QGroupBox { font-weight: bold; margin-top: 10px; }")
+        g_layout = QVBoxLayout()
+
+        ayuda = QLabel("Columnas: pieza | gramos | tiempo | cantidad | rollo (ID) o precio_kg | diseno")
+        ayuda.setStyleSheet("color: #888; font-style: italic; font-size: 12px;")
+        g_layout.addWidget(ayuda)
+
+        row1 = QHBoxLayout()
+        btn_abrir = QPushButton("Elegir archivo...")
+        btn_abrir.clicked.connect(self.abrir_archivo)
+        self.lbl_archivo = QLabel("Ningún archivo cargado")
+        row1.addWidget(btn_abrir)
+        row1.addWidget(self.lbl_archivo)
+        row1.addStretch()
+        g_layout.addLayout(row1)
+
+        row2 = QHBoxLayout()
+        self.input_cliente = QLineEdit()
+        self.input_cliente.setPlaceholderText("Nombre del cliente...")
+        self.spin_margen = QSpinBox()
+        self.spin_margen.setValue(0)
+        self.spin_margen.setSuffix("%")
+        self.spin_margen.setPrefix("Fallo: ")
+        self.spin_margen.valueChanged.connect(self.recalcular)
+        self.chk_stock = QCheckBox("Descontar stock")
+        self.chk_stock.setChecked(True)
+        row2.addWidget(QLabel("👤 Cliente:"))
+        row2.addWidget(self.input_cliente)
+        row2.addWidget(self.spin_margen)
+        row2.addWidget(self.chk_stock)
+        g_layout.addLayout(row2)
+
+        group.setLayout(g_layout)
+        layout.addWidget(group)
+
+        # --- 2. TABLA DE LÍNEAS ---
+        self.tabla = QTableWidget()
+        self.tabla.setColumnCount(len(self.COLUMNAS))
+        self.tabla.setHorizontalHeaderLabels(self.COLUMNAS)
+        self.tabla.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.tabla.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.tabla)
+
+        # --- 3. TOTALES Y GUARDADO ---
+        h_bots = QHBoxLayout()
+        self.lbl_total = QLabel("")
+        self.lbl_total.setStyleSheet("font-size: 14px; font-weight: bold;")
+        h_bots.addWidget(self.lbl_total)
+        h_bots.addStretch()
+
+        self.btn_save = QPushButton("💾 GUARDAR PEDIDO")
+        self.btn_save.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_save.setMinimumHeight(35)
+        self.btn_save.setStyleSheet("background-color: #2980b9; color: white; font-weight: bold; border-radius: 4px;")
+        self.btn_save.clicked.connect(self.guardar)
+        h_bots.addWidget(self.btn_save)
+        layout.addLayout(h_bots)
+
+        self.setLayout(layout)
+
+    def abrir_archivo(self):
+        ruta, _ = QFileDialog.getOpenFileName(
+            self, "Planilla de piezas", "", "Planillas (*.csv *.xlsx);;Todos (*)"
+        )
+        if not ruta:
+            return
+        try:
+            self.piezas = cotizacion_lote.leer_piezas(ruta)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"No se pudo leer la planilla:\n{e}")
+            return
+        self.lbl_archivo.setText(f"{os.path.basename(ruta)} ({len(self.piezas)} piezas)")
+        self.recalcular()
+
+    def recalcular(self):
+        if not self.piezas:
+            return
+        self.resultado = cotizacion_lote.cotizar_piezas(
+            self.piezas, self.backend.configuracion,
+            buscar_rollo=self.backend.buscar_rollo,
+            margen_fallo=self.spin_margen.value() / 100
+        )
+        self.actualizar_tabla()
+
+    def actualizar_tabla(self):
+        lineas = self.resultado["lineas"]
+        self.tabla.setRowCount(len(lineas))
+        rojo = QBrush(QColor("#e74c3c"))
+        for i, l in enumerate(lineas):
+            valores = [
+                l["pieza"], l["material"], f"{l['gramos']:g}g", f"{l['horas']:.2f}h",
+                str(l["cantidad"]), f"{l['hs_diseno']:g} hs",
+                f"${l['unitario']:,.2f}", f"${l['total']:,.2f}", l["error"] or "✅"
+            ]
+            for j, valor in enumerate(valores):
+                item = QTableWidgetItem(valor)
+                if l["error"]:
+                    item.setForeground(rojo)
+                self.tabla.setItem(i, j, item)
+
+        r = self.resultado
+        texto = f"💰 TOTAL PEDIDO: ${r['total']:,.2f} | Material: {r['gramos']:,.0f}g"
+        if r["errores"]:
+            texto += f" | ⚠️ {len(r['errores'])} líneas con error"
+        self.lbl_total.setText(texto)
+
+    def guardar(self):
+        if self.tareas.esta_en_curso("guardar_lote"):
+            return  # Ya se está guardando (doble clic)
+        if not self.resultado or not self.resultado["total"]:
+            QMessageBox.warning(self, "Atención", "Primero cargá una planilla con piezas válidas.")
+            return
+        if not self.input_cliente.text():
+            QMessageBox.warning(self, "Atención", "Falta el nombre del cliente.")
+            return
+        if self.resultado["errores"]:
+            resp = QMessageBox.question(self, "Líneas con error",
+                "Hay líneas con error que no se van a guardar:\n" + "\n".join(self.resultado["errores"][:10]) +
+                "\n¿Guardar el resto?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if resp == QMessageBox.StandardButton.No:
+                return
+
+        filas = cotizacion_lote.filas_historial(self.resultado, self.input_cliente.text())
+        descuentos = cotizacion_lote.descuentos_stock(self.resultado) if self.chk_stock.isChecked() else {}
+
+        faltantes = []
+        for id_rollo, gramos in descuentos.items():
+            rollo = self.backend.buscar_rollo(id_rollo)
+            if rollo and rollo.peso_actual < gramos:
+                faltantes.append(f"{rollo.marca} {rollo.tipo} - {rollo.color}: "
+                                 f"requiere {int(gramos)}g, quedan {int(rollo.peso_actual)}g")
+        if faltantes:
+            resp = QMessageBox.question(self, "Stock Insuficiente",
+                "\n".join(faltantes) + "\n¿Deseas guardar igual y dejar el stock en negativo?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if resp == QMessageBox.StandardButton.No:
+                return
+
+        # Los pesos van a Drive: se guarda en segundo plano y un doble clic no guarda dos veces
+        tarea = self.tareas.lanzar(
+            self.backend.guardar_lote, filas, descuentos, clave="guardar_lote",
+            al_terminar=lambda ok: self.al_guardar(ok, len(filas)), al_fallar=lambda e: self.al_guardar(False, 0),
+            al_finalizar=lambda: self.btn_save.setEnabled(True)
+        )
+        if tarea:
+            self.btn_save.setEnabled(False)
+
+    def al_guardar(self, ok, lineas):
+        if ok:
+            QMessageBox.information(self, "Hecho", f"✅ Pedido guardado ({lineas} líneas).")
+            self.piezas, self.resultado = [], None
+            self.tabla.setRowCount(0)
+            self.lbl_total.setText("")
+            self.lbl_archivo.setText("Ningún archivo cargado")
+        else:
+            QMessageBox.critical(self, "Error", "Falló conexión Drive.")
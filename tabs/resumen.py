@@ -0,0 +1,133 @@
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QGroupBox, QLabel, QComboBox,
+    QPushButton, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
+)
+from PyQt6.QtCore import Qt
+import analitica
+from tabs.tareas import EjecutorTareas
+
+
+class TabResumen(QWidget):
+    """
+    Tablero de ventas: totales del período, ventas por mes, mejores clientes,
+    material usado y tipo de trabajo. Lee los resúmenes pre-agregados del backend,
+    así que se actualiza al instante aunque el historial sea enorme. Lo que puede
+    tardar es sincronizar el historial antes: eso va en segundo plano y mientras
+    tanto se siguen viendo los números anteriores.
+    """
+
+    PERIODOS = [("Este mes", "mes"), ("Este trimestre", "trimestre"), ("Este año", "año"), ("Todo", "todo")]
+
+    def __init__(self, backend):
+        super().__init__()
+        self.backend = backend
+        self.tareas = EjecutorTareas.compartido()
+        self.repetir = False  # Se pidió actualizar mientras había una lectura en curso
+        self.initUI()
+
+    def initUI(self):
+        layout = QVBoxLayout()
+
+        # --- 1. PERÍODO Y TOTALES ---
+        h_top = QHBoxLayout()
+        self.combo_periodo = QComboBox()
+        for texto, clave in self.PERIODOS:
+            self.combo_periodo.addItem(texto, clave)
+        self.combo_periodo.currentIndexChanged.connect(self.actualizar)
+        btn_refresh = QPushButton("🔄 Actualizar")
+        btn_refresh.clicked.connect(self.actualizar)
+        h_top.addWidget(QLabel("📅 Período:"))
+        h_top.addWidget(self.combo_periodo)
+        h_top.addWidget(btn_refresh)
+        h_top.addStretch()
+        layout.addLayout(h_top)
+
+        self.lbl_totales = QLabel("")
+        self.lbl_totales.setStyleSheet("font-size: 16px; font-weight: bold; margin: 6px;")
+        layout.addWidget(self.lbl_totales)
+
+        # --- 2. TABLAS ---
+        grilla = QGridLayout()
+        self.tabla_meses = self.crear_tabla(grilla, "📆 Ventas por Mes", 0, 0, "Mes")
+        self.tabla_clientes = self.crear_tabla(grilla, "👤 Mejores Clientes", 0, 1, "Cliente")
+        self.tabla_materiales = self.crear_tabla(grilla, "🧵 Material Usado", 1, 0, "Material")
+        self.tabla_tipos = self.crear_tabla(grilla, "🏷️ Tipo de Trabajo", 1, 1, "Tipo")
+        layout.addLayout(grilla)
+
+        self.setLayout(layout)
+
+    def crear_tabla(self, grilla, titulo, fila, columna, encabezado):
+        group = QGroupBox(titulo)
+        group.setStyleSheet("QGroupBox { font-weight: bold; }")
+        g_layout = QVBoxLayout()
+        tabla = QTableWidget()
+        cols = [encabezado, "Trabajos", "Unidades", "Total", "Gramos", "Horas"]
+        tabla.setColumnCount(len(cols))
+        tabla.setHorizontalHeaderLabels(cols)
+        tabla.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        tabla.verticalHeader().setVisible(False)
+        tabla.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        g_layout.addWidget(tabla)
+        group.setLayout(g_layout)
+        grilla.addWidget(group, fila, columna)
+        return tabla
+
+    def llenar(self, tabla, filas):
+        tabla.setRowCount(len(filas))
+        for i, r in enumerate(filas):
+            valores = [
+                r["clave"], f"{r['trabajos']:.0f}", f"{r['unidades']:.0f}",
+                f"${r['total']:,.2f}", f"{r['gramos']:,.0f}g", f"{r['horas']:,.1f}h"
+            ]
+            for j, valor in enumerate(valores):
+                item = QTableWidgetItem(valor)
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                tabla.setItem(i, j, item)
+
+    def actualizar(self):
+        # obtener_resumen puede sincronizar el historial con Drive: se lee en segundo plano
+        tarea = self.tareas.lanzar(
+            self.leer_resumenes, self.combo_periodo.currentData(), clave="resumen",
+            al_terminar=self.al_leer_resumenes,
+            al_fallar=lambda e: self.lbl_totales.setText(f"⚠️ No se pudo leer el resumen: {e}"),
+            al_finalizar=self.al_finalizar_lectura
+        )
+        if tarea is None:
+            self.repetir = True  # Al terminar la lectura en curso se vuelve a leer (ej: cambió el período)
+        elif not self.lbl_totales.text():
+            self.lbl_totales.setText("⏳ Cargando resumen...")
+
+    def leer_resumenes(self, periodo):
+        """Corre en el pool: todo lo que muestra la pestaña para un período"""
+        desde, hasta = analitica.meses_del_periodo(periodo)
+        return periodo, {
+            "mes": self.backend.obtener_resumen("mes", desde, hasta),
+            "cliente": self.backend.obtener_resumen("cliente", desde, hasta)[:20],
+            "material": self.backend.obtener_resumen("material", desde, hasta),
+            "tipo": self.backend.obtener_resumen("tipo", desde, hasta),
+        }
+
+    def al_leer_resumenes(self, resultado):
+        periodo, resumen = resultado
+        if periodo != self.combo_periodo.currentData():
+            return  # Ya se eligió otro período: lo va a mostrar la próxima lectura
+        meses = resumen["mes"]
+        total = analitica.totales(meses)
+        self.lbl_totales.setText(
+            f"💰 Ventas: ${total['total']:,.2f} | 🧾 Trabajos: {total['trabajos']:.0f} | "
+            f"🧵 Material: {total['gramos'] / 1000:,.2f} kg | ⏱ {total['horas']:,.0f} h de máquina"
+        )
+        self.llenar(self.tabla_meses, list(reversed(meses)))
+        self.llenar(self.tabla_clientes, resumen["cliente"])
+        self.llenar(self.tabla_materiales, resumen["material"])
+        self.llenar(self.tabla_tipos, resumen["tipo"])
+
+    def al_finalizar_lectura(self):
+        if self.repetir:
+            self.repetir = False
+            self.actualizar()
+
+    def showEvent(self, event):
+        # Se refresca cada vez que se abre la pestaña (sin sincronizar pendiente es solo leer los resúmenes)
+        super().showEvent(event)
+        self.actualizar()
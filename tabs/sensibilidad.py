@@ -0,0 +1,212 @@
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QGroupBox, QFormLayout, QLabel,
+    QComboBox, QSpinBox, QDoubleSpinBox, QTableView, QAbstractItemView
+)
+from PyQt6.QtGui import QColor, QBrush
+from PyQt6.QtCore import Qt, QAbstractTableModel
+import time
+import numpy as np
+import cotizacion
+import cotizacion_lote
+
+
+class EjeBarrido(QGroupBox):
+    """Un parámetro a variar: cuál, desde, hasta y cuántos pasos"""
+
+    def __init__(self, titulo, opcional=False):
+        super().__init__(titulo)
+        form = QFormLayout()
+        self.combo = QComboBox()
+        if opcional:
+            self.combo.addItem("— Ninguno —", None)
+        for clave, etiqueta in cotizacion.PARAMETROS_BARRIDO.items():
+            self.combo.addItem(etiqueta, clave)
+        self.spin_desde = QDoubleSpinBox(); self.spin_desde.setRange(0, 10000000); self.spin_desde.setDecimals(2)
+        self.spin_hasta = QDoubleSpinBox(); self.spin_hasta.setRange(0, 10000000); self.spin_hasta.setDecimals(2)
+        self.spin_pasos = QSpinBox(); self.spin_pasos.setRange(2, 200); self.spin_pasos.setValue(11)
+        form.addRow("Parámetro:", self.combo)
+        form.addRow("Desde:", self.spin_desde)
+        form.addRow("Hasta:", self.spin_hasta)
+        form.addRow("Pasos:", self.spin_pasos)
+        self.setLayout(form)
+
+    def parametro(self):
+        return self.combo.currentData()
+
+    def centrar_en(self, base):
+        """Rango por defecto: de la mitad al 150% del valor actual"""
+        for spin in (self.spin_desde, self.spin_hasta):
+            spin.blockSignals(True)
+        self.spin_desde.setValue(base * 0.5)
+        self.spin_hasta.setValue(base * 1.5)
+        for spin in (self.spin_desde, self.spin_hasta):
+            spin.blockSignals(False)
+
+    def valores(self):
+        return np.linspace(self.spin_desde.value(), self.spin_hasta.value(), self.spin_pasos.value())
+
+    def conectar(self, funcion):
+        for spin in (self.spin_desde, self.spin_hasta, self.spin_pasos):
+            spin.valueChanged.connect(funcion)
+
+
+class ModeloGrilla(QAbstractTableModel):
+    """
+    La grilla de precios como modelo: Qt solo pide las celdas visibles,
+    así una grilla de 100x100 se muestra sin crear 10.000 items.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.grilla = np.zeros((0, 0))
+        self.tonos = self.grilla
+        self.encabezado_x = []
+        self.encabezado_y = []
+
+    def cargar(self, grilla, valores_x, valores_y):
+        self.beginResetModel()
+        self.grilla = grilla
+        self.encabezado_x = [f"{v:g}" for v in valores_x]
+        self.encabezado_y = [f"{v:g}" for v in valores_y] if valores_y is not None else ["Total"]
+        # Mapa de calor: verde = más barato, rojo = más caro
+        minimo, maximo = (grilla.min(), grilla.max()) if grilla.size else (0, 0)
+        escala = (grilla - minimo) / (maximo - minimo) if maximo > minimo else np.zeros_like(grilla)
+        self.tonos = (120 * (1 - escala)).astype(int)
+        self.endResetModel()
+
+    def rowCount(self, parent=None):
+        return self.grilla.shape[0]
+
+    def columnCount(self, parent=None):
+        return self.grilla.shape[1]
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        i, j = index.row(), index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            return f"${self.grilla[i, j]:,.0f}"
+        if role == Qt.ItemDataRole.BackgroundRole:
+            return QBrush(QColor.fromHsv(int(self.tonos[i, j]), 140, 200))
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return QBrush(QColor("black"))
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def headerData(self, seccion, orientacion, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientacion == Qt.Orientation.Horizontal:
+            return self.encabezado_x[seccion]
+        return self.encabezado_y[seccion]
+
+
+class DialogoSensibilidad(QDialog):
+    """
+    ¿Qué pasa si sube la luz o el filamento?
+    Muestra el total cobrado variando uno o dos parámetros de la configuración,
+    para la cotización actual o para los últimos trabajos del historial.
+    """
+
+    def __init__(self, backend, trabajo, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+        self.trabajo = trabajo  # dict de la cotización actual (puede ser None)
+        self.setWindowTitle("📈 Sensibilidad de Precios")
+        self.resize(900, 600)
+        self.initUI()
+        self.al_cambiar_parametro()
+
+    def initUI(self):
+        layout = QVBoxLayout()
+
+        # --- 1. ORIGEN Y EJES ---
+        h_top = QHBoxLayout()
+
+        group_origen = QGroupBox("Trabajos")
+        form = QFormLayout()
+        self.combo_origen = QComboBox()
+        if self.trabajo:
+            self.combo_origen.addItem("Cotización actual", "actual")
+        self.combo_origen.addItem("Últimos del historial", "historial")
+        self.spin_n = QSpinBox(); self.spin_n.setRange(1, 5000); self.spin_n.setValue(20)
+        self.spin_precio_kg = QDoubleSpinBox(); self.spin_precio_kg.setRange(0, 1000000); self.spin_precio_kg.setPrefix("$ ")
+        self.spin_precio_kg.setValue(self.trabajo["precio_kg"] if self.trabajo else 20000)
+        form.addRow("Origen:", self.combo_origen)
+        form.addRow("Cantidad (N):", self.spin_n)
+        form.addRow("$/kg historial:", self.spin_precio_kg)
+        group_origen.setLayout(form)
+        h_top.addWidget(group_origen)
+
+        self.eje_x = EjeBarrido("Eje X (columnas)")
+        self.eje_y = EjeBarrido("Eje Y (filas)", opcional=True)
+        h_top.addWidget(self.eje_x)
+        h_top.addWidget(self.eje_y)
+        layout.addLayout(h_top)
+
+        # --- 2. RESULTADO ---
+        self.lbl_base = QLabel("")
+        self.lbl_base.setStyleSheet("font-weight: bold;")
+        layout.addWidget(self.lbl_base)
+
+        self.modelo = ModeloGrilla()
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
+        self.tabla.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.tabla)
+
+        self.setLayout(layout)
+
+        # Todo recalcula al instante
+        self.combo_origen.currentIndexChanged.connect(self.recalcular)
+        self.spin_n.valueChanged.connect(self.recalcular)
+        self.spin_precio_kg.valueChanged.connect(self.al_cambiar_parametro)
+        self.eje_x.combo.currentIndexChanged.connect(self.al_cambiar_parametro)
+        self.eje_y.combo.currentIndexChanged.connect(self.al_cambiar_parametro)
+        self.eje_x.conectar(self.recalcular)
+        self.eje_y.conectar(self.recalcular)
+
+    def valor_actual(self, parametro):
+        if parametro == "precio_kg":
+            return self.spin_precio_kg.value()
+        return float(cotizacion.parametros(self.backend.configuracion)[parametro])
+
+    def al_cambiar_parametro(self):
+        for eje in (self.eje_x, self.eje_y):
+            if eje.parametro():
+                eje.centrar_en(self.valor_actual(eje.parametro()))
+        self.recalcular()
+
+    def trabajos(self):
+        if self.combo_origen.currentData() == "actual":
+            return [self.trabajo]
+        return cotizacion_lote.trabajos_desde_tabla(
+            self.backend.obtener_tabla_historial(sincronizar=False), self.spin_n.value(), self.spin_precio_kg.value()
+        )
+
+    def recalcular(self):
+        x, y = self.eje_x.parametro(), self.eje_y.parametro()
+        if x == y:
+            self.lbl_base.setText("⚠️ Elegí dos parámetros distintos.")
+            return
+
+        trabajos = self.trabajos()
+        if not trabajos:
+            self.lbl_base.setText("⚠️ No hay trabajos de impresión para analizar.")
+            self.modelo.cargar(np.zeros((0, 0)), [], [])
+            return
+
+        inicio = time.perf_counter()
+        cfg = self.backend.configuracion
+        valores_x = self.eje_x.valores()
+        valores_y = self.eje_y.valores() if y else None
+        grilla = cotizacion.sensibilidad(trabajos, x, valores_x, y, valores_y, cfg=cfg)
+        base = cotizacion.sensibilidad(trabajos, x, [self.valor_actual(x)], cfg=cfg)[0]
+        if y is None:
+            grilla = grilla[None, :]
+        self.modelo.cargar(grilla, valores_x, valores_y)
+        ms = (time.perf_counter() - inicio) * 1000
+
+        self.lbl_base.setText(
+            f"💰 Total actual ({len(trabajos)} trabajos): ${base:,.2f} | "
+            f"Rango: ${grilla.min():,.2f} a ${grilla.max():,.2f} | ⏱ {ms:.0f} ms"
+        )
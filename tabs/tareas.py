@@ -0,0 +1,148 @@
+"""
+Tareas en segundo plano para la app de escritorio.
+Todo lo que puede esperar a Google (descargas, descuentos de stock, borrados) se
+manda al EjecutorTareas: el botón vuelve enseguida y la ventana no se congela.
+El resultado llega por señales de Qt, o sea que los callbacks corren en el hilo
+de la interfaz y pueden tocar widgets sin problema.
+"""
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class SenalesTarea(QObject):
+    terminada = pyqtSignal(object)    # Lo que devolvió la función
+    fallida = pyqtSignal(str)         # La excepción, como texto
+    progreso = pyqtSignal(int, str)   # Porcentaje (0-100) y qué se está haciendo
+    cancelada = pyqtSignal()
+    finalizada = pyqtSignal()         # Siempre, al final (terminó, falló o se canceló)
+
+
+class Tarea(QRunnable):
+    """
+    Una función para correr en el pool. Si se crea con con_progreso=True, la función
+    recibe la tarea como primer argumento para avisar progreso (tarea.avisar) y para
+    fijarse si la cancelaron (tarea.cancelada) entre paso y paso.
+    Cancelar no corta una llamada a la red que ya salió: el resultado se descarta.
+    """
+
+    def __init__(self, funcion, args=(), kwargs=None, con_progreso=False):
+        super().__init__()
+        self.setAutoDelete(False)  # La referencia la tiene el ejecutor hasta que termina
+        self.funcion = funcion
+        self.args = ((self,) if con_progreso else ()) + tuple(args)
+        self.kwargs = kwargs or {}
+        self.senales = SenalesTarea()
+        self.evento_cancelar = threading.Event()
+
+    @property
+    def cancelada(self):
+        return self.evento_cancelar.is_set()
+
+    def cancelar(self):
+        self.evento_cancelar.set()
+
+    def avisar(self, porcentaje, texto=""):
+        self.senales.progreso.emit(int(porcentaje), texto)
+
+    def run(self):
+        try:
+            if self.cancelada:
+                self.senales.cancelada.emit()
+                return
+            try:
+                resultado = self.funcion(*self.args, **self.kwargs)
+            except Exception as e:
+                print(f"❌ Error en tarea de fondo: {e}")
+                if not self.cancelada:
+                    self.senales.fallida.emit(str(e))
+                return
+            if self.cancelada:
+                self.senales.cancelada.emit()
+            else:
+                self.senales.terminada.emit(resultado)
+        finally:
+            self.senales.finalizada.emit()
+
+
+class EjecutorTareas(QObject):
+    """
+    Pool de hilos de la app (uno solo, compartido por todas las pestañas).
+    Cada tarea puede llevar una 'clave' ("guardar_cotizacion", "sync_inventario", ...):
+    mientras una tarea con esa clave está en curso, lanzar otra igual no hace nada.
+    Así un doble clic en GUARDAR no guarda dos veces.
+    """
+
+    ocupado = pyqtSignal(bool)  # True mientras haya alguna tarea en curso
+
+    _compartido = None
+
+    @classmethod
+    def compartido(cls):
+        # Se crea y se usa desde el hilo de la interfaz, no hace falta lock
+        if cls._compartido is None:
+            cls._compartido = cls()
+        return cls._compartido
+
+    def __init__(self, max_hilos=4):
+        super().__init__()
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(max_hilos)
+        self.en_curso = {}  # clave (o la tarea misma si no tiene) -> Tarea
+
+    def lanzar(self, funcion, *args, clave=None, al_terminar=None, al_fallar=None,
+               al_progreso=None, al_finalizar=None, con_progreso=False, **kwargs):
+        """
+        Corre funcion(*args, **kwargs) en el pool y devuelve la Tarea
+        (o None si ya había una en curso con la misma clave).
+        al_terminar(resultado) / al_fallar(texto) / al_progreso(porcentaje, texto) /
+        al_finalizar() se llaman en el hilo de la interfaz.
+        """
+        if clave is not None and self.esta_en_curso(clave):
+            return None
+        tarea = Tarea(funcion, args, kwargs, con_progreso=con_progreso)
+        identificador = clave if clave is not None else tarea
+        self.en_curso[identificador] = tarea
+
+        senales = tarea.senales
+        if al_terminar:
+            senales.terminada.connect(al_terminar)
+        if al_fallar:
+            senales.fallida.connect(al_fallar)
+        if al_progreso:
+            senales.progreso.connect(al_progreso)
+        # Primero se libera la clave y después se avisa: desde al_finalizar ya se puede relanzar
+        senales.finalizada.connect(lambda: self.quitar(identificador, tarea))
+        if al_finalizar:
+            senales.finalizada.connect(al_finalizar)
+
+        self.pool.start(tarea)
+        self.ocupado.emit(True)
+        return tarea
+
+    def esta_en_curso(self, clave):
+        return clave in self.en_curso
+
+    def quitar(self, identificador, tarea):
+        if self.en_curso.get(identificador) is tarea:
+            del self.en_curso[identificador]
+        if not self.en_curso:
+            self.ocupado.emit(False)
+
+    def cancelar(self, clave):
+        tarea = self.en_curso.get(clave)
+        if tarea is None:
+            return
+        tarea.cancelar()
+        # Si todavía no arrancó, se saca de la fila (y se avisa como cancelada)
+        if self.pool.tryTake(tarea):
+            tarea.senales.cancelada.emit()
+            tarea.senales.finalizada.emit()
+
+    def cancelar_todas(self):
+        for clave in list(self.en_curso):
+            self.cancelar(clave)
+
+    def cerrar(self, espera_ms=10000):
+        """Al cerrar la ventana: lo que no arrancó se cancela, lo que está en curso se espera"""
+        self.cancelar_todas()
+        return self.pool.waitForDone(espera_ms)
@@ -0,0 +1,113 @@
+"""
+Utilidades comunes de los tests: una hoja de Google falsa (en memoria) y motores listos.
+Los tests corren sin conexión: SQLite en una carpeta temporal y la "nube" en listas.
+"""
+import os
+import re
+import sys
+
+import pytest
+
+# Los módulos del proyecto están en la raíz (no es un paquete instalable)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from almacenamiento import MotorSQLite, MotorSheets, ENCABEZADO_HISTORIAL, ENCABEZADO_INVENTARIO  # noqa: E402
+
+
+class Celda:
+    def __init__(self, fila, columna, valor):
+        self.row, self.col, self.value = fila, columna, valor
+
+
+class HojaFalsa:
+    """Lo mínimo de un gspread.Worksheet que usa MotorSheets, sobre una lista de filas"""
+
+    def __init__(self, valores):
+        self.valores = [list(f) for f in valores]
+        self.llamadas = []
+
+    def get_all_values(self):
+        self.llamadas.append("get_all_values")
+        return [[str(v) for v in f] for f in self.valores]
+
+    def get_all_records(self):
+        self.llamadas.append("get_all_records")
+        encabezado = self.valores[0]
+        return [dict(zip(encabezado, f)) for f in self.valores[1:]]
+
+    def get_values(self, rango, **kwargs):
+        self.llamadas.append("get_values")
+        desde, letras, hasta = re.match(r"A(\d+):([A-Z]+)(\d*)", rango).groups()
+        columnas = 0
+        for letra in letras:
+            columnas = columnas * 26 + ord(letra) - 64
+        filas = self.valores[int(desde) - 1:int(hasta) if hasta else None]
+        return [[str(v) for v in f[:columnas]] for f in filas]
+
+    def col_values(self, columna):
+        self.llamadas.append("col_values")
+        return [str(f[columna - 1]) for f in self.valores if len(f) >= columna]
+
+    def append_row(self, fila, **kwargs):
+        self.llamadas.append("append_row")
+        self.valores.append(list(fila))
+
+    def append_rows(self, filas, **kwargs):
+        self.llamadas.append("append_rows")
+        self.valores.extend(list(f) for f in filas)
+
+    def find(self, texto):
+        self.llamadas.append("find")
+        for i, fila in enumerate(self.valores):
+            for j, valor in enumerate(fila):
+                if str(valor) == texto:
+                    return Celda(i + 1, j + 1, valor)
+        return None
+
+    def cell(self, fila, columna):
+        self.llamadas.append("cell")
+        return Celda(fila, columna, self.valores[fila - 1][columna - 1])
+
+    def batch_update(self, cambios, **kwargs):
+        self.llamadas.append("batch_update")
+        for cambio in cambios:
+            letras, fila = re.match(r"([A-Z]+)(\d+)", cambio["range"]).groups()
+            columna = 0
+            for letra in letras:
+                columna = columna * 26 + ord(letra) - 64
+            self.valores[int(fila) - 1][columna - 1] = cambio["values"][0][0]
+
+    def delete_rows(self, fila, hasta=None):
+        self.llamadas.append("delete_rows")
+        del self.valores[fila - 1:(hasta or fila)]
+
+
+def fila_historial(cliente, total=1000, modelo="Gato"):
+    return ["01/10/2026", "Usuario", cliente, modelo, "Impresión", "Elegoo PLA - Rojo", "-",
+            "50", "2h", 1, "0 hs", f"${total:.2f}", f"${total:.2f}"]
+
+
+@pytest.fixture
+def hoja_inventario():
+    return HojaFalsa([
+        ENCABEZADO_INVENTARIO,
+        [1, "01/01/2026", "Elegoo", "PLA", "Rojo", "Normal", 1000, 800, 20000],
+        [2, "01/01/2026", "Grilon", "PETG", "Negro", "Normal", 1000, 150, 25000],
+    ])
+
+
+@pytest.fixture
+def hoja_historial():
+    return HojaFalsa([ENCABEZADO_HISTORIAL, fila_historial("Ana"), fila_historial("Beto")])
+
+
+@pytest.fixture
+def motor_local(tmp_path):
+    motor = MotorSQLite(str(tmp_path / "datos.db"))
+    yield motor
+    motor.conn.close()
+
+
+@pytest.fixture
+def motor_nube(hoja_historial, hoja_inventario):
+    return MotorSheets(hoja_historial, hoja_inventario)
@@ -0,0 +1,12 @@
+; HEADER_BLOCK_START
+; BambuStudio 01.07.04.52
+; model printing time: 1h 2m 3s; total estimated time: 1h 10m 3s
+; total layer number: 120
+; total filament length [mm] : 4210.13
+; total filament volume [cm^3] : 10126.25
+; total filament weight [g] : 12.57
+; filament_diameter: 1.75
+; max_z_height: 24.00
+; HEADER_BLOCK_END
+M83
+G1 X10 Y10 E0.5 F1800
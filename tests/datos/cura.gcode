@@ -0,0 +1,12 @@
+;FLAVOR:Marlin
+;TIME:3723
+;Filament used: 1.5m, 0.25m
+;Layer height: 0.2
+;MINX:10
+;MAXX:20
+;Generated with Cura_SteamEngine 5.4.0
+M82 ;absolute extrusion mode
+G92 E0
+T0
+G1 X10 Y10 E0.5 F1800
+;TIME_ELAPSED:3723.0
@@ -0,0 +1,20 @@
+; generated by PrusaSlicer 2.6.1+win64 on 2026-10-01 at 12:00:00 UTC
+M82 ; absolute extrusion mode
+G92 E0
+G1 Z0.2 F720
+G1 X10 Y10 E0.5 F1800
+G1 X20 Y10 E1.0
+; filament used [mm] = 1234.56
+; filament used [cm3] = 2.97
+; filament used [g] = 3.77
+; filament cost = 0.08
+; total filament used [g] = 3.77
+; total filament cost = 0.08
+; estimated printing time (normal mode) = 1h 2m 3s
+; estimated first layer printing time (normal mode) = 1m 10s
+
+; prusaslicer_config = begin
+; filament_density = 1.27
+; filament_diameter = 1.75
+; filament_type = PETG
+; prusaslicer_config = end
@@ -0,0 +1,277 @@
+"""
+Motores de almacenamiento (SQLite local y espejo en Sheets) y el camino
+sin conexión -> reconexión del backend. Todo corre offline.
+"""
+import pytest
+
+from almacenamiento import MotorSQLite, MotorSheets, fila_como_texto, ENCABEZADO_HISTORIAL, ENCABEZADO_INVENTARIO
+from conftest import HojaFalsa, fila_historial
+
+
+# --- Contrato común: los dos motores tienen que cumplir lo mismo ---
+@pytest.fixture(params=["sqlite", "sheets"])
+def motor(request, tmp_path):
+    if request.param == "sqlite":
+        motor = MotorSQLite(str(tmp_path / "datos.db"))
+        yield motor
+        motor.conn.close()
+    else:
+        yield MotorSheets(HojaFalsa([ENCABEZADO_HISTORIAL]), HojaFalsa([ENCABEZADO_INVENTARIO]))
+
+
+ROLLOS = [
+    [1, "01/01/2026", "Elegoo", "PLA", "Rojo", "Normal", 1000, 800, 20000],
+    [2, "01/01/2026", "Grilon", "PETG", "Negro", "Normal", 1000, 150, 25000],
+]
+
+
+def con_rollos(motor):
+    for fila in ROLLOS:
+        motor.agregar_rollo(fila)
+    return motor
+
+
+def pesos(motor):
+    return {str(r["ID"]): int(r["Peso_Actual"]) for r in motor.leer_inventario()}
+
+
+def clientes(motor):
+    return [f[2] for f in motor.leer_historial()[1:]]
+
+
+def test_agregar_rollo_y_leer_inventario(motor):
+    registros = con_rollos(motor).leer_inventario()
+    assert [fila_como_texto(r.values()) for r in registros] == [fila_como_texto(f) for f in ROLLOS]
+    assert list(registros[0]) == ENCABEZADO_INVENTARIO
+
+
+def test_descontar_peso(motor):
+    con_rollos(motor)
+    assert motor.descontar_peso(1, 120.6) == 679
+    assert pesos(motor) == {"1": 679, "2": 150}
+    assert motor.descontar_peso(99, 10) is None
+
+
+def test_actualizar_pesos(motor):
+    con_rollos(motor)
+    assert motor.actualizar_pesos({1: 700, 2: 100})
+    assert pesos(motor) == {"1": 700, "2": 100}
+    # Si falta un ID no se toca ninguno
+    assert not motor.actualizar_pesos({1: 5, 99: 1})
+    assert pesos(motor) == {"1": 700, "2": 100}
+
+
+def test_agregar_y_leer_historial(motor):
+    motor.agregar_historial([fila_historial("Ana"), fila_historial("Beto", total=250)])
+    valores = motor.leer_historial()
+    assert valores[0] == ENCABEZADO_HISTORIAL
+    assert [fila_como_texto(f) for f in valores[1:]] == \
+        [fila_como_texto(fila_historial("Ana")), fila_como_texto(fila_historial("Beto", total=250))]
+
+
+def test_leer_historial_desde(motor):
+    motor.agregar_historial([fila_historial("Ana"), fila_historial("Beto"), fila_historial("Caro")])
+    assert [f[2] for f in motor.leer_historial_desde(1, 13)] == ["Beto", "Caro"]
+    assert [len(f) for f in motor.leer_historial_desde(2, 3)] == [3]
+    assert motor.leer_historial_desde(3, 13) == []
+
+
+def test_historial_ya_tiene(motor):
+    nuevas = [fila_historial("Caro"), fila_historial("Dani")]
+    motor.agregar_historial([fila_historial("Ana")])
+    assert not motor.historial_ya_tiene(nuevas)
+    assert motor.historial_ya_tiene([])
+
+    motor.agregar_historial(nuevas)
+    motor.agregar_historial([fila_historial("Otra PC")])  # Alguien agregó después
+    assert motor.historial_ya_tiene(nuevas)
+    assert not motor.historial_ya_tiene(nuevas[::-1])
+
+
+def test_borrar_fila_historial(motor):
+    motor.agregar_historial([fila_historial("Ana"), fila_historial("Beto")])
+    # Si el renglón no es la fila esperada no se borra nada
+    assert not motor.borrar_fila_historial(0, fila_historial("Beto"))
+    assert clientes(motor) == ["Ana", "Beto"]
+
+    assert motor.borrar_fila_historial(0, fila_historial("Ana"))
+    assert clientes(motor) == ["Beto"]
+    assert motor.borrar_fila_historial(0)
+    assert clientes(motor) == []
+
+
+# --- Solo MotorSQLite ---
+def test_sqlite_borrar_fila_historial_ajusta_filas_nube(motor_local):
+    motor_local.anexar_historial_nube([fila_historial("Ana"), fila_historial("Beto")])
+    motor_local.agregar_historial([fila_historial("Solo local")])
+
+    assert motor_local.borrar_fila_historial(0)
+    assert clientes(motor_local) == ["Beto", "Solo local"]
+    assert motor_local.filas_nube() == 1
+    assert not motor_local.borrar_fila_historial(5)
+
+
+def test_sqlite_borrar_historial_borra_la_copia_tipada(motor_local):
+    # El trigger borrar_tipado saca la fila tipada junto con la original
+    motor_local.agregar_historial([fila_historial("Ana"), fila_historial("Beto")])
+    assert len(motor_local.leer_historial_tipado()) == 2
+    motor_local.borrar_fila_historial(0)
+    assert len(motor_local.leer_historial_tipado()) == 1
+
+
+def test_sqlite_anexar_historial_nube_conserva_pendientes(motor_local):
+    motor_local.anexar_historial_nube([fila_historial("Ana")])
+    motor_local.agregar_historial([fila_historial("Pendiente")])
+
+    # Llega de la nube una fila nueva: la pendiente queda al final, sin duplicarse
+    motor_local.anexar_historial_nube([fila_historial("Beto")], pendientes=[fila_historial("Pendiente")])
+    assert clientes(motor_local) == ["Ana", "Beto", "Pendiente"]
+    assert motor_local.filas_nube() == 2
+
+
+def test_sqlite_transaccion_deshace_si_falla(motor_local):
+    with pytest.raises(RuntimeError):
+        with motor_local.transaccion():
+            motor_local.agregar_rollo([7, "", "", "PLA", "", "", 1000, 1000, 0])
+            raise RuntimeError("falló la nube")
+    assert motor_local.leer_inventario() == []
+
+
+# --- Solo MotorSheets ---
+def test_sheets_descontar_usa_el_indice(motor_nube, hoja_inventario):
+    motor_nube.leer_inventario()
+    motor_nube.agregar_rollo([3, "01/10/2026", "Hellbot", "TPU", "Blanco", "Normal", 500, 500, 30000])
+    assert motor_nube.fila_por_id["3"] == 4
+
+    assert motor_nube.descontar_peso(3, 100) == 400
+    assert hoja_inventario.valores[3][7] == 400
+    # Con el índice armado no hace falta buscar en la hoja
+    assert "find" not in hoja_inventario.llamadas
+
+
+def test_sheets_actualizar_pesos_en_una_llamada(motor_nube, hoja_inventario):
+    motor_nube.leer_inventario()
+    assert motor_nube.actualizar_pesos({1: 700, 2: 100})
+    assert hoja_inventario.llamadas.count("batch_update") == 1
+
+
+# --- Backend: sin conexión y reconexión ---
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from backend import BackendGestor
+    gestor = BackendGestor(conectar=False)
+    yield gestor
+    gestor.motor_local.conn.close()
+
+
+def conectar(backend, motor_nube):
+    """Lo que hace conectar_drive una vez abiertas las hojas (sin gspread ni credenciales)"""
+    backend.motor_nube = motor_nube
+    backend.sync_historial.invalidar()
+    backend.sync_inventario.invalidar()
+    return backend.forzar_descarga_inventario(completo=True)
+
+
+def test_reconexion_sube_stock_hecho_sin_conexion(backend, motor_nube, hoja_inventario):
+    assert conectar(backend, motor_nube)
+    backend.motor_nube = None  # Se cortó la conexión
+
+    assert backend.descontar_stock(1, 100)
+    assert backend.agregar_stock_nube(["01/10/2026", "Hellbot", "TPU", "Blanco", "Normal", 500, 500, 30000])
+    assert backend.guardar_lote([fila_historial("Ana")], {2: 50})
+    assert len(backend.motor_local.leer_stock_pendiente()) == 3
+
+    # Mientras tanto otra PC descontó 50g del rollo 1
+    hoja_inventario.valores[1][7] = 750
+
+    assert conectar(backend, motor_nube)
+    assert [f[7] for f in hoja_inventario.valores[1:3]] == [650, 100]
+    assert hoja_inventario.valores[3][3] == "TPU"
+    assert backend.motor_local.leer_stock_pendiente() == []
+    # La descarga completa ya trae lo subido: no se perdió nada
+    assert [r.peso_actual for r in backend.inventario] == [650, 100, 500]
+
+
+def test_reconexion_fallida_no_pisa_el_inventario_local(backend, motor_nube, hoja_inventario):
+    assert conectar(backend, motor_nube)
+    backend.motor_nube = None
+    assert backend.descontar_stock(1, 100)
+
+    def sin_red(*args, **kwargs):
+        raise ConnectionError("sin red")
+    hoja_inventario.batch_update = sin_red
+
+    assert not conectar(backend, motor_nube)
+    assert backend.buscar_rollo(1).peso_actual == 700
+    assert len(backend.motor_local.leer_stock_pendiente()) == 1
+
+
+def test_alta_ya_subida_no_se_repite(backend, motor_nube, hoja_inventario):
+    assert conectar(backend, motor_nube)
+    backend.motor_nube = None
+    assert backend.agregar_stock_nube(["01/10/2026", "Hellbot", "TPU", "Blanco", "Normal", 500, 500, 30000])
+
+    # Se cortó justo después de subir el alta, antes de confirmarla
+    fila = backend.motor_local.leer_stock_pendiente()[0][2]
+    hoja_inventario.append_row(fila)
+
+    assert conectar(backend, motor_nube)
+    assert len(hoja_inventario.valores) == 4
+
+
+def test_borrar_historial_sin_conexion_no_borra(backend):
+    backend.guardar_fila_historial(fila_historial("Ana"))
+    posicion, fila = next(iter(backend.motor_local.leer_historial_posiciones([1]).items()))
+    assert not backend.borrar_fila_historial(posicion, fila)
+    assert backend.contar_historial() == 1
+
+
+def posicion_de(backend, cliente):
+    """(posicion, fila) local del cliente"""
+    for posicion, fila in backend.motor_local.leer_historial_posiciones(range(1, 100)).items():
+        if fila[2] == cliente:
+            return posicion, fila
+
+
+def test_borrar_historial_por_posicion(backend, motor_nube, hoja_historial):
+    assert conectar(backend, motor_nube)
+    backend.sincronizar_historial()
+    posicion, fila = posicion_de(backend, "Beto")
+
+    # Otra PC agregó una fila antes de que se confirme el borrado
+    hoja_historial.append_rows([fila_historial("Caro")])
+    assert backend.borrar_fila_historial(posicion, fila)
+    assert [f[2] for f in hoja_historial.valores[1:]] == ["Ana", "Caro"]
+    assert [f[2] for f in backend.motor_local.leer_historial()[1:]] == ["Ana", "Caro"]
+
+
+def test_borrar_historial_no_borra_otra_fila(backend, motor_nube, hoja_historial):
+    assert conectar(backend, motor_nube)
+    backend.sincronizar_historial()
+    posicion, fila = posicion_de(backend, "Beto")
+
+    # Otra PC borró "Ana": en la hoja "Beto" subió un renglón y la copia local no se enteró
+    del hoja_historial.valores[1]
+    hoja_historial.append_rows([fila_historial("Caro")])
+    assert not backend.borrar_fila_historial(posicion, fila)
+    assert [f[2] for f in hoja_historial.valores[1:]] == ["Beto", "Caro"]
+    assert posicion_de(backend, "Beto") == (posicion, fila)
+
+    # Lo que se vio ya no es lo que hay: tampoco se borra
+    assert not backend.borrar_fila_historial(posicion, fila_historial("Beto", total=5))
+
+
+def test_descuento_no_toca_el_inventario_ya_leido(backend, motor_nube):
+    assert conectar(backend, motor_nube)
+    leido = backend.inventario
+    indices = backend.indices
+
+    assert backend.descontar_stock(1, 100)
+    # Quien tomó la referencia antes sigue viendo la versión anterior, entera
+    assert leido[0].peso_actual == 800
+    assert indices.buscar(1).peso_actual == 800
+    assert backend.buscar_rollo(1).peso_actual == 700
+    assert [r.id for r in backend.filtrar_stock(peso_minimo=750)] == []
+
+
@@ -0,0 +1,55 @@
+"""
+Resúmenes del historial: de qué material es cada venta.
+"""
+import pytest
+
+from analitica import claves, tipo_material
+from modelos import DENSIDADES, densidad
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    ("Grilon3 PETG - Negro", "PETG"),
+    ("Grilon3 PETG - Plata", "PETG"),        # "PLATA" no es PLA
+    ("Grilon ABS - Plateado", "ABS"),        # "PLATEADO" tampoco
+    ("Elegoo PLA - Plata", "PLA"),
+    ("Hellbot PLA+ - Rojo", "PLA"),
+    ("Printalot PETG-CF - Negro", "PETG"),
+    ("Genérico PCTG - Blanco", "Otro"),      # Ni PC ni PETG
+    ("Polymaker PC - Blanco", "PC"),
+    ("Sin marca - PLA", "Otro"),             # Lo de después de " - " es el color
+    ("-", "-"),
+    ("", "-"),
+])
+def test_tipo_material(valor, esperado):
+    assert tipo_material(valor) == esperado
+
+
+def test_densidad_no_confunde_el_color():
+    assert densidad("Grilon3 PETG - Plata") == DENSIDADES["PETG"]
+    assert densidad("Grilon ABS - Plateado") == DENSIDADES["ABS"]
+    assert densidad("TPU 95A") == DENSIDADES["TPU"]
+    assert densidad("Material raro") == DENSIDADES["PLA"]
+
+
+def test_claves_de_una_venta_plateada():
+    fila = ["05/10/2026", "Usuario", "Ana", "Gato", "Impresión", "Grilon ABS - Plateado",
+            "-", "50", "2h", 1, "0 hs", "$1000.00", "$1000.00"]
+    assert claves(fila)["material"] == "ABS"
+    assert claves(fila)["mes_material"] == "2026-10|ABS"
+
+
+def test_resumen_viejo_se_rearma(tmp_path):
+    from almacenamiento import MotorSQLite
+    ruta = str(tmp_path / "datos.db")
+    motor = MotorSQLite(ruta)
+    motor.agregar_historial([["05/10/2026", "Usuario", "Ana", "Gato", "Impresión", "Grilon ABS - Plateado",
+                              "-", "50", "2h", 1, "0 hs", "$1000.00", "$1000.00"]])
+    # Una base armada con la agrupación anterior (la venta quedó como PLA)
+    with motor.transaccion():
+        motor.conn.execute("UPDATE resumen SET clave = 'PLA' WHERE dimension = 'material'")
+        motor.guardar_meta("resumen_listo", "1")
+    motor.conn.close()
+
+    motor = MotorSQLite(ruta)
+    assert [grupo["clave"] for grupo in motor.leer_resumen("material")] == ["ABS"]
+    motor.conn.close()
@@ -0,0 +1,120 @@
+"""
+Búsqueda en el historial: cada consulta del índice tiene que dar las mismas
+filas que un filtro fila por fila sobre la misma TablaHistorial.
+"""
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from busqueda import CAMPOS, IndiceHistorial, palabras  # noqa: E402
+from historial_tipado import TablaHistorial, tipar  # noqa: E402
+
+CLIENTES = ["Juan Pérez", "Ana María", "Beto", "Juana Díaz", "Estudio Lumen"]
+MODELOS = ["Llavero", "Llave inglesa", "Maceta", "Vaso", "Diseño único"]
+MATERIALES = ["Elegoo PLA - Rojo", "Grilon3 PETG - Plata", "Grilon ABS - Negro", "-"]
+
+
+def filas_al_azar(cantidad, desde=1, semilla=0):
+    azar = random.Random(semilla)
+    filas = []
+    for i in range(cantidad):
+        fecha = "" if azar.random() < 0.05 else f"{azar.randint(1, 28):02d}/{azar.randint(1, 12):02d}/2026"
+        total = "-" if azar.random() < 0.05 else f"${azar.uniform(100, 20000):.2f}"
+        fila = [fecha, "U", azar.choice(CLIENTES), azar.choice(MODELOS), azar.choice(["Impresión", "Venta Directa"]),
+                azar.choice(MATERIALES), azar.choice(["Rojo", "Azul", "-"]), "50", "2h", 1, "0 hs", total, total]
+        filas.append((desde + i,) + tipar(fila))
+    return filas
+
+
+def fuerza_bruta(tabla, texto="", desde=None, hasta=None, minimo=None, maximo=None):
+    """Lo mismo que IndiceHistorial.buscar, mirando fila por fila"""
+    textos = {campo: tabla.columna(campo) for campo in CAMPOS}
+    mascara = np.zeros(len(tabla), dtype=bool)
+    for i in range(len(tabla)):
+        palabras_fila = [p for campo in CAMPOS for p in palabras(textos[campo][i])]
+        ok = all(any(p.startswith(buscada) for p in palabras_fila) for buscada in palabras(texto))
+        fecha, total = tabla.fecha[i], tabla.total[i]
+        if desde or hasta:
+            ok &= not np.isnat(fecha)
+            ok &= not desde or fecha >= np.datetime64(desde)
+            ok &= not hasta or fecha <= np.datetime64(hasta)
+        if minimo is not None or maximo is not None:
+            ok &= not np.isnan(total)
+            ok &= minimo is None or total >= minimo
+            ok &= maximo is None or total <= maximo
+        mascara[i] = ok
+    return mascara
+
+
+CONSULTAS = [
+    {},
+    {"texto": "juan"},
+    {"texto": "JUAN llav"},
+    {"texto": "llave ingl"},
+    {"texto": "diseno"},             # Sin tilde encuentra "Diseño"
+    {"texto": "plat"},
+    {"texto": "zzz"},
+    {"desde": "2026-03-01", "hasta": "2026-03-31"},
+    {"desde": "2026-11-15"},
+    {"hasta": "2026-01-10"},
+    {"minimo": 5000, "maximo": 6000},
+    {"minimo": 19000},
+    {"maximo": 500.5},
+    {"texto": "ana", "desde": "2026-06-01", "minimo": 1000, "maximo": 10000},
+]
+
+
+@pytest.mark.parametrize("consulta", CONSULTAS)
+def test_buscar_igual_que_fuerza_bruta(consulta):
+    tabla = TablaHistorial(filas_al_azar(600))
+    indice = IndiceHistorial(tabla)
+    assert np.array_equal(indice.buscar(**consulta), fuerza_bruta(tabla, **consulta))
+
+
+def test_palabras():
+    assert palabras("Llavero Diseño-Único") == ["llavero", "diseno", "unico"]
+    assert palabras(None) == []
+
+
+def test_mezclar_mantiene_el_orden():
+    claves = np.array([1.0, 3.0, 5.0])
+    ordenado = (claves, np.array([0, 1, 2]))
+    claves, filas = IndiceHistorial.mezclar(ordenado, np.array([4.0, 0.5, 3.0]), 3)
+    assert list(claves) == [0.5, 1.0, 3.0, 3.0, 4.0, 5.0]
+    assert list(filas) == [4, 0, 1, 5, 3, 2]
+    assert IndiceHistorial.mezclar(ordenado, np.array([]), 3) is ordenado
+
+
+def test_mascara_rango_deja_afuera_los_vacios():
+    ordenado = (np.array([1.0, 2.0, 3.0, np.nan]), np.array([2, 0, 3, 1]))
+    assert list(IndiceHistorial.mascara_rango(ordenado, 4, None, None)) == [True, False, True, True]
+    assert list(IndiceHistorial.mascara_rango(ordenado, 4, 2.0, 3.0)) == [True, False, False, True]
+    # Una tabla más corta que el índice ignora las filas que no tiene
+    assert list(IndiceHistorial.mascara_rango(ordenado, 3, None, None)) == [True, False, True]
+
+
+def test_actualizar_con_filas_agregadas_extiende_el_mismo_indice():
+    filas = filas_al_azar(300)
+    tabla = TablaHistorial(filas)
+    indice = IndiceHistorial(tabla)
+    anterior = indice.buscar("juan")
+
+    nueva = tabla.con_filas(filas_al_azar(200, desde=301, semilla=1))
+    assert indice.actualizar(nueva) is indice
+    assert indice.actualizar(nueva) is indice  # Misma tabla: nada que hacer
+    for consulta in CONSULTAS:
+        assert np.array_equal(indice.buscar(**consulta), fuerza_bruta(nueva, **consulta))
+    assert np.array_equal(indice.buscar("juan")[:300], anterior)
+
+
+def test_actualizar_con_filas_borradas_arma_otro_indice():
+    filas = filas_al_azar(300)
+    indice = IndiceHistorial(TablaHistorial(filas))
+
+    sin_una = TablaHistorial(filas[:100] + filas[101:])
+    nuevo = indice.actualizar(sin_una)
+    assert nuevo is not indice
+    for consulta in CONSULTAS:
+        assert np.array_equal(nuevo.buscar(**consulta), fuerza_bruta(sin_una, **consulta))
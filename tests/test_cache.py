@@ -0,0 +1,271 @@
+"""
+Caches: CacheTTL (vencimiento, stale-while-revalidate, LRU e invalidar) con un reloj
+que se adelanta a mano, y CacheArchivos sobre una carpeta temporal.
+"""
+import contextlib
+import hashlib
+import os
+import threading
+import time
+
+import pytest
+
+from cache import CacheArchivos, CacheTTL
+
+
+class Reloj:
+    """Hora falsa: solo avanza con adelantar()"""
+
+    def __init__(self, ahora=1000.0):
+        self.ahora = ahora
+
+    def __call__(self):
+        return self.ahora
+
+    def adelantar(self, segundos):
+        self.ahora += segundos
+
+
+class Cargador:
+    """Cuenta las llamadas y devuelve 'valor-1', 'valor-2', ... (o falla si se le pide)"""
+
+    def __init__(self, valor="valor"):
+        self.valor = valor
+        self.llamadas = 0
+        self.falla = False
+        self.puede_terminar = threading.Event()
+        self.puede_terminar.set()
+
+    def __call__(self):
+        self.puede_terminar.wait(5)
+        self.llamadas += 1
+        if self.falla:
+            raise ConnectionError("sin conexión")
+        return f"{self.valor}-{self.llamadas}"
+
+
+def esperar_recarga(cache, clave):
+    limite = time.monotonic() + 5
+    while clave in cache.recargando:
+        assert time.monotonic() < limite, "la recarga en segundo plano no terminó"
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def reloj():
+    return Reloj()
+
+
+# --- CacheTTL: vencimiento ---
+def test_dentro_del_ttl_no_vuelve_a_cargar(reloj):
+    cache, cargar = CacheTTL(ttl=60, reloj=reloj), Cargador()
+    assert cache.obtener("a", cargar) == "valor-1"
+    reloj.adelantar(60)  # Justo en el límite sigue vigente
+    assert cache.obtener("a", cargar) == "valor-1"
+    assert cargar.llamadas == 1 and cache.vigente("a")
+
+
+def test_sin_ttl_no_vence_nunca(reloj):
+    cache, cargar = CacheTTL(reloj=reloj), Cargador()
+    cache.obtener("a", cargar)
+    reloj.adelantar(10 ** 9)
+    assert cache.obtener("a", cargar) == "valor-1" and cache.vigente("a")
+
+
+def test_vencido_en_primer_plano_recarga_antes_de_devolver(reloj):
+    cache, cargar = CacheTTL(ttl=60, en_segundo_plano=False, reloj=reloj), Cargador()
+    cache.obtener("a", cargar)
+    reloj.adelantar(61)
+    assert not cache.vigente("a")
+    assert cache.obtener("a", cargar) == "valor-2"
+    assert cache.vigente("a")  # Guardado con la hora nueva
+
+
+def test_vencido_en_primer_plano_sin_conexion_usa_lo_anterior(reloj):
+    cache, cargar = CacheTTL(ttl=60, en_segundo_plano=False, reloj=reloj), Cargador()
+    cache.obtener("a", cargar)
+    reloj.adelantar(61)
+    cargar.falla = True
+    assert cache.obtener("a", cargar) == "valor-1"
+
+
+def test_sin_nada_guardado_el_error_se_propaga(reloj):
+    cache, cargar = CacheTTL(ttl=60, reloj=reloj), Cargador()
+    cargar.falla = True
+    with pytest.raises(ConnectionError):
+        cache.obtener("a", cargar)
+    assert not cache.vigente("a")
+
+
+# --- CacheTTL: stale-while-revalidate ---
+def test_vencido_devuelve_lo_viejo_y_recarga_en_segundo_plano(reloj):
+    cache, cargar = CacheTTL(ttl=60, reloj=reloj), Cargador()
+    cache.obtener("a", cargar)
+    reloj.adelantar(61)
+
+    cargar.puede_terminar.clear()  # La recarga queda trabada hasta que la soltemos
+    assert cache.obtener("a", cargar) == "valor-1"
+    assert cache.obtener("a", cargar) == "valor-1"  # Una sola recarga a la vez
+    assert cache.recargando == {"a"}
+
+    cargar.puede_terminar.set()
+    esperar_recarga(cache, "a")
+    assert cargar.llamadas == 2
+    assert cache.obtener("a", cargar) == "valor-2" and cache.vigente("a")
+
+
+def test_recarga_en_segundo_plano_fallida_sigue_sirviendo_lo_anterior(reloj):
+    cache, cargar = CacheTTL(ttl=60, reloj=reloj), Cargador()
+    cache.obtener("a", cargar)
+    reloj.adelantar(61)
+    cargar.falla = True
+
+    assert cache.obtener("a", cargar) == "valor-1"
+    esperar_recarga(cache, "a")
+    assert cache.obtener("a", cargar) == "valor-1"  # Lanza otra recarga, que también falla
+    esperar_recarga(cache, "a")
+    assert not cache.vigente("a")
+
+
+def test_la_recarga_en_segundo_plano_usa_el_contexto_de_fondo(reloj):
+    contextos = []
+
+    @contextlib.contextmanager
+    def de_fondo():
+        contextos.append(threading.current_thread())
+        yield
+
+    cache, cargar = CacheTTL(ttl=60, contexto_fondo=de_fondo, reloj=reloj), Cargador()
+    cache.obtener("a", cargar)
+    assert contextos == []  # La primera carga es en primer plano, sin el contexto
+    reloj.adelantar(61)
+    cache.obtener("a", cargar)
+    esperar_recarga(cache, "a")
+    assert len(contextos) == 1 and contextos[0] is not threading.current_thread()
+
+
+# --- CacheTTL: LRU e invalidar ---
+def test_lru_descarta_la_menos_usada(reloj):
+    cache = CacheTTL(max_entradas=3, reloj=reloj)
+    for clave in "abc":
+        cache.obtener(clave, Cargador(clave))
+    cache.obtener("a", Cargador())  # "a" pasa a ser la más usada: la menos usada es "b"
+    cache.obtener("d", Cargador("d"))
+
+    assert list(cache.datos) == ["c", "a", "d"]
+    cargar_b = Cargador("b")
+    assert cache.obtener("b", cargar_b) == "b-1" and cargar_b.llamadas == 1
+    assert list(cache.datos) == ["a", "d", "b"]
+
+
+def test_invalidar_una_clave_o_todas(reloj):
+    cache, cargar = CacheTTL(reloj=reloj), Cargador()
+    cache.obtener("a", cargar)
+    cache.obtener("b", cargar)
+
+    cache.invalidar("a")
+    cache.invalidar("no existe")
+    assert not cache.vigente("a") and cache.vigente("b")
+    assert cache.obtener("a", cargar) == "valor-3"
+
+    cache.invalidar()
+    assert cache.datos == {}
+    assert cache.obtener("b", cargar) == "valor-4"
+
+
+# --- CacheArchivos ---
+def huella(datos):
+    return hashlib.sha256(datos).hexdigest()
+
+
+def escribir(datos):
+    """generar() que escribe 'datos' y cuenta cuántas veces se llamó"""
+    def generar(destino):
+        generar.llamadas += 1
+        with open(destino, "wb") as f:
+            f.write(datos)
+    generar.llamadas = 0
+    return generar
+
+
+def envejecer(ruta, segundos):
+    """Marca el archivo como usado hace 'segundos'"""
+    hace = time.time() - segundos
+    os.utime(ruta, (hace, hace))
+
+
+def test_mismo_contenido_es_un_acierto(tmp_path):
+    cache, datos = CacheArchivos(str(tmp_path)), b"solid pieza" * 10
+    generar = escribir(datos)
+
+    ruta = cache.obtener(huella(datos), ".stl", generar)
+    assert cache.obtener(huella(datos), ".stl", generar) == ruta
+    assert generar.llamadas == 1
+    with open(ruta, "rb") as f:
+        assert f.read() == datos
+    assert os.path.basename(ruta) == huella(datos) + ".stl"
+    assert not [n for n in os.listdir(tmp_path) if n.endswith(".tmp")]
+
+
+def test_otro_contenido_no_reusa_el_archivo(tmp_path):
+    cache = CacheArchivos(str(tmp_path))
+    uno, otro = escribir(b"pieza 1"), escribir(b"pieza 2")
+
+    ruta_uno = cache.obtener(huella(b"pieza 1"), ".stl", uno)
+    ruta_otro = cache.obtener(huella(b"pieza 2"), ".stl", otro)
+
+    assert ruta_uno != ruta_otro and uno.llamadas == otro.llamadas == 1
+    with open(ruta_otro, "rb") as f:
+        assert f.read() == b"pieza 2"
+
+
+def test_json_por_huella(tmp_path):
+    cache = CacheArchivos(str(tmp_path))
+    clave = huella(b"pieza")
+    assert cache.leer_json(clave) is None
+    assert cache.guardar_json(clave, {"volumen": 12.5}) == {"volumen": 12.5}
+    assert cache.leer_json(clave) == {"volumen": 12.5}
+    assert cache.leer_json(huella(b"otra pieza")) is None
+
+    # Un archivo roto (ej: escrito a medias por otra versión) cuenta como que no está
+    with open(cache.ruta(clave, ".json"), "w", encoding="utf-8") as f:
+        f.write("{roto")
+    assert cache.leer_json(clave) is None
+
+
+def test_si_generar_falla_no_queda_nada(tmp_path):
+    cache = CacheArchivos(str(tmp_path))
+
+    def generar(destino):
+        with open(destino, "wb") as f:
+            f.write(b"a medias")
+        raise ValueError("malla rota")
+
+    with pytest.raises(ValueError):
+        cache.obtener(huella(b"rota"), ".stl", generar)
+    assert os.listdir(tmp_path) == []
+
+
+def test_al_pasarse_de_tamano_borra_los_menos_usados(tmp_path):
+    cache = CacheArchivos(str(tmp_path), max_bytes=250, max_edad=None)
+    rutas = {}
+    for i, nombre in enumerate("abc"):
+        rutas[nombre] = cache.obtener(nombre, ".bin", escribir(b"x" * 100))
+        envejecer(rutas[nombre], 300 - i * 100)  # "a" la más vieja, "c" la más nueva
+    # (con 300 bytes ya se pasó: al escribir "c" se borró "a", la menos usada)
+    assert sorted(os.listdir(tmp_path)) == ["b.bin", "c.bin"]
+
+    # Usar "b" la vuelve la más reciente: al agregar "d" se va "c"
+    generar_b = escribir(b"x" * 100)
+    assert cache.obtener("b", ".bin", generar_b) == rutas["b"] and generar_b.llamadas == 0
+    cache.obtener("d", ".bin", escribir(b"x" * 100))
+    assert sorted(os.listdir(tmp_path)) == ["b.bin", "d.bin"]
+
+
+def test_borra_lo_que_no_se_usa_hace_mucho(tmp_path):
+    cache = CacheArchivos(str(tmp_path), max_edad=3600)
+    vieja = cache.obtener("vieja", ".bin", escribir(b"1"))
+    envejecer(vieja, 7200)
+    nueva = cache.obtener("nueva", ".bin", escribir(b"2"))
+
+    assert not os.path.exists(vieja) and os.path.exists(nueva)
@@ -0,0 +1,76 @@
+"""
+Subida del historial: un append que falló por un corte no se repite a ciegas.
+"""
+import requests
+
+from cola_escritura import ColaEscritura
+from planificador import PlanificadorSheets
+
+
+class ErrorGoogle(Exception):
+    def __init__(self, codigo):
+        super().__init__(f"HTTP {codigo}")
+        self.response = type("Respuesta", (), {"status_code": codigo})()
+
+
+def planificador_rapido():
+    return PlanificadorSheets(por_minuto=6000, rafaga=100, espera_base=0.001, espera_maxima=0.001)
+
+
+def falla_una_vez(error):
+    llamadas = []
+
+    def funcion():
+        llamadas.append(1)
+        if len(llamadas) == 1:
+            raise error
+        return "ok"
+    return funcion, llamadas
+
+
+def test_lectura_se_reintenta_ante_timeout():
+    funcion, llamadas = falla_una_vez(requests.exceptions.Timeout())
+    assert planificador_rapido().ejecutar(funcion) == "ok"
+    assert len(llamadas) == 2
+
+
+def test_append_no_se_reintenta_ante_timeout_ni_5xx():
+    for error in (requests.exceptions.Timeout(), ErrorGoogle(503)):
+        funcion, llamadas = falla_una_vez(error)
+        try:
+            planificador_rapido().ejecutar(funcion, escritura=True, idempotente=False)
+        except Exception as e:
+            assert e is error
+        assert len(llamadas) == 1
+
+
+def test_append_se_reintenta_ante_429():
+    funcion, llamadas = falla_una_vez(ErrorGoogle(429))
+    assert planificador_rapido().ejecutar(funcion, escritura=True, idempotente=False) == "ok"
+    assert len(llamadas) == 2
+
+
+def test_cola_no_duplica_un_lote_que_llego_pese_al_error(tmp_path):
+    nube = []
+
+    def subir(filas):
+        nube.extend(filas)
+        if len(nube) == len(filas):
+            raise requests.exceptions.Timeout()  # Se aplicó, pero la respuesta no volvió
+
+    cola = ColaEscritura(str(tmp_path / "journal.jsonl"), espera_lote=0)
+    cola.encolar_varias([["Ana"], ["Beto"]])
+    cola.iniciar(subir, lambda filas: nube[-len(filas):] == filas)
+    assert cola.vaciar(timeout=10)
+    assert nube == [["Ana"], ["Beto"]]
+
+
+def test_cola_verifica_lo_recuperado_del_journal(tmp_path):
+    ruta = str(tmp_path / "journal.jsonl")
+    ColaEscritura(ruta).encolar_varias([["Ana"]])  # Se cerró antes de confirmar
+
+    subidas = []
+    cola = ColaEscritura(ruta, espera_lote=0)
+    cola.iniciar(subidas.extend, lambda filas: True)  # La nube ya la tenía
+    assert cola.vaciar(timeout=10)
+    assert subidas == []
@@ -0,0 +1,157 @@
+"""
+Motor de precios: el cálculo suelto da lo mismo que la fórmula original del
+Cotizador de escritorio, y el cálculo en lote da lo mismo que el suelto.
+"""
+import itertools
+
+import pytest
+
+import cotizacion
+from cotizacion import CONFIG_DEFECTO, calcular, calcular_lote
+
+CFG_PROPIA = {
+    "precio_kwh": 200,
+    "consumo_kw": 0.15,
+    "precio_hora_diseno": 9000,
+    "margen_ganancia": 50,
+    "precio_desgaste_hora": 300,
+}
+
+
+def cotizador_original(peso_pieza_base, horas, precio_mat_kg, cant, margen_error, hs_diseno, cfg):
+    """TabCotizador.calcular tal como estaba antes de pasar la fórmula a cotizacion.py"""
+    peso_real_calculo = peso_pieza_base * (1 + margen_error)
+    costo_material = (peso_real_calculo / 1000) * precio_mat_kg
+    costo_luz = horas * cfg["consumo_kw"] * cfg["precio_kwh"]
+    costo_maq = horas * cfg["precio_desgaste_hora"]
+    subtotal_costo_unitario = costo_material + costo_luz + costo_maq
+    ganancia_valor = subtotal_costo_unitario * (cfg["margen_ganancia"] / 100)
+    precio_venta_unitario = subtotal_costo_unitario + ganancia_valor
+    costo_diseno_total = hs_diseno * cfg["precio_hora_diseno"]
+    total_lote = (precio_venta_unitario * cant) + costo_diseno_total
+    return total_lote, total_lote / cant
+
+
+# --- Cálculo suelto ---
+def test_calcular_valores_fijos():
+    # 50g + 10% a $20000/kg, 2h30 por pieza, 3 piezas y 1 hora de diseño
+    r = calcular(50, 2.5, 20000, cantidad=3, margen_fallo=0.10, hs_diseno=1)
+    assert r["peso_real"] == pytest.approx(55)
+    assert r["costo_material"] == pytest.approx(1100)
+    assert r["costo_luz"] == pytest.approx(85)
+    assert r["costo_maq"] == pytest.approx(500)
+    assert r["costo_puro"] == pytest.approx(1685)
+    assert r["precio_unitario"] == pytest.approx(3370)
+    assert r["costo_diseno"] == pytest.approx(8500)
+    assert r["total_lote"] == pytest.approx(18610)
+    assert r["unitario_final"] == pytest.approx(18610 / 3)
+
+
+def test_calcular_con_configuracion_propia():
+    r = calcular(120, 4, 25000, cfg=CFG_PROPIA)
+    assert r["costo_puro"] == pytest.approx(3000 + 120 + 1200)
+    assert r["ganancia"] == pytest.approx(2160)
+    assert r["total_lote"] == pytest.approx(6480)
+
+
+def test_calcular_completa_la_configuracion():
+    assert calcular(80, 3, 18000, cfg={"margen_ganancia": 0}) == \
+        calcular(80, 3, 18000, cfg={**CONFIG_DEFECTO, "margen_ganancia": 0})
+
+
+CASOS = list(itertools.product(
+    (0.5, 50, 333.3),        # peso_g
+    (0.25, 2.5, 17),         # horas
+    (15000, 24999.99),       # precio_kg
+    (1, 7),                  # cantidad
+    (0.0, 0.15),             # margen_fallo
+    (0, 1.5),                # hs_diseno
+    (CONFIG_DEFECTO, CFG_PROPIA),
+))
+
+
+@pytest.mark.parametrize("peso, horas, precio_kg, cantidad, margen, diseno, cfg", CASOS)
+def test_calcular_igual_al_cotizador_original(peso, horas, precio_kg, cantidad, margen, diseno, cfg):
+    r = calcular(peso, horas, precio_kg, cantidad, margen, diseno, cfg)
+    total, unitario = cotizador_original(peso, horas, precio_kg, cantidad, margen, diseno, cfg)
+    assert r["total_lote"] == total
+    assert r["unitario_final"] == unitario
+
+
+# --- Cálculo en lote ---
+@pytest.mark.skipif(not cotizacion.HAS_NUMPY, reason="calcular_lote necesita numpy")
+@pytest.mark.parametrize("cfg", (CONFIG_DEFECTO, CFG_PROPIA))
+def test_calcular_lote_igual_al_suelto(cfg):
+    casos = [c[:6] for c in CASOS if c[6] is cfg]
+    columnas = list(zip(*casos))
+    lote = calcular_lote(*columnas, cfg=cfg)
+
+    for i, caso in enumerate(casos):
+        suelto = calcular(*caso, cfg=cfg)
+        for partida, valor in suelto.items():
+            assert lote[partida][i] == valor, (partida, caso)
+
+
+@pytest.mark.skipif(not cotizacion.HAS_NUMPY, reason="calcular_lote necesita numpy")
+def test_calcular_lote_con_broadcasting():
+    # Una pieza, tres precios de material y dos cantidades: grilla de 2x3
+    lote = calcular_lote(50, 2.5, [[15000, 20000, 25000]], cantidad=[[1], [3]], margen_fallo=0.10, hs_diseno=1)
+    assert lote["total_lote"].shape == (2, 3)
+    assert lote["total_lote"][1, 1] == calcular(50, 2.5, 20000, 3, 0.10, 1)["total_lote"]
+
+
+# --- Sensibilidad ---
+TRABAJOS = [
+    {"peso_g": 50, "horas": 2.5, "precio_kg": 20000, "cantidad": 3, "hs_diseno": 1},
+    {"peso_g": 120, "horas": 6, "precio_kg": 25000, "cantidad": 1, "hs_diseno": 0},
+    {"peso_g": 8.5, "horas": 0.75, "precio_kg": 18000, "cantidad": 10, "hs_diseno": 0.5},
+]
+
+BARRIDOS = {
+    "precio_kwh": [0, 120, 170, 400],
+    "consumo_kw": [0.05, 0.2, 0.35],
+    "precio_desgaste_hora": [0, 200, 550],
+    "margen_ganancia": [0, 50, 100, 250],
+    "precio_kg": [10000, 20000, 31000],
+}
+
+
+def total_perturbado(trabajos, cambios, cfg, margen_fallo):
+    """Lo que da calcular() trabajo por trabajo con los parámetros de 'cambios' reemplazados"""
+    cfg = {**cotizacion.parametros(cfg), **cambios}
+    return sum(
+        calcular(t["peso_g"], t["horas"], cambios.get("precio_kg", t["precio_kg"]), t["cantidad"],
+                 margen_fallo, t["hs_diseno"], cfg=cfg)["total_lote"]
+        for t in trabajos
+    )
+
+
+@pytest.mark.skipif(not cotizacion.HAS_NUMPY, reason="sensibilidad necesita numpy")
+@pytest.mark.parametrize("trabajos", [TRABAJOS[:1], TRABAJOS], ids=["uno", "varios"])
+@pytest.mark.parametrize("eje", list(cotizacion.PARAMETROS_BARRIDO))
+def test_sensibilidad_igual_a_calcular_con_un_parametro_cambiado(trabajos, eje):
+    valores = BARRIDOS[eje]
+    totales = cotizacion.sensibilidad(trabajos, eje, valores, cfg=CFG_PROPIA, margen_fallo=0.1)
+
+    assert totales.shape == (len(valores),)
+    for valor, total in zip(valores, totales):
+        assert total == pytest.approx(total_perturbado(trabajos, {eje: valor}, CFG_PROPIA, 0.1)), (eje, valor)
+
+
+@pytest.mark.skipif(not cotizacion.HAS_NUMPY, reason="sensibilidad necesita numpy")
+@pytest.mark.parametrize("eje_x, eje_y", list(itertools.permutations(cotizacion.PARAMETROS_BARRIDO, 2)))
+def test_sensibilidad_grilla_igual_a_calcular(eje_x, eje_y):
+    valores_x, valores_y = BARRIDOS[eje_x], BARRIDOS[eje_y]
+    grilla = cotizacion.sensibilidad(TRABAJOS, eje_x, valores_x, eje_y, valores_y)
+
+    assert grilla.shape == (len(valores_y), len(valores_x))
+    for i, y in enumerate(valores_y):
+        for j, x in enumerate(valores_x):
+            esperado = total_perturbado(TRABAJOS, {eje_x: x, eje_y: y}, None, 0.0)
+            assert grilla[i, j] == pytest.approx(esperado), (eje_x, x, eje_y, y)
+
+
+@pytest.mark.skipif(not cotizacion.HAS_NUMPY, reason="sensibilidad necesita numpy")
+def test_sensibilidad_ejes_iguales():
+    with pytest.raises(ValueError):
+        cotizacion.sensibilidad(TRABAJOS, "precio_kwh", [1, 2], "precio_kwh", [1, 2])
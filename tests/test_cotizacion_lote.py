@@ -0,0 +1,138 @@
+"""
+Cotización por lote: lectura de la planilla, líneas con error y lo que se
+guarda en el historial / se descuenta del stock.
+"""
+import io
+
+import pytest
+
+import cotizacion
+import cotizacion_lote
+from cotizacion_lote import cotizar_piezas, descuentos_stock, filas_historial, leer_piezas, nombre_columna
+from modelos import Rollo
+
+ROLLOS = {
+    "7": Rollo("7", marca="Elegoo", tipo="PLA", color="Rojo", peso_inicial=1000, precio_rollo=20000),
+    "9": Rollo("9", marca="Grilon3", tipo="PETG", color="Negro", peso_inicial=1000, precio_rollo=25000),
+}
+
+
+def csv(texto, nombre="piezas.csv"):
+    archivo = io.BytesIO(texto.encode("utf-8"))
+    archivo.name = nombre
+    return archivo
+
+
+# --- Lectura ---
+@pytest.mark.parametrize("encabezado, columna", [
+    ("Pieza", "pieza"), ("  PESO ", "gramos"), ("print_time", "tiempo"), ("Qty", "cantidad"),
+    ("ID_Rollo", "rollo"), ("$/kg", "precio_kg"), ("Diseño", "diseno"),
+    # Ambiguos: no se adivinan
+    ("ID", None), ("Precio", None), ("", None), (None, None),
+])
+def test_nombre_columna(encabezado, columna):
+    assert nombre_columna(encabezado) == columna
+
+
+def test_leer_piezas_csv_con_alias():
+    piezas = leer_piezas(csv(
+        "﻿Nombre;Peso;Tiempo;Cant;Rollo;Diseño\n"
+        "Gato;50,5;2h 30m;3;7;1\n"
+        "\n"
+        ";10;45m;;;\n"
+    ))
+    assert piezas == [
+        {"fila": 2, "pieza": "Gato", "gramos": 50.5, "horas": 2.5, "cantidad": 3,
+         "rollo": "7", "precio_kg": None, "hs_diseno": 1.0},
+        {"fila": 4, "pieza": "Pieza 3", "gramos": 10.0, "horas": 0.75, "cantidad": 1,
+         "rollo": "", "precio_kg": None, "hs_diseno": 0.0},
+    ]
+
+
+def test_leer_piezas_ignora_id_y_precio_genericos():
+    piezas = leer_piezas(csv("ID,Pieza,Gramos,Tiempo,Precio\n12,Vaso,80,3h,4500\n"))
+    assert piezas[0]["rollo"] == ""
+    assert piezas[0]["precio_kg"] is None
+
+
+def test_leer_piezas_sin_gramos():
+    with pytest.raises(ValueError):
+        leer_piezas(csv("pieza,tiempo\nGato,2h\n"))
+    assert leer_piezas(csv("")) == []
+
+
+def test_leer_piezas_xlsx():
+    openpyxl = pytest.importorskip("openpyxl")
+    libro = openpyxl.Workbook()
+    libro.active.append(["Part", "Grams", "Time", "Quantity", "price_kg"])
+    libro.active.append(["Gato", 50, 2.5, 2, 18000])
+    archivo = io.BytesIO()
+    libro.save(archivo)
+    archivo.seek(0)
+    piezas = leer_piezas(archivo, "piezas.xlsx")
+    assert [(p["pieza"], p["gramos"], p["horas"], p["cantidad"], p["precio_kg"]) for p in piezas] == \
+        [("Gato", 50, 2.5, 2, 18000)]
+
+
+@pytest.mark.skipif(cotizacion_lote.HAS_OPENPYXL, reason="openpyxl está instalado")
+def test_leer_piezas_xlsx_sin_openpyxl():
+    with pytest.raises(ImportError):
+        leer_piezas(io.BytesIO(b""), "piezas.xlsx")
+
+
+# --- Cotización ---
+def cotizar(texto):
+    pytest.importorskip("numpy")
+    return cotizar_piezas(leer_piezas(csv(texto)), cotizacion.CONFIG_DEFECTO, ROLLOS.get)
+
+
+PLANILLA = (
+    "pieza,gramos,tiempo,cantidad,rollo,precio_kg,diseno\n"
+    "Gato,50,2h,2,7,,1\n"
+    "Llavero,10,30m,5,9,,\n"
+    "Vaso,80,3h,1,99,,\n"          # Rollo inexistente
+    "Maceta,120,4h,1,,,\n"         # Sin rollo ni $/kg
+    "Manual,40,1h,1,,18000,\n"
+    "Otro gato,25,1h,4,7,,\n"
+)
+
+
+def test_cotizar_piezas_lineas_con_error():
+    r = cotizar(PLANILLA)
+    assert r["errores"] == ["Fila 4: No existe el rollo 99", "Fila 5: Falta el rollo o el $/kg"]
+    validas = [l for l in r["lineas"] if not l["error"]]
+    assert [l["pieza"] for l in validas] == ["Gato", "Llavero", "Manual", "Otro gato"]
+
+    # Las líneas con error no suman
+    esperado = [
+        cotizacion.calcular(50, 2, 20000, 2, hs_diseno=1)["total_lote"],
+        cotizacion.calcular(10, 0.5, 25000, 5)["total_lote"],
+        cotizacion.calcular(40, 1, 18000, 1)["total_lote"],
+        cotizacion.calcular(25, 1, 20000, 4)["total_lote"],
+    ]
+    assert [l["total"] for l in validas] == pytest.approx(esperado)
+    assert r["total"] == pytest.approx(sum(esperado))
+    assert r["gramos"] == pytest.approx(100 + 50 + 40 + 100)
+    assert validas[0]["material"] == "Elegoo PLA - Rojo"
+    assert validas[2]["material"] == "Manual ($18,000/kg)"
+
+
+def test_filas_historial():
+    r = cotizar(PLANILLA)
+    filas = filas_historial(r, "Ana", responsable="Nahuel", fecha="05/10/2026")
+    assert len(filas) == 4
+    gato = filas[0]
+    assert gato[:9] == ["05/10/2026", "Nahuel", "Ana", "Gato", "Impresión", "Elegoo PLA - Rojo", "-", "50", "2.00h"]
+    assert gato[9:11] == [2, "1 hs"]
+    assert gato[11] == f"${r['lineas'][0]['total']:.2f}"
+    assert gato[12] == f"${r['lineas'][0]['unitario']:.2f}"
+
+
+def test_descuentos_stock_suma_por_rollo():
+    r = cotizar(PLANILLA)
+    # Rollo 7: Gato 2x50 + Otro gato 4x25; el 99 y las manuales no descuentan
+    assert descuentos_stock(r) == pytest.approx({"7": 200, "9": 50})
+
+
+def test_cotizar_sin_piezas():
+    assert cotizar_piezas([], cotizacion.CONFIG_DEFECTO) == {"lineas": [], "total": 0.0, "gramos": 0.0, "errores": []}
@@ -0,0 +1,173 @@
+"""
+Lectura de G-code: totales de cada laminador, recorrido de la extrusión y
+búsqueda de los totales en la cabecera y la cola de archivos grandes.
+"""
+import io
+import math
+import os
+
+import pytest
+
+import gcode
+from gcode import RecorridoGcode, analizar_gcode, mm_a_gramos, parsear_duracion
+
+DATOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datos")
+
+
+def datos(nombre):
+    return os.path.join(DATOS, nombre)
+
+
+@pytest.mark.parametrize("texto, segundos", [
+    ("1d 2h 3m 4s", 93784),
+    ("2h 3m", 7380),
+    ("45m 10s", 2710),
+    ("3723", 3723),
+    ("1.5h", 5400),
+    ("pronto", None),
+])
+def test_parsear_duracion(texto, segundos):
+    assert parsear_duracion(texto) == segundos
+
+
+# --- Totales de cada laminador ---
+def test_prusaslicer():
+    r = analizar_gcode(datos("prusaslicer.gcode"))
+    assert r["laminador"] == "PrusaSlicer"
+    assert r["origen"] == "laminador"
+    assert r["gramos"] == pytest.approx(3.77)
+    assert r["horas"] == pytest.approx(3723 / 3600)
+    assert r["materiales"] == [{"herramienta": 0, "tipo": "PETG", "gramos": 3.77}]
+
+
+def test_cura_en_metros_con_dos_extrusores():
+    r = analizar_gcode(datos("cura.gcode"))
+    assert r["laminador"] == "Cura"
+    assert r["horas"] == pytest.approx(3723 / 3600)
+    # Sin tipo ni densidad: PLA y 1.75mm
+    assert [m["gramos"] for m in r["materiales"]] == pytest.approx([mm_a_gramos(1500), mm_a_gramos(250)])
+
+
+def test_bambu_cabecera():
+    r = analizar_gcode(datos("bambu.gcode"))
+    assert r["laminador"] == "BambuStudio"
+    assert r["gramos"] == pytest.approx(12.57)
+    # "model printing time" no cuenta: vale el total estimado
+    assert r["horas"] == pytest.approx((3600 + 600 + 3) / 3600)
+
+
+def test_acepta_bytes_y_archivos_abiertos():
+    with open(datos("prusaslicer.gcode"), "rb") as f:
+        contenido = f.read()
+        assert analizar_gcode(f)["gramos"] == pytest.approx(3.77)
+        assert not f.closed  # Un archivo ajeno no se cierra
+    assert analizar_gcode(contenido)["gramos"] == pytest.approx(3.77)
+
+
+# --- Recorrido de la extrusión ---
+def recorrer(texto, partido_en=None):
+    """Recorre el texto (opcionalmente partido en dos bloques, como pasa con archivos grandes)"""
+    recorrido = RecorridoGcode()
+    texto = texto.encode()
+    if partido_en is None:
+        recorrido.leer_bloque(texto)
+    else:
+        corte = texto.index(b"\n", partido_en) + 1
+        recorrido.leer_bloque(texto[:corte])
+        recorrido.leer_bloque(texto[corte:])
+    return recorrido
+
+
+ABSOLUTO = """M82
+G1 X10 E5 F6000
+G1 X20 E8
+G1 E7 ; retracción
+G1 E8 ; vuelta
+G92 E0
+G1 X30 E2
+"""
+
+
+def test_recorrido_absoluto_con_g92_y_retraccion():
+    assert recorrer(ABSOLUTO).extruido == {0: pytest.approx(10)}
+    # El mismo resultado si el archivo llega en dos bloques
+    assert recorrer(ABSOLUTO, partido_en=30).extruido == {0: pytest.approx(10)}
+
+
+def test_recorrido_relativo():
+    r = recorrer("M83\nG1 X10 E1.5\nG1 E-0.8\nG1 E0.8\nG1 X20 E2\n")
+    assert r.extruido == {0: pytest.approx(3.5)}
+
+
+def test_recorrido_cambia_de_modo():
+    r = recorrer("M83\nG1 X10 E1\nM82\nG92 E0\nG1 X20 E3\nG1 X30 E4\n")
+    assert r.extruido == {0: pytest.approx(5)}
+
+
+def test_recorrido_por_herramienta():
+    r = recorrer("M83\nT0\nG1 X10 E2\nT1\nG1 X20 E3\nG1 E-1\nT0\nG1 X30 E0.5\n")
+    assert r.extruido == {0: pytest.approx(2.5), 1: pytest.approx(2)}
+
+
+def test_recorrido_tiempo_por_avance():
+    # 100mm a 6000 mm/min = 1s; después 30mm en relativo (G91) al mismo avance
+    r = recorrer("G1 X100 F6000\nG91\nG1 Y30\n")
+    assert r.segundos == pytest.approx(1.3)
+    assert r.pos == (100, 30, 0)
+
+
+def test_sin_totales_se_recorre_el_archivo():
+    texto = "; filament_type = PETG\nM83\nG1 X60 E100 F3600\n"
+    r = analizar_gcode(texto.encode())
+    assert r["origen"] == "recorrido"
+    assert r["materiales"][0]["tipo"] == "PETG"
+    assert r["gramos"] == pytest.approx(mm_a_gramos(100, dens=1.27))
+    assert r["horas"] == pytest.approx(1 / 3600)
+
+
+# --- Archivos grandes: solo cabecera y cola ---
+class ArchivoContado(io.BytesIO):
+    """BytesIO que cuenta cuántos bytes se leyeron"""
+    leidos = 0
+
+    def read(self, n=-1):
+        datos = super().read(n)
+        self.leidos += len(datos)
+        return datos
+
+
+def archivo_grande(cabecera="", cola="", mb=4):
+    linea = b"G1 X12.345 Y67.891 E0.04321\n"
+    cuerpo = linea * (mb * (1 << 20) // len(linea))
+    return ArchivoContado(cabecera.encode() + b"M83\n" + cuerpo + cola.encode())
+
+
+def test_archivo_grande_con_totales_al_final():
+    with open(datos("prusaslicer.gcode"), encoding="utf-8") as f:
+        prusa = f.read()
+    corte = prusa.index("; filament used [mm]")
+    archivo = archivo_grande(cabecera=prusa[:corte], cola=prusa[corte:])
+
+    r = analizar_gcode(archivo)
+    assert r["origen"] == "laminador"
+    assert r["gramos"] == pytest.approx(3.77)
+    assert r["materiales"][0]["tipo"] == "PETG"
+    # Se leyó la cabecera y la cola, no los 4 MB del medio
+    assert archivo.leidos <= gcode.TAM_CABECERA + gcode.TAM_COLA
+
+
+def test_archivo_grande_con_totales_al_principio():
+    with open(datos("bambu.gcode"), encoding="utf-8") as f:
+        archivo = archivo_grande(cabecera=f.read())
+    assert analizar_gcode(archivo)["gramos"] == pytest.approx(12.57)
+    assert archivo.leidos <= gcode.TAM_CABECERA + gcode.TAM_COLA
+
+
+def test_archivo_grande_sin_totales_se_recorre_entero():
+    archivo = archivo_grande(mb=2)
+    r = analizar_gcode(archivo)
+    lineas = archivo.getvalue().count(b"G1 X12.345")
+    assert r["origen"] == "recorrido"
+    assert r["gramos"] == pytest.approx(mm_a_gramos(0.04321 * lineas))
+    assert archivo.leidos >= len(archivo.getvalue())
+    assert not math.isnan(r["horas"])
@@ -0,0 +1,145 @@
+"""
+Historial tipado: cómo se leen importes, tiempos y fechas de la hoja, y la
+TablaHistorial por columnas.
+"""
+import math
+
+import pytest
+
+from historial_tipado import COLUMNAS, TablaHistorial, fecha_iso, importe, minutos, tipar
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    ("$1234.50", 1234.5),
+    ("$1,234.50", 1234.5),        # Miles con coma (filas viejas)
+    ("$ 1.234,50", 1234.5),
+    ("$1.500", 1500),             # Un solo punto con 3 dígitos: miles
+    ("$1,234", 1234),
+    ("1.234.567", 1234567),
+    ("1,234,567.89", 1234567.89),
+    ("12,5", 12.5),
+    ("$0.99", 0.99),
+    ("1500", 1500),
+    (1234.5, 1234.5),
+    (7, 7.0),
+])
+def test_importe(valor, esperado):
+    assert importe(valor) == pytest.approx(esperado)
+
+
+def test_importe_sin_numero_devuelve_el_defecto():
+    assert importe("") == 0.0
+    assert math.isnan(importe("-", float("nan")))
+    assert importe("a convenir", -1) == -1
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    ("3h", 180),
+    ("3h 20m", 200),
+    ("2 hs", 120),
+    ("2:30", 150),
+    ("1.5", 90),
+    ("45m", 45),
+    ("0 hs", 0),
+])
+def test_minutos(valor, esperado):
+    assert minutos(valor) == pytest.approx(esperado)
+
+
+@pytest.mark.parametrize("valor", ["N/A", "-", "", None])
+def test_minutos_sin_tiempo(valor):
+    assert math.isnan(minutos(valor))
+
+
+@pytest.mark.parametrize("valor, esperado", [
+    ("18/10/2026", "2026-10-18"),
+    ("2026-10-18", "2026-10-18"),
+    ("18/10/26", "2026-10-18"),
+    ("18/10/2026 14:30", "2026-10-18"),
+    ("ayer", None),
+    ("", None),
+    (None, None),
+])
+def test_fecha_iso(valor, esperado):
+    assert fecha_iso(valor) == esperado
+
+
+def test_tipar():
+    fila = ["05/10/2026", "Usuario", " Ana ", "Gato", "Impresión", "Grilon3 PETG - Negro", "-",
+            "50", "2h 30m", "3", "1 hs", "$1,234.50", "$411.50"]
+    tipada = dict(zip(COLUMNAS, tipar(fila)))
+    assert tipada["fecha"] == "2026-10-05"
+    assert tipada["cliente"] == "Ana"
+    assert tipada["peso_g"] == 50
+    assert tipada["minutos"] == 150
+    assert tipada["cantidad"] == 3
+    assert tipada["diseno_min"] == 60
+    assert tipada["total"] == pytest.approx(1234.5)
+    assert tipada["unitario"] == pytest.approx(411.5)
+
+
+def test_tipar_fila_corta_o_incompleta():
+    tipada = dict(zip(COLUMNAS, tipar(["sin fecha", "U", "Beto"])))
+    assert tipada["fecha"] is None
+    assert tipada["cantidad"] == 1
+    assert math.isnan(tipada["total"]) and math.isnan(tipada["minutos"])
+
+
+# --- TablaHistorial ---
+def filas_tipadas():
+    filas = [
+        ["01/09/2026", "U", "Ana", "Gato", "Impresión", "Elegoo PLA - Rojo", "-", "50", "2h", "1", "0 hs", "$1000.00", "$1000.00"],
+        ["15/09/2026", "U", "Beto", "Llavero", "Impresión", "Grilon3 PETG - Negro", "-", "10", "1h", "5", "0 hs", "$500.00", "$100.00"],
+        ["02/10/2026", "U", "Ana", "Maceta", "Impresión", "Elegoo PLA - Rojo", "-", "80", "3h", "1", "1 hs", "$2,500.00", "$2500.00"],
+        ["", "U", "Caro", "Vaso", "Venta Directa", "-", "-", "-", "N/A", "2", "N/A", "$300.00", "$150.00"],
+    ]
+    return [(i + 1,) + tipar(f) for i, f in enumerate(filas)]
+
+
+def test_tabla_columnas():
+    tabla = TablaHistorial(filas_tipadas())
+    assert len(tabla) == 4
+    assert list(tabla.posicion) == [1, 2, 3, 4]
+    assert list(tabla.columna("cliente")) == ["Ana", "Beto", "Ana", "Caro"]
+    assert list(tabla.categorias["cliente"]) == ["Ana", "Beto", "Caro"]
+    assert np.isnat(tabla.fecha[3])
+    assert tabla.cantidad.dtype == np.int64
+
+
+def test_tabla_mascaras_y_sumas():
+    tabla = TablaHistorial(filas_tipadas())
+    assert tabla.sumar("total") == pytest.approx(4300)
+    assert tabla.sumar("total", tabla.es("cliente", "Ana")) == pytest.approx(3500)
+    assert not tabla.es("cliente", "Nadie").any()
+    # Sin fecha nunca entra en un rango de fechas
+    assert list(tabla.entre_fechas()) == [True, True, True, False]
+    assert list(tabla.entre_fechas("2026-09-15", "2026-10-01")) == [False, True, False, False]
+    assert tabla.sumar("minutos") == pytest.approx(360)  # Los N/A no cuentan
+
+
+def test_tabla_agrupar():
+    tabla = TablaHistorial(filas_tipadas())
+    claves, sumas = tabla.agrupar("cliente")
+    assert list(claves) == ["Ana", "Beto", "Caro"]
+    assert list(sumas) == pytest.approx([3500, 500, 300])
+
+    claves, sumas = tabla.agrupar("mes")
+    assert list(claves) == ["2026-10", "2026-09"]
+    assert list(sumas) == pytest.approx([2500, 1500])
+
+    claves, sumas = tabla.agrupar("material", "peso_g", mascara=tabla.entre_fechas("2026-09-01", "2026-09-30"))
+    assert dict(zip(claves, sumas)) == pytest.approx({"Elegoo PLA - Rojo": 50, "Grilon3 PETG - Negro": 10})
+
+
+def test_tabla_con_filas_no_toca_la_original():
+    filas = filas_tipadas()
+    original = TablaHistorial(filas[:2])
+    extendida = original.con_filas(filas[2:])
+    assert len(original) == 2 and len(extendida) == 4
+    assert list(original.categorias["cliente"]) == ["Ana", "Beto"]
+    assert list(extendida.columna("cliente")) == ["Ana", "Beto", "Ana", "Caro"]
+    # Los códigos de lo que ya estaba no cambian
+    assert list(extendida.codigos["cliente"][:2]) == list(original.codigos["cliente"])
+    assert extendida.sumar("total") == pytest.approx(TablaHistorial(filas).sumar("total"))
@@ -0,0 +1,153 @@
+"""
+Mallas 3D de la versión web: peso estimado, simplificación para la vista previa
+y pedidos de varias piezas (ZIP y bandejas 3MF).
+"""
+import io
+import os
+import sys
+import zipfile
+
+import pytest
+
+trimesh = pytest.importorskip("trimesh")
+np = pytest.importorskip("numpy")
+
+# malla.py vive solo en version_web (los módulos compartidos se toman de la raíz)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "version_web"))
+import malla  # noqa: E402
+from modelos import DENSIDADES  # noqa: E402
+
+
+def stl(objeto):
+    return objeto.export(file_type="stl")
+
+
+# --- Peso estimado ---
+def test_analizar_caja():
+    a = malla.analizar(trimesh.creation.box(extents=(20, 30, 40)))
+    assert a["volumen_cm3"] == pytest.approx(24)
+    assert a["area_cm2"] == pytest.approx(2 * (600 + 800 + 1200) / 100)
+    assert a["medidas_mm"] == pytest.approx((20, 30, 40))
+    assert a["cerrada"]
+
+
+@pytest.mark.parametrize("material", ["PLA", "Grilon3 PETG - Plata", "TPU"])
+def test_estimar_gramos_macizo_es_volumen_por_densidad(material):
+    esfera = trimesh.creation.icosphere(subdivisions=4, radius=15)
+    a = malla.analizar(esfera)
+    assert a["volumen_cm3"] == pytest.approx(esfera.volume / 1000)
+    assert malla.estimar_gramos(a, material, relleno=100) == pytest.approx(a["volumen_cm3"] * malla.densidad(material))
+
+
+def test_estimar_gramos_cascara_mas_relleno():
+    a = malla.analizar(trimesh.creation.box(extents=(20, 20, 20)))  # 8 cm³, 24 cm²
+    cascara = 24 * 1.2 / 10
+    esperado = (cascara + (8 - cascara) * 0.15) * DENSIDADES["PETG"]
+    assert malla.estimar_gramos(a, "PETG", relleno=15, paredes_mm=1.2) == pytest.approx(esperado)
+    # Paredes más gruesas que la pieza: es toda maciza
+    assert malla.estimar_gramos(a, "PLA", relleno=0, paredes_mm=50) == pytest.approx(8 * DENSIDADES["PLA"])
+
+
+def test_malla_abierta_usa_el_casco_convexo():
+    caja = trimesh.creation.box(extents=(10, 10, 10))
+    abierta = trimesh.Trimesh(vertices=caja.vertices, faces=caja.faces[:-2], process=False)
+    a = malla.analizar(abierta)
+    assert not a["cerrada"]
+    assert a["volumen_cm3"] == pytest.approx(1)
+    assert "Malla abierta (volumen aproximado)" in malla.controles(abierta, a)
+
+
+def test_cargar_stl():
+    cargada = malla.cargar(stl(trimesh.creation.box(extents=(10, 20, 30))), "caja.STL")
+    assert malla.analizar(cargada)["volumen_cm3"] == pytest.approx(6)
+
+
+# --- Simplificación para la vista previa ---
+def test_reducir_baja_los_triangulos_y_conserva_la_caja():
+    esfera = trimesh.creation.icosphere(subdivisions=6, radius=40)  # ~82k triángulos
+    liviana = malla.reducir(esfera, presupuesto=5000)
+    assert len(liviana.faces) <= 5000
+    assert len(liviana.faces) < len(esfera.faces)
+    # La forma se mantiene: misma caja (con el error de una celda)
+    celda = np.sqrt(2 * esfera.area / 5000)
+    assert np.allclose(liviana.bounds, esfera.bounds, atol=celda)
+
+
+def test_reducir_dentro_del_presupuesto_no_copia():
+    caja = trimesh.creation.box(extents=(10, 10, 10))
+    assert malla.reducir(caja, presupuesto=100) is caja
+
+
+def test_agrupar_vertices_funde_y_descarta_aplastados():
+    # Dos vértices casi iguales: el triángulo que los usa a los dos desaparece
+    vertices = np.array([[0, 0, 0], [0.01, 0, 0], [10, 0, 0], [0, 10, 0]], dtype=float)
+    caras = np.array([[0, 2, 3], [1, 2, 3], [0, 1, 3]])
+    nuevos, nuevas_caras = malla.agrupar_vertices(vertices, caras, celda=1.0)
+    assert len(nuevos) == 3
+    assert nuevos[0] == pytest.approx([0.005, 0, 0])
+    # [0,2,3] y [1,2,3] quedan iguales (se deja uno) y [0,1,3] queda aplastado
+    assert len(nuevas_caras) == 1
+
+
+# --- Pedidos de varias piezas ---
+def test_expandir_zip_con_dos_stl():
+    archivo = io.BytesIO()
+    with zipfile.ZipFile(archivo, "w") as z:
+        z.writestr("pedido/caja.stl", stl(trimesh.creation.box(extents=(10, 10, 10))))
+        z.writestr("pedido/esfera.STL", stl(trimesh.creation.icosphere(radius=5)))
+        z.writestr("pedido/leeme.txt", "no es una pieza")
+        z.writestr("__MACOSX/pedido/._caja.stl", b"basura")
+        z.writestr("pedido/", b"")
+    partes = malla.expandir_zip("pedido.zip", archivo.getvalue())
+    assert [nombre for nombre, _ in partes] == ["caja.stl", "esfera.STL"]
+    assert malla.analizar(malla.cargar(partes[0][1], partes[0][0]))["volumen_cm3"] == pytest.approx(1)
+
+
+def test_expandir_zip_deja_pasar_lo_que_no_es_zip():
+    datos = stl(trimesh.creation.box())
+    assert malla.expandir_zip("caja.stl", datos) == [("caja.stl", datos)]
+
+
+def bandeja_3mf(objetos):
+    escena = trimesh.Scene()
+    for nombre, objeto, desplazamiento in objetos:
+        escena.add_geometry(objeto, node_name=nombre, transform=trimesh.transformations.translation_matrix(desplazamiento))
+    return escena.export(file_type="3mf")
+
+
+def test_dividir_bandeja_3mf_en_piezas_posicionadas():
+    datos = bandeja_3mf([
+        ("caja", trimesh.creation.box(extents=(10, 10, 10)), (0, 0, 0)),
+        ("torre", trimesh.creation.box(extents=(10, 10, 30)), (50, 0, 0)),
+    ])
+    partes = malla.dividir("bandeja.3mf", datos)
+    assert len(partes) == 2
+    volumenes = sorted(malla.analizar(malla.cargar(d, "x.stl"))["volumen_cm3"] for _, d in partes)
+    assert volumenes == pytest.approx([1, 3])
+    centros = sorted(round(malla.cargar(d, "x.stl").bounds.mean(axis=0)[0]) for _, d in partes)
+    assert centros == [0, 50]
+
+
+def test_dividir_deja_igual_un_solo_objeto():
+    datos = stl(trimesh.creation.box())
+    assert malla.dividir("caja.stl", datos) == [("caja.stl", datos)]
+    un_objeto = bandeja_3mf([("caja", trimesh.creation.box(), (0, 0, 0))])
+    assert malla.dividir("caja.3mf", un_objeto) == [("caja.3mf", un_objeto)]
+
+
+def test_analizar_en_paralelo_zip_y_bandeja():
+    from concurrent.futures import ThreadPoolExecutor
+    archivos = [
+        ("caja.stl", stl(trimesh.creation.box(extents=(10, 10, 10)))),
+        ("bandeja.3mf", bandeja_3mf([
+            ("a", trimesh.creation.box(extents=(10, 10, 10)), (0, 0, 0)),
+            ("b", trimesh.creation.box(extents=(10, 10, 20)), (40, 0, 0)),
+        ])),
+        ("rota.stl", b"esto no es un stl"),
+    ]
+    # Las funciones son las mismas que en el pool de procesos; con hilos el test es más rápido
+    with ThreadPoolExecutor(2) as pool:
+        resultados = list(malla.analizar_en_paralelo(pool, archivos))
+    assert len(resultados) == 4
+    assert sorted(r["volumen_cm3"] for r in resultados if "error" not in r) == pytest.approx([1, 1, 2])
+    assert [r["nombre"] for r in resultados if "error" in r] == ["rota.stl"]
@@ -0,0 +1,139 @@
+"""
+Índice del inventario: los filtros dan lo mismo que recorrer la lista, y las copias
+de con_rollo / con_pesos quedan igual que un índice armado de cero sin tocar el original.
+"""
+import random
+
+import pytest
+
+from modelos import IndiceInventario, Rollo
+
+MARCAS = ["Grilon3", "Elegoo", "Printalot"]
+TIPOS = ["PLA", "PETG", "ABS"]
+COLORES = ["Rojo", "Negro", "Blanco", "Plata"]
+
+
+def rollos_al_azar(cantidad, semilla=0):
+    azar = random.Random(semilla)
+    return [Rollo(
+        id=str(1000 + i), marca=azar.choice(MARCAS), tipo=azar.choice(TIPOS), color=azar.choice(COLORES),
+        peso_inicial=1000.0, peso_actual=float(azar.randint(0, 1000)), precio_rollo=20000.0
+    ) for i in range(cantidad)]
+
+
+def foto(indice):
+    """Todo lo que se puede consultar de un índice, para compararlo"""
+    return {
+        "rollos": [(r.id, r.marca, r.tipo, r.color, r.peso_actual) for r in indice.rollos],
+        "por_id": {k: (r.id, r.peso_actual) for k, r in indice.por_id.items()},
+        "por_campo": {c: {k: list(g) for k, g in grupos.items()} for c, grupos in indice.por_campo.items()},
+        "etiquetas": {c: dict(v) for c, v in indice.etiquetas.items()},
+        "por_peso": list(indice.por_peso),
+    }
+
+
+@pytest.fixture
+def rollos():
+    return rollos_al_azar(60)
+
+
+@pytest.fixture
+def indice(rollos):
+    return IndiceInventario(rollos)
+
+
+# --- Consultas ---
+@pytest.mark.parametrize("tipo", [None, "PLA", "pla ", "Nylon"])
+@pytest.mark.parametrize("color", [None, "Rojo", "plata"])
+@pytest.mark.parametrize("peso_minimo", [None, 0, 500, 1001])
+def test_filtrar_igual_que_recorrer(rollos, indice, tipo, color, peso_minimo):
+    esperado = [
+        r for r in rollos
+        if (tipo is None or r.tipo.lower() == tipo.strip().lower())
+        and (color is None or r.color.lower() == color.strip().lower())
+        and (peso_minimo is None or r.peso_actual >= peso_minimo)
+    ]
+    assert indice.filtrar(tipo=tipo, color=color, peso_minimo=peso_minimo) == esperado
+
+
+def test_filtrar_por_marca_respeta_el_orden(rollos, indice):
+    assert indice.filtrar(marca="Elegoo") == [r for r in rollos if r.marca == "Elegoo"]
+
+
+@pytest.mark.parametrize("gramos", [-1, 0, 1, 250, 999, 1000, 1001])
+def test_con_peso_minimo(rollos, indice, gramos):
+    assert indice.con_peso_minimo(gramos) == {str(r.id) for r in rollos if r.peso_actual >= gramos}
+
+
+def test_buscar_y_valores(rollos, indice):
+    assert indice.buscar(1005) is rollos[5]
+    assert indice.buscar("no existe") is None
+    assert indice.valores("tipo") == sorted({r.tipo for r in rollos})
+
+
+# --- Copias ---
+def test_con_rollo_agrega_al_final_sin_tocar_el_original(rollos, indice):
+    antes = foto(indice)
+    nuevo = Rollo(id="9999", marca="Nueva", tipo="TPU", color="Verde", peso_actual=800.0)
+
+    copia = indice.con_rollo(nuevo)
+
+    assert foto(indice) == antes
+    assert foto(copia) == foto(IndiceInventario(rollos + [nuevo]))
+    assert indice.buscar("9999") is None and indice.valores("tipo") == sorted(set(TIPOS))
+    assert copia.filtrar(tipo="tpu") == [nuevo]
+
+
+def test_con_rollo_reemplaza_en_su_lugar(rollos, indice):
+    antes = foto(indice)
+    viejo = rollos[10]
+    cambiado = Rollo(id=viejo.id, marca=viejo.marca, tipo="ASA", color=viejo.color, peso_actual=5.0)
+
+    copia = indice.con_rollo(cambiado)
+
+    assert foto(indice) == antes
+    esperado = rollos[:10] + [cambiado] + rollos[11:]
+    assert foto(copia) == foto(IndiceInventario(esperado))
+    assert copia.rollos[10] is cambiado
+    assert viejo in indice.filtrar(tipo=viejo.tipo) and viejo not in copia.filtrar(tipo=viejo.tipo)
+
+
+def test_con_pesos_no_cambia_los_rollo_originales(rollos, indice):
+    antes = foto(indice)
+    pesos = {1003: 0.0, "1007": 999.0, "1020": 12.5, "no existe": 1.0}
+
+    copia = indice.con_pesos(pesos)
+
+    assert foto(indice) == antes
+    assert rollos[3].peso_actual == antes["rollos"][3][4]
+    assert copia.buscar("1003").peso_actual == 0.0 and copia.buscar("1003").estado == "⚫ Vacío"
+    assert copia.buscar("1003") is not rollos[3]
+    assert copia.buscar("1004") is rollos[4]  # Los que no cambian se comparten
+
+    esperado = IndiceInventario(rollos).con_pesos({})
+    for id_rollo, peso in pesos.items():
+        if indice.buscar(id_rollo):
+            rollo = Rollo(**{c: getattr(indice.buscar(id_rollo), c) for c in
+                             ("id", "fecha", "marca", "tipo", "color", "acabado", "peso_inicial", "precio_rollo")},
+                          peso_actual=peso)
+            esperado = esperado.con_rollo(rollo)
+    assert foto(copia) == foto(esperado)
+
+
+def test_copias_encadenadas_son_independientes(rollos, indice):
+    azar = random.Random(1)
+    versiones = [(indice, foto(indice))]
+    actual = indice
+    for _ in range(30):
+        if azar.random() < 0.5:
+            actual = actual.con_pesos({azar.choice(rollos).id: float(azar.randint(0, 1000))})
+        else:
+            base = azar.choice(rollos)
+            actual = actual.con_rollo(Rollo(id=base.id, marca=azar.choice(MARCAS), tipo=azar.choice(TIPOS),
+                                            color=azar.choice(COLORES), peso_actual=float(azar.randint(0, 1000))))
+        versiones.append((actual, foto(actual)))
+
+    # Ninguna copia posterior cambió a las anteriores, y todas equivalen a armarlas de cero
+    for version, guardada in versiones:
+        assert foto(version) == guardada
+        assert foto(version) == foto(IndiceInventario(version.rollos))
@@ -1,11 +1,17 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import altair as alt
 from datetime import datetime
 import json
 import os
 import io 
-import trimesh 
-import tempfile # <--- NUEVO: Para crear archivos temporales seguros
+import malla
+import gcode
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import tempfile # Carpeta temporal del sistema (para la cache de vistas previas)
 from streamlit_stl import stl_from_file 
 
 # --- CONFIGURACIÓN DE PÁGINA ---
@@ -21,6 +27,70 @@ if not os.path.exists("credenciales.json"):
 
 # Importamos el backend
 from backend import BackendGestor 
+from cache import CacheArchivos
+import cotizacion
+import cotizacion_lote
+import analitica
+
+# --- ANÁLISIS DE MALLAS (memoizado por hash del contenido) ---
+# Streamlit re-ejecuta todo el script en cada click: sin esto la malla
+# se volvería a leer y convertir en cada cambio de un widget.
+@st.cache_resource(max_entries=16, show_spinner="Leyendo malla...")
+def cargar_malla(huella, nombre, _datos):
+    return malla.cargar(_datos, nombre)
+
+# Vistas previas (STL) y medidas en disco, por hash del contenido: una sola carpeta
+# compartida por todas las sesiones, con tope de tamaño y vencimiento.
+VISTAS_MAX_MB = 500
+VISTAS_MAX_DIAS = 3
+
+@st.cache_resource
+def obtener_cache_vistas():
+    return CacheArchivos(
+        os.path.join(tempfile.gettempdir(), "snok_vistas"),
+        max_bytes=VISTAS_MAX_MB * 1024 * 1024, max_edad=VISTAS_MAX_DIAS * 24 * 3600
+    )
+
+@st.cache_data(max_entries=64, show_spinner="Analizando malla...")
+def analizar_malla(huella, nombre, _datos):
+    return obtener_cache_vistas().obtener_json(
+        huella, lambda: malla.analizar(cargar_malla(huella, nombre, _datos))
+    )
+
+def vista_previa(huella, nombre, datos):
+    """
+    Ruta del STL para el visor: se genera una vez por contenido y después se reutiliza.
+    Las mallas pesadas se simplifican (malla.reducir) para que la vista cargue rápido
+    hasta en el celular; las medidas siguen saliendo de la malla completa.
+    """
+    def generar(destino):
+        completa = cargar_malla(huella, nombre, datos)
+        if nombre.lower().endswith(".stl") and len(completa.faces) <= malla.PRESUPUESTO_VISTA:
+            with open(destino, "wb") as f:
+                f.write(datos)
+        else:
+            # 3MF o malla pesada: se exporta (simplificada si hace falta) una sola vez
+            malla.reducir(completa).export(destino, file_type="stl")
+    clave = f"{huella}_{malla.PRESUPUESTO_VISTA}"  # Si cambia el presupuesto, se regenera
+    return obtener_cache_vistas().obtener(clave, ".stl", generar)
+
+@st.cache_data(max_entries=64, show_spinner="Leyendo G-code...")
+def analizar_gcode_subido(huella, _archivo):
+    return gcode.analizar_gcode(_archivo)
+
+# Pool de procesos compartido para analizar pedidos de muchas piezas (uno por núcleo).
+# "spawn" porque el servidor de Streamlit tiene hilos y hacer fork con hilos no es seguro.
+@st.cache_resource
+def obtener_pool():
+    return ProcessPoolExecutor(max_workers=os.cpu_count() or 2, mp_context=multiprocessing.get_context("spawn"))
+
+def huella_subida(archivo):
+    """Hash del archivo subido, calculado una sola vez por subida (no en cada re-ejecución)"""
+    memo = st.session_state.setdefault("huellas", {})
+    clave = getattr(archivo, "file_id", None) or (archivo.name, archivo.size)
+    if clave not in memo:
+        memo[clave] = malla.huella(archivo.getvalue())
+    return memo[clave]
 
 # --- ESTILOS CSS ---
 st.markdown("""
@@ -32,17 +102,27 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- INICIALIZAR BACKEND ---
-if 'backend' not in st.session_state:
-    st.session_state.backend = BackendGestor()
+# Un solo backend para todo el proceso: un cliente de Google autorizado y una sola
+# copia del inventario/historial, compartida por todas las sesiones (pestañas, celulares).
+@st.cache_resource
+def obtener_backend():
+    return BackendGestor()
+
+backend = obtener_backend()
 
-backend = st.session_state.backend
-cfg = backend.configuracion
+# La configuración es compartida; si una sesión la edita, se queda con su propia copia
+cfg = st.session_state.get("cfg_propia", backend.configuracion)
+
+# Inventario desde la cache del backend (si está vencido se refresca en segundo plano)
+inventario = backend.obtener_inventario()
 
 # --- TÍTULO ---
 st.title("🌐 Panel Web de Impresión 3D")
 
 # --- PESTAÑAS ---
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["🖨️ Cotizador", "📦 Stock", "📋 Historial", "🔑 Ventas", "⚙️ Config"])
+tab1, tab_lote, tab2, tab3, tab_resumen, tab4, tab5 = st.tabs(
+    ["🖨️ Cotizador", "🧾 Lote", "📦 Stock", "📋 Historial", "📊 Resumen", "🔑 Ventas", "⚙️ Config"]
+)
 
 # ==============================================================================
 # PESTAÑA 1: COTIZADOR
@@ -55,33 +135,32 @@ with tab1:
         st.subheader("📂 Visualización 3D")
         archivo_3d = st.file_uploader("Suelte su STL o 3MF aquí", type=["stl", "3mf"])
         
+        analisis_3d = None
         if archivo_3d is not None:
+            datos_3d = archivo_3d.getvalue()
+            huella_3d = huella_subida(archivo_3d)
+            try:
+                analisis_3d = analizar_malla(huella_3d, archivo_3d.name, datos_3d)
+                a1, a2, a3 = st.columns(3)
+                a1.metric("Volumen", f"{analisis_3d['volumen_cm3']:,.1f} cm³")
+                a2.metric("Superficie", f"{analisis_3d['area_cm2']:,.0f} cm²")
+                a3.metric("Medidas (mm)", " x ".join(f"{d:.0f}" for d in analisis_3d["medidas_mm"]))
+                if not analisis_3d["cerrada"]:
+                    st.warning("La malla no es cerrada: el volumen es aproximado (casco convexo).")
+            except Exception as e:
+                st.error(f"Error analizando la malla: {e}")
+
             st.caption("Vista Previa (Gire con el mouse):")
             try:
-                # 1. Creamos un archivo temporal físico en el sistema
-                suffix = ".stl" # Siempre usaremos extensión .stl para el temp
-                with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-                    
-                    # CASO A: Es un STL
-                    if archivo_3d.name.lower().endswith('.stl'):
-                        tmp_file.write(archivo_3d.getvalue())
-                        
-                    # CASO B: Es un 3MF (Convertimos y guardamos)
-                    elif archivo_3d.name.lower().endswith('.3mf'):
-                        with st.spinner("Convirtiendo 3MF a STL..."):
-                            archivo_3d.seek(0)
-                            mesh = trimesh.load(archivo_3d, file_type='3mf')
-                            if isinstance(mesh, trimesh.Scene):
-                                mesh = mesh.dump(concatenate=True)
-                            mesh.export(tmp_file.name)
-                
-                # 2. Le pasamos la RUTA DEL ARCHIVO (String) al visualizador
+                # Le pasamos la RUTA DEL ARCHIVO (String) al visualizador
                 # Esto evita el error de "embedded null byte" porque ya no pasamos bytes crudos
-                stl_from_file(file_path=tmp_file.name, height=300, color="#3498db")
-                
-                # 3. Limpieza (Opcional, el sistema operativo limpia temps eventualmente)
-                # os.unlink(tmp_file.name) 
-
+                with st.spinner("Preparando vista previa..."):
+                    ruta_vista = vista_previa(huella_3d, archivo_3d.name, datos_3d)
+                stl_from_file(file_path=ruta_vista, height=300, color="#3498db")
+                if analisis_3d and analisis_3d["triangulos"] > malla.PRESUPUESTO_VISTA:
+                    st.caption(f"🔻 Vista simplificada ({analisis_3d['triangulos']:,} → "
+                               f"~{malla.PRESUPUESTO_VISTA:,} triángulos). "
+                               "Volumen y peso se calculan sobre la malla completa.")
             except Exception as e:
                 st.error(f"Error visualizando: {e}")
         st.divider()
@@ -95,18 +174,12 @@ with tab1:
         lista_stock = ["--- Manual ---"]
         datos_stock = {} 
         
-        if backend.inventario:
-            for item in backend.inventario:
-                marca = item.get("Marca") or item.get("marca") or ""
-                tipo = item.get("Tipo") or item.get("tipo") or ""
-                color = item.get("Color") or item.get("color") or ""
-                try:
-                    p_act = float(str(item.get("Peso_Actual") or 0).replace(',', '.'))
-                except: p_act = 0
-                
-                label = f"{marca} {tipo} - {color} ({int(p_act)}g)"
+        if inventario:
+            # Los rollos ya vienen normalizados del backend (clase Rollo)
+            for rollo in inventario:
+                label = f"{rollo.marca} {rollo.tipo} - {rollo.color} ({int(rollo.peso_actual)}g)"
                 lista_stock.append(label)
-                datos_stock[label] = item
+                datos_stock[label] = rollo
             
         seleccion = st.selectbox("Material", lista_stock)
         
@@ -114,23 +187,48 @@ with tab1:
         stock_seleccionado = None
         
         if seleccion != "--- Manual ---":
-            item = datos_stock[seleccion]
-            stock_seleccionado = item
-            try:
-                p_rollo = float(str(item.get("Precio_Rollo") or 0).replace(',', '.'))
-                p_ini = float(str(item.get("Peso_Inicial") or 1000).replace(',', '.'))
-                if p_ini > 0:
-                    precio_kg_defecto = (p_rollo / p_ini) * 1000
-            except: pass
+            stock_seleccionado = datos_stock[seleccion]
+            precio_kg_defecto = stock_seleccionado.precio_kg
             
         costo_repo = st.number_input("Costo Reposición ($/kg)", value=float(precio_kg_defecto), step=500.0)
 
+        # Peso estimado a partir de la malla (según material, relleno y paredes de la Config)
+        peso_estimado = 0.0
+        if analisis_3d:
+            if stock_seleccionado:
+                material_3d = stock_seleccionado.tipo
+            else:
+                material_3d = st.selectbox("Material (para la densidad)", list(malla.DENSIDADES))
+            relleno = float(cfg.get("relleno", malla.RELLENO_DEFECTO))
+            paredes = float(cfg.get("paredes_mm", malla.PAREDES_MM_DEFECTO))
+            peso_estimado = round(malla.estimar_gramos(analisis_3d, material_3d, relleno, paredes), 1)
+            st.caption(f"⚖️ Peso estimado: {peso_estimado:g}g ({material_3d}, "
+                       f"{malla.densidad(material_3d)} g/cm³, relleno {relleno:g}%, paredes {paredes:g}mm)")
+
     with col_der:
         st.subheader("Parámetros")
-        peso = st.number_input("Peso (g)", min_value=0.0, step=1.0)
+
+        # G-code del laminador: gramos y tiempo exactos (tiene prioridad sobre la malla)
+        archivo_gcode = st.file_uploader("G-code (opcional)", type=["gcode", "gco", "g"])
+        horas_gcode = minutos_gcode = 0
+        if archivo_gcode is not None:
+            try:
+                datos_gcode = analizar_gcode_subido(huella_subida(archivo_gcode), archivo_gcode)
+                peso_estimado = round(datos_gcode["gramos"], 2)
+                minutos_totales = round(datos_gcode["horas"] * 60)
+                horas_gcode, minutos_gcode = minutos_totales // 60, minutos_totales % 60
+                detalle = " + ".join(f"T{m['herramienta']} {m['tipo'] or '?'} {m['gramos']:.1f}g"
+                                     for m in datos_gcode["materiales"])
+                origen = "datos del laminador" if datos_gcode["origen"] == "laminador" else "estimado recorriendo el archivo"
+                st.caption(f"📄 {datos_gcode['laminador']}: {detalle or 'sin extrusión'} | "
+                           f"{horas_gcode}h {minutos_gcode}m ({origen})")
+            except Exception as e:
+                st.error(f"No se pudo leer el G-code: {e}")
+
+        peso = st.number_input("Peso (g)", min_value=0.0, step=1.0, value=peso_estimado)
         c1, c2 = st.columns(2)
-        horas = c1.number_input("Horas", min_value=0, step=1)
-        minutos = c2.number_input("Minutos", min_value=0, max_value=59, step=1)
+        horas = c1.number_input("Horas", min_value=0, step=1, value=horas_gcode)
+        minutos = c2.number_input("Minutos", min_value=0, max_value=59, step=1, value=minutos_gcode)
         tiempo_total = horas + (minutos/60)
         cantidad = st.number_input("Cantidad", min_value=1, step=1)
         
@@ -142,17 +240,14 @@ with tab1:
 
     # --- CÁLCULO ---
     if st.button("CALCULAR 🧮", type="primary"):
-        peso_real = peso * (1 + margen)
-        costo_mat = (peso_real / 1000) * costo_repo
-        costo_luz = tiempo_total * cfg.get("consumo_kw", 0.2) * cfg.get("precio_kwh", 150)
-        costo_maq = tiempo_total * cfg.get("precio_desgaste_hora", 200)
-        
-        subtotal = costo_mat + costo_luz + costo_maq
-        precio_venta_unit = subtotal * (1 + cfg.get("margen_ganancia", 100)/100)
-        costo_diseno = hs_diseno * cfg.get("precio_hora_diseno", 8000)
-        
-        total_lote = (precio_venta_unit * cantidad) + costo_diseno
-        unitario = total_lote / cantidad
+        r = cotizacion.calcular(
+            peso, tiempo_total, costo_repo, cantidad,
+            margen_fallo=margen, hs_diseno=hs_diseno, cfg=cfg
+        )
+        peso_real = r["peso_real"]
+        subtotal = r["costo_puro"]
+        total_lote = r["total_lote"]
+        unitario = r["unitario_final"]
         
         st.success(f"💰 TOTAL: ${total_lote:,.2f}")
         c1, c2, c3 = st.columns(3)
@@ -175,7 +270,7 @@ with tab1:
                 st.error("Falta Cliente")
             else:
                 if d['stock']:
-                    id_rollo = d['stock'].get("ID")
+                    id_rollo = d['stock'].id
                     if id_rollo:
                         backend.descontar_stock(id_rollo, d['peso_real']*d['cant'])
                 
@@ -190,6 +285,197 @@ with tab1:
                 else:
                     st.error("Error de conexión con Drive")
 
+    # --- SENSIBILIDAD: ¿QUÉ PASA SI SUBE LA LUZ / EL FILAMENTO? ---
+    with st.expander("📈 ¿Y si...? (sensibilidad de precios)"):
+        nombres = list(cotizacion.PARAMETROS_BARRIDO)
+        etiqueta = cotizacion.PARAMETROS_BARRIDO.get
+
+        s1, s2, s3 = st.columns(3)
+        origen = s1.radio("Trabajos", ["Cotización actual", "Últimos del historial"])
+        n_hist = s2.number_input("Últimos N", min_value=1, value=20, step=1)
+        kg_hist = s3.number_input("$/kg historial", min_value=0.0, value=float(costo_repo or 20000), step=500.0)
+
+        def valor_actual(parametro):
+            if parametro == "precio_kg":
+                return float(costo_repo) if origen == "Cotización actual" else float(kg_hist)
+            return float(cotizacion.parametros(cfg)[parametro])
+
+        e1, e2 = st.columns(2)
+        eje_x = e1.selectbox("Eje X", nombres, format_func=etiqueta)
+        eje_y = e2.selectbox("Eje Y", [None] + nombres, format_func=lambda p: etiqueta(p, "— Ninguno —"))
+        pasos = st.slider("Pasos por eje", 2, 100, 21)
+
+        def rango(parametro, col):
+            base = valor_actual(parametro)
+            desde, hasta = col.slider(
+                f"Rango {etiqueta(parametro)}", 0.0, max(base * 3, 1.0), (base * 0.5, base * 1.5)
+            )
+            return np.linspace(desde, hasta, pasos)
+
+        valores_x = rango(eje_x, e1)
+        valores_y = rango(eje_y, e2) if eje_y else None
+
+        if origen == "Cotización actual":
+            trabajos = [{"peso_g": peso * (1 + margen), "horas": tiempo_total, "precio_kg": costo_repo,
+                         "cantidad": cantidad, "hs_diseno": hs_diseno}] if peso > 0 else []
+        else:
+            trabajos = cotizacion_lote.trabajos_desde_tabla(backend.obtener_tabla_historial(), n_hist, kg_hist)
+
+        if eje_x == eje_y:
+            st.warning("Elegí dos parámetros distintos.")
+        elif not trabajos:
+            st.info("Cargá el peso de la pieza (o elegí el historial) para ver el análisis.")
+        else:
+            grilla = cotizacion.sensibilidad(trabajos, eje_x, valores_x, eje_y, valores_y, cfg=cfg)
+            base = cotizacion.sensibilidad(trabajos, eje_x, [valor_actual(eje_x)], cfg=cfg)[0]
+            st.metric(f"Total actual ({len(trabajos)} trabajos)", f"${base:,.2f}",
+                      f"rango ${grilla.min():,.0f} a ${grilla.max():,.0f}", delta_color="off")
+
+            if eje_y is None:
+                st.line_chart(pd.DataFrame({"Total": grilla}, index=pd.Index(valores_x, name=etiqueta(eje_x))))
+            else:
+                xx, yy = np.meshgrid(valores_x, valores_y)
+                df_grilla = pd.DataFrame({"x": xx.ravel(), "y": yy.ravel(), "Total": grilla.ravel()})
+                st.altair_chart(alt.Chart(df_grilla).mark_rect().encode(
+                    x=alt.X("x:O", title=etiqueta(eje_x), axis=alt.Axis(format=",.4~g")),
+                    y=alt.Y("y:O", title=etiqueta(eje_y), sort="descending", axis=alt.Axis(format=",.4~g")),
+                    color=alt.Color("Total:Q", scale=alt.Scale(scheme="redyellowgreen", reverse=True)),
+                    tooltip=["x", "y", alt.Tooltip("Total:Q", format="$,.2f")]
+                ), use_container_width=True)
+            if st.checkbox("Ver tabla"):
+                st.dataframe(pd.DataFrame(
+                    np.atleast_2d(grilla), columns=[f"{v:g}" for v in valores_x],
+                    index=[f"{v:g}" for v in valores_y] if eje_y else ["Total"]
+                ).round(2))
+
+# ==============================================================================
+# PESTAÑA LOTE: PEDIDO DESDE PLANILLA
+# ==============================================================================
+with tab_lote:
+    st.caption("Columnas: pieza | gramos | tiempo | cantidad | rollo (ID) o precio_kg | diseno")
+    planilla = st.file_uploader("Planilla de piezas", type=["csv", "xlsx"], key="planilla_lote")
+    c1, c2, c3 = st.columns(3)
+    lote_cliente = c1.text_input("Cliente", key="lote_cliente")
+    lote_margen = c2.number_input("Fallo (%)", min_value=0, max_value=100, value=0, step=1)
+    lote_stock = c3.checkbox("Descontar stock", value=True)
+
+    if planilla is not None:
+        try:
+            piezas = cotizacion_lote.leer_piezas(io.BytesIO(planilla.getvalue()), planilla.name)
+        except Exception as e:
+            st.error(f"No se pudo leer la planilla: {e}")
+            piezas = []
+
+        if piezas:
+            res = cotizacion_lote.cotizar_piezas(
+                piezas, cfg, buscar_rollo=backend.buscar_rollo, margen_fallo=lote_margen / 100
+            )
+            st.dataframe(pd.DataFrame([{
+                "Pieza": l["pieza"], "Material": l["material"], "Gramos": l["gramos"],
+                "Horas": round(l["horas"], 2), "Cant": l["cantidad"], "Diseño": l["hs_diseno"],
+                "Unitario": round(l["unitario"], 2), "Total": round(l["total"], 2),
+                "Estado": l["error"] or "✅"
+            } for l in res["lineas"]]), use_container_width=True)
+
+            m1, m2, m3 = st.columns(3)
+            m1.metric("Total Pedido", f"${res['total']:,.2f}")
+            m2.metric("Material Total", f"{res['gramos']:,.0f}g")
+            m3.metric("Líneas con error", len(res["errores"]))
+            for err in res["errores"][:10]:
+                st.warning(err)
+
+            if st.button("💾 GUARDAR PEDIDO"):
+                if not lote_cliente:
+                    st.error("Falta Cliente")
+                else:
+                    filas = cotizacion_lote.filas_historial(res, lote_cliente, responsable="Web")
+                    descuentos = cotizacion_lote.descuentos_stock(res) if lote_stock else {}
+                    if backend.guardar_lote(filas, descuentos):
+                        st.toast(f"✅ Pedido guardado ({len(filas)} líneas)")
+                    else:
+                        st.error("Error de conexión con Drive")
+
+    # --- PIEZAS 3D: VARIOS STL, ZIP O BANDEJA 3MF ---
+    st.divider()
+    st.markdown("#### 🧩 Piezas 3D (varios STL, ZIP o bandeja 3MF)")
+    subidas = st.file_uploader("Archivos de piezas", type=["stl", "3mf", "zip"],
+                               accept_multiple_files=True, key="piezas_3d")
+
+    if subidas:
+        p1, p2, p3, p4 = st.columns(4)
+        opciones_rollo = ["--- Manual ---"] + [r.id for r in inventario]
+        etiqueta_rollo = {r.id: f"{r.marca} {r.tipo} - {r.color}" for r in inventario}
+        id_rollo_3d = p1.selectbox("Material", opciones_rollo, format_func=lambda i: etiqueta_rollo.get(i, i))
+        rollo_3d = backend.buscar_rollo(id_rollo_3d) if id_rollo_3d != "--- Manual ---" else None
+        kg_3d = p2.number_input("$/kg", value=float(rollo_3d.precio_kg if rollo_3d else 20000), step=500.0,
+                                disabled=rollo_3d is not None)
+        gph = p3.number_input("Velocidad (g/h)", min_value=1.0, value=15.0, step=1.0)
+        copias = p4.number_input("Copias de cada pieza", min_value=1, value=1, step=1)
+
+        # Se analiza una sola vez por conjunto de archivos (queda en la cache de disco por contenido)
+        huellas = hashlib.sha256("".join(sorted(huella_subida(a) for a in subidas)).encode()).hexdigest()
+        partes = obtener_cache_vistas().leer_json(f"{huellas}_piezas")
+        if partes is None:
+            archivos = [p for a in subidas for p in malla.expandir_zip(a.name, a.getvalue())]
+            progreso = st.progress(0.0, text=f"Analizando {len(archivos)} archivos...")
+            vista_parcial = st.empty()
+            partes = []
+            for r in malla.analizar_en_paralelo(obtener_pool(), archivos):
+                partes.append(r)
+                progreso.progress(min(1.0, len(partes) / max(len(archivos), 1)),
+                                  text=f"{len(partes)} piezas analizadas...")
+                vista_parcial.dataframe(pd.DataFrame([
+                    {"Pieza": x["nombre"], "Volumen (cm³)": round(x.get("volumen_cm3", 0), 2),
+                     "Avisos": ", ".join(x.get("avisos", [])) or x.get("error", "✅")} for x in partes
+                ]), use_container_width=True)
+            progreso.empty(); vista_parcial.empty()
+            obtener_cache_vistas().guardar_json(f"{huellas}_piezas", partes)
+
+        relleno = float(cfg.get("relleno", malla.RELLENO_DEFECTO))
+        paredes = float(cfg.get("paredes_mm", malla.PAREDES_MM_DEFECTO))
+        material_3d = rollo_3d.tipo if rollo_3d else "PLA"
+        piezas_3d = []
+        for n, parte in enumerate(partes, start=1):
+            if "error" in parte:
+                continue
+            gramos = malla.estimar_gramos(parte, material_3d, relleno, paredes)
+            piezas_3d.append({
+                "fila": n, "pieza": parte["nombre"], "gramos": round(gramos, 1), "horas": gramos / gph,
+                "cantidad": int(copias), "rollo": str(rollo_3d.id) if rollo_3d else "",
+                "precio_kg": None if rollo_3d else kg_3d, "hs_diseno": 0.0,
+            })
+
+        # Todo el conjunto se cotiza de una sola vez (vectorizado)
+        res_3d = cotizacion_lote.cotizar_piezas(
+            piezas_3d, cfg, buscar_rollo=backend.buscar_rollo, margen_fallo=lote_margen / 100
+        )
+        avisos = {p["nombre"]: ", ".join(p.get("avisos", [])) or p.get("error", "") for p in partes}
+        st.dataframe(pd.DataFrame([{
+            "Pieza": l["pieza"], "Gramos": l["gramos"], "Horas": round(l["horas"], 2), "Cant": l["cantidad"],
+            "Unitario": round(l["unitario"], 2), "Total": round(l["total"], 2),
+            "Avisos": avisos.get(l["pieza"]) or "✅"
+        } for l in res_3d["lineas"]]), use_container_width=True)
+        errores = [p for p in partes if "error" in p]
+        for p in errores:
+            st.warning(f"{p['nombre']}: {p['error']}")
+
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Total Piezas 3D", f"${res_3d['total']:,.2f}")
+        m2.metric("Material Total", f"{res_3d['gramos']:,.0f}g")
+        m3.metric("Piezas", len(res_3d["lineas"]))
+        st.caption(f"Estimación: {material_3d}, relleno {relleno:g}%, paredes {paredes:g}mm, {gph:g} g/h.")
+
+        if st.button("💾 GUARDAR PIEZAS 3D"):
+            if not lote_cliente:
+                st.error("Falta Cliente")
+            else:
+                filas = cotizacion_lote.filas_historial(res_3d, lote_cliente, responsable="Web")
+                descuentos = cotizacion_lote.descuentos_stock(res_3d) if lote_stock else {}
+                if backend.guardar_lote(filas, descuentos):
+                    st.toast(f"✅ Pedido guardado ({len(filas)} piezas)")
+                else:
+                    st.error("Error de conexión con Drive")
+
 # ==============================================================================
 # PESTAÑA 2: STOCK
 # ==============================================================================
@@ -214,20 +500,106 @@ with tab2:
             backend.forzar_descarga_inventario()
             st.rerun()
             
-        if backend.inventario:
-            df = pd.DataFrame(backend.inventario)
-            cols = [c for c in ["Marca", "Tipo", "Color", "Peso_Actual"] if c in df.columns]
-            st.dataframe(df[cols], use_container_width=True)
+        if inventario:
+            # Filtros instantáneos sobre los índices del backend
+            f1, f2, f3, f4 = st.columns(4)
+            f_tipo = f1.selectbox("Material", ["Todos"] + backend.indices.valores("tipo"))
+            f_marca = f2.selectbox("Marca", ["Todas"] + backend.indices.valores("marca"))
+            f_color = f3.selectbox("Color", ["Todos"] + backend.indices.valores("color"))
+            f_peso = f4.number_input("Peso mín. (g)", min_value=0, step=50)
+            
+            rollos = backend.filtrar_stock(
+                tipo=None if f_tipo == "Todos" else f_tipo,
+                marca=None if f_marca == "Todas" else f_marca,
+                color=None if f_color == "Todos" else f_color,
+                peso_minimo=f_peso or None
+            )
+            if rollos:
+                df = pd.DataFrame([rollo.como_registro() for rollo in rollos])
+                cols = [c for c in ["Marca", "Tipo", "Color", "Peso_Actual"] if c in df.columns]
+                st.dataframe(df[cols], use_container_width=True)
+            else:
+                st.info("Ningún rollo coincide con el filtro.")
 
 # ==============================================================================
 # PESTAÑA 3: HISTORIAL
 # ==============================================================================
 with tab3:
     if st.button("🔄 Actualizar Tabla"):
+        backend.obtener_historial_completo(forzar=True)
         st.rerun()
-    data = backend.obtener_historial_completo()
-    if data:
-        st.dataframe(pd.DataFrame(data[1:], columns=data[0]), use_container_width=True)
+    
+    # Búsqueda con el índice del backend (palabras, fechas y total); sin filtros se pagina
+    buscar = st.text_input("🔍 Buscar", placeholder="Cliente, modelo, material...")
+    f1, f2, f3, f4 = st.columns(4)
+    b_desde = f1.date_input("Desde", value=None, format="DD/MM/YYYY")
+    b_hasta = f2.date_input("Hasta", value=None, format="DD/MM/YYYY")
+    b_minimo = f3.number_input("Total mín", min_value=0.0, value=None, step=1000.0)
+    b_maximo = f4.number_input("Total máx", min_value=0.0, value=None, step=1000.0)
+
+    TAMANO_PAGINA = 50
+    total_filas = backend.contar_historial()
+    if buscar.strip() or b_desde or b_hasta or b_minimo is not None or b_maximo is not None:
+        LIMITE_RESULTADOS = 500
+        cantidad, filas = backend.buscar_historial(
+            buscar, b_desde, b_hasta, b_minimo, b_maximo, limite=LIMITE_RESULTADOS
+        )
+        if cantidad:
+            extra = f" (se muestran los {LIMITE_RESULTADOS} más nuevos)" if cantidad > LIMITE_RESULTADOS else ""
+            st.caption(f"{cantidad} de {total_filas} registros{extra}")
+            st.dataframe(pd.DataFrame(filas, columns=backend.obtener_encabezado_historial()), use_container_width=True)
+        else:
+            st.info("Ningún registro coincide con la búsqueda.")
+    elif total_filas:
+        # Se muestra por páginas (cada página queda en la cache del backend)
+        total_paginas = (total_filas - 1) // TAMANO_PAGINA + 1
+        pagina = st.number_input("Página", min_value=1, max_value=total_paginas, value=total_paginas, step=1)
+        st.caption(f"{total_filas} registros · página {pagina} de {total_paginas}")
+        
+        filas = backend.obtener_pagina_historial(pagina - 1, TAMANO_PAGINA)
+        st.dataframe(pd.DataFrame(filas, columns=backend.obtener_encabezado_historial()), use_container_width=True)
+
+# ==============================================================================
+# PESTAÑA RESUMEN: TABLERO DE VENTAS
+# ==============================================================================
+with tab_resumen:
+    # Todo sale de los resúmenes pre-agregados del backend (no se recorre el historial)
+    periodos = {"Este mes": "mes", "Este trimestre": "trimestre", "Este año": "año", "Todo": "todo"}
+    periodo = st.radio("Período", list(periodos), horizontal=True)
+    desde, hasta = analitica.meses_del_periodo(periodos[periodo])
+
+    def tabla_resumen(filas, encabezado):
+        return pd.DataFrame([{
+            encabezado: r["clave"], "Trabajos": int(r["trabajos"]), "Unidades": int(r["unidades"]),
+            "Total": round(r["total"], 2), "Gramos": round(r["gramos"]), "Horas": round(r["horas"], 1)
+        } for r in filas])
+
+    meses = backend.obtener_resumen("mes", desde, hasta)
+    total = analitica.totales(meses)
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("💰 Ventas", f"${total['total']:,.2f}")
+    m2.metric("🧾 Trabajos", f"{total['trabajos']:.0f}")
+    m3.metric("🧵 Material", f"{total['gramos'] / 1000:,.2f} kg")
+    m4.metric("⏱ Máquina", f"{total['horas']:,.0f} h")
+
+    if meses:
+        st.markdown("#### 📆 Ventas por Mes")
+        st.bar_chart(pd.DataFrame({"Total": [r["total"] for r in meses]}, index=[r["clave"] for r in meses]))
+
+        r1, r2 = st.columns(2)
+        with r1:
+            st.markdown("#### 👤 Mejores Clientes")
+            st.dataframe(tabla_resumen(backend.obtener_resumen("cliente", desde, hasta)[:20], "Cliente"),
+                         use_container_width=True, hide_index=True)
+        with r2:
+            st.markdown("#### 🧵 Material Usado")
+            st.dataframe(tabla_resumen(backend.obtener_resumen("material", desde, hasta), "Material"),
+                         use_container_width=True, hide_index=True)
+            st.markdown("#### 🏷️ Tipo de Trabajo")
+            st.dataframe(tabla_resumen(backend.obtener_resumen("tipo", desde, hasta), "Tipo"),
+                         use_container_width=True, hide_index=True)
+    else:
+        st.info("No hay ventas registradas en este período.")
 
 # ==============================================================================
 # PESTAÑA 4: VENTAS RÁPIDAS
@@ -255,8 +627,11 @@ with tab5:
         ncon = st.number_input("Consumo kW", value=float(cfg.get("consumo_kw", 0.2)))
         ngan = st.number_input("Ganancia %", value=int(cfg.get("margen_ganancia", 100)))
         ndes = st.number_input("Desgaste $/h", value=int(cfg.get("precio_desgaste_hora", 200)))
+        nrel = st.number_input("Relleno % (estimación STL)", value=float(cfg.get("relleno", malla.RELLENO_DEFECTO)))
+        npar = st.number_input("Paredes mm (estimación STL)", value=float(cfg.get("paredes_mm", malla.PAREDES_MM_DEFECTO)))
         
         if st.form_submit_button("Guardar"):
-            backend.configuracion.update({"precio_kwh": nkwh, "consumo_kw": ncon, "margen_ganancia": ngan, "precio_desgaste_hora": ndes})
-            backend.save_local_config()
+            # Copia solo para esta sesión (no cambia la configuración de los demás)
+            st.session_state.cfg_propia = {**cfg, "precio_kwh": nkwh, "consumo_kw": ncon, "margen_ganancia": ngan, "precio_desgaste_hora": ndes,
+                                        "relleno": nrel, "paredes_mm": npar}
             st.success("Guardado temporalmente")
\ No newline at end of file
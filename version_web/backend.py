@@ -1,19 +1,61 @@
 import os
 import json
 import time  # <--- NUEVO: Para generar IDs únicos
+import threading
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
+from almacenamiento import MotorSQLite, MotorSheets, huella_filas, fila_como_texto, ENCABEZADO_INVENTARIO
+from cola_escritura import ColaEscritura
+from modelos import Rollo, IndiceInventario, numero
+from cache import CacheTTL
+from planificador import PlanificadorSheets
+import analitica
+from historial_tipado import TablaHistorial
+from busqueda import IndiceHistorial
 
 class BackendGestor:
-    def __init__(self):
+    def __init__(self, conectar=True):
         # Nombres de archivos y hojas
         self.CONFIG_FILE = "configuracion.json"
         self.CREDENTIALS_JSON = 'credenciales.json'
         self.SHEET_NAME = 'PythonProyecTabla'
+        self.DB_FILE = "datos_locales.db"
+        self.JOURNAL_FILE = "historial_pendiente.jsonl"
+        
+        # Cada cuánto (segundos) se compara el historial completo contra la nube
+        # para detectar filas borradas o editadas a mano
+        self.VERIFICAR_HISTORIAL_CADA = 600
+        
+        # Cache: cada cuánto (segundos) se vuelve a consultar la nube al leer,
+        # y cuántas páginas del historial se guardan en memoria
+        self.TTL_HISTORIAL = 60
+        self.TTL_INVENTARIO = 120
+        self.MAX_PAGINAS_HISTORIAL = 50
         
         # Datos en memoria (Variables globales para la app)
         self.configuracion = {}
-        self.inventario = []
+        # Inventario en memoria (lista de Rollo + búsquedas por ID / material / marca / color / peso).
+        # Se comparte entre sesiones: nunca se modifica, se arma uno nuevo y se reemplaza
+        self.indices = IndiceInventario()
+        self.tabla_historial = None     # Historial por columnas (ver obtener_tabla_historial)
+        self.indice_historial = None    # Búsqueda sobre esa tabla (ver obtener_indice_historial)
+        self.version_inventario = None  # Última versión de Drive ya sincronizada
+        self.datos_frescos = False      # False = mostrando la copia local (puede estar vieja)
+        self.hilo_conexion = None
+        
+        # Un mismo backend puede usarse desde varios hilos (sesiones de Streamlit,
+        # recargas en segundo plano): las escrituras y sincronizaciones van de a una
+        self.lock = threading.RLock()
+        
+        # - sync_historial / sync_inventario: cuándo se sincronizó cada cosa con la nube
+        #   (vence con el TTL; vencido se sirve lo que hay y se sincroniza en segundo plano)
+        # - cache_historial / cache_paginas: lecturas ya armadas de la copia local,
+        #   se invalidan al escribir o cuando se sincroniza
+        self.planificador = PlanificadorSheets.compartido()
+        self.sync_historial = CacheTTL(ttl=self.TTL_HISTORIAL, contexto_fondo=self.planificador.de_fondo)
+        self.sync_inventario = CacheTTL(ttl=self.TTL_INVENTARIO, contexto_fondo=self.planificador.de_fondo)
+        self.cache_historial = CacheTTL()
+        self.cache_paginas = CacheTTL(max_entradas=self.MAX_PAGINAS_HISTORIAL)
         
         # Valores por defecto por si falla la carga
         self.default_config = {
@@ -27,9 +69,21 @@ class BackendGestor:
         self.sheet_historial = None
         self.sheet_inventario = None
         
-        # Cargar datos al iniciar
+        # Motores de almacenamiento:
+        # - local (SQLite): almacén principal, rápido y sin red
+        # - nube (Google Sheets): espejo, se asigna al conectar
+        self.motor_local = MotorSQLite(self.DB_FILE)
+        self.motor_nube = None
+        
+        # Filas de historial que esperan subir a la nube (se recuperan del journal al iniciar)
+        self.cola_historial = ColaEscritura.compartida(self.JOURNAL_FILE)
+        
+        # Cargar datos al iniciar (primero lo local, después se actualiza con Drive)
+        # Con conectar=False la conexión queda para conectar_en_segundo_plano()
         self.load_local_config()
-        self.conectar_drive()
+        self.cargar_inventario_local()
+        if conectar:
+            self.conectar_drive()
 
     def load_local_config(self):
         """Carga la configuración desde el archivo JSON local"""
@@ -53,9 +107,9 @@ class BackendGestor:
             return False
 
     def conectar_drive(self):
-        """Conecta a Google Sheets y descarga el inventario"""
+        """Conecta a Google Sheets y trae la copia de la nube al almacén local"""
         if not os.path.exists(self.CREDENTIALS_JSON):
-            print("⚠️ No se encontró credenciales.json")
+            print("⚠️ No se encontró credenciales.json (trabajando solo en local)")
             return False
         
         try:
@@ -63,146 +117,517 @@ class BackendGestor:
             creds = ServiceAccountCredentials.from_json_keyfile_name(self.CREDENTIALS_JSON, scope)
             client = gspread.authorize(creds)
             
-            # Abrir hoja de cálculo
-            doc = client.open(self.SHEET_NAME)
+            # Abrir hoja de cálculo (también pasa por el planificador)
+            doc = self.planificador.ejecutar(client.open, self.SHEET_NAME)
             
             # Hoja 1: Historial
-            self.sheet_historial = doc.sheet1
+            self.sheet_historial = self.planificador.ejecutar(doc.get_worksheet, 0)
             
             # Hoja 2: Inventario
             try:
-                self.sheet_inventario = doc.get_worksheet(1)
-                # Descargar inventario a memoria
-                self.inventario = self.sheet_inventario.get_all_records()
+                self.sheet_inventario = self.planificador.ejecutar(doc.get_worksheet, 1)
             except:
                 print("⚠️ No se encontró la hoja 2 (Inventario)")
-                self.inventario = []
-                
+                self.sheet_inventario = None
+            
+            self.motor_nube = MotorSheets(
+                self.sheet_historial, self.sheet_inventario, doc, self.planificador
+            )
+            
+            # Arranca la subida en segundo plano de las filas pendientes
+            self.cola_historial.iniciar(self.motor_nube.agregar_historial, self.motor_nube.historial_ya_tiene)
+            
+            # Lo sincronizado sin conexión ya no vale
+            self.sync_historial.invalidar()
+            self.sync_inventario.invalidar()
+            
+            # Descargar inventario a memoria (pasando por el almacén local)
+            self.forzar_descarga_inventario(completo=True)
+            self.datos_frescos = True
             return True
         except Exception as e:
             print(f"❌ Error conectando a Drive: {e}")
             return False
 
+    def conectar_en_segundo_plano(self, al_terminar=None):
+        """
+        Conecta a Drive en un hilo aparte para no frenar el arranque.
+        Mientras tanto se trabaja con la copia local. al_terminar(ok) se
+        llama desde ese hilo cuando llegan los datos frescos.
+        """
+        def tarea():
+            ok = self.conectar_drive()
+            if al_terminar:
+                al_terminar(ok)
+        
+        self.hilo_conexion = threading.Thread(target=tarea, daemon=True)
+        self.hilo_conexion.start()
+
+    def esperar_conexion(self, timeout=30):
+        """
+        Si la conexión en segundo plano sigue en curso, la espera.
+        Se usa antes de tocar el stock: la descarga inicial pisa el inventario local.
+        """
+        hilo = self.hilo_conexion
+        if hilo and hilo.is_alive() and hilo is not threading.current_thread():
+            hilo.join(timeout)
+
     def guardar_fila_historial(self, datos):
-        """Sube una fila al historial (Hoja 1)"""
-        if self.sheet_historial:
-            try:
-                self.sheet_historial.append_row(datos)
-                return True
-            except:
-                return False
-        return False
+        """
+        Guarda una fila en el historial local y la anota en el journal.
+        La subida a la Hoja 1 la hace la cola en segundo plano (en lotes),
+        así el botón de guardar no espera a la red.
+        """
+        try:
+            with self.motor_local.transaccion():
+                self.motor_local.agregar_historial([datos])
+                self.cola_historial.encolar(datos)
+            self.invalidar_historial()
+            return True
+        except Exception as e:
+            print(f"❌ Error guardando historial: {e}")
+            return False
 
     def agregar_stock_nube(self, datos_fila):
         """
-        Sube un nuevo rollo al inventario (Hoja 2).
+        Sube un nuevo rollo al inventario (local + Hoja 2).
         Genera un ID único y lo inserta al principio.
+        Sin conexión el alta queda anotada y se sube al reconectar (ver subir_stock_pendiente).
         """
-        if self.sheet_inventario:
+        self.esperar_conexion()
+        with self.lock:
             try:
                 # Generamos ID único basado en el tiempo
                 id_unico = int(time.time())
-                
+            
                 # Insertamos el ID en la posición 0 de la lista
                 datos_fila.insert(0, id_unico)
-                
-                self.sheet_inventario.append_row(datos_fila)
-                
-                # Actualizamos memoria local inmediatamente
-                self.forzar_descarga_inventario()
+            
+                # Antes de la transacción: lo pendiente se confirma aparte de esta alta
+                en_linea = self.stock_en_linea()
+                with self.motor_local.transaccion():
+                    self.motor_local.agregar_rollo(datos_fila)
+                    if en_linea:
+                        self.motor_nube.agregar_rollo(datos_fila)
+                    else:
+                        self.motor_local.anotar_stock_pendiente("alta", datos_fila)
+                        print("📒 Sin conexión: el rollo se sube a Drive al reconectar.")
+            
+                # Actualizamos memoria (sin ir a la red): copia con el rollo nuevo
+                rollo = Rollo.desde_registro(dict(zip(ENCABEZADO_INVENTARIO, datos_fila)))
+                self.indices = self.indices.con_rollo(rollo)
                 return True
-            except:
+            except Exception as e:
+                print(f"❌ Error agregando rollo: {e}")
                 return False
-        return False
-        
-    def obtener_historial_completo(self):
-        """Descarga todos los datos de la hoja Historial"""
-        if self.sheet_historial:
+
+    def obtener_historial_completo(self, forzar=False):
+        """
+        Devuelve todas las filas del Historial (lista de listas, con encabezado)
+        desde la copia local, que se sincroniza con la Hoja 1 como mucho cada
+        TTL_HISTORIAL segundos (solo trae las filas nuevas, la hoja crece al final).
+        Con forzar=True se sincroniza ya.
+        """
+        self.asegurar_historial_sincronizado(forzar)
+        return self.cache_historial.obtener("completo", self.motor_local.leer_historial)
+
+    def obtener_pagina_historial(self, numero, tamano=50):
+        """
+        Una página del historial (numero desde 0), sin encabezado.
+        Las páginas leídas quedan en memoria (las menos usadas se descartan).
+        """
+        self.asegurar_historial_sincronizado()
+        return self.cache_paginas.obtener(
+            (numero, tamano), lambda: self.motor_local.leer_historial_pagina(numero * tamano, tamano)
+        )
+
+    def obtener_filas_historial(self, posiciones):
+        """
+        Filas sueltas del historial por su posición en la base (TablaHistorial.posicion).
+        Es lo que usa la tabla del Historial para traer solo las filas que se ven.
+        """
+        return self.motor_local.leer_historial_posiciones(posiciones)
+
+    def obtener_encabezado_historial(self):
+        return self.motor_local.leer_encabezado_historial()
+
+    def contar_historial(self):
+        """Cantidad de filas de datos del historial (sin encabezado)"""
+        self.asegurar_historial_sincronizado()
+        return self.cache_historial.obtener("cantidad", self.motor_local.contar_historial)
+
+    def obtener_tabla_historial(self, sincronizar=True):
+        """
+        El historial por columnas, con números y fechas de verdad (ver historial_tipado.py).
+        Las filas ya se tiparon al guardarlas: acá solo se cargan los arrays.
+        Con sincronizar=False se usa solo la copia local (es lo que usa la interfaz,
+        que sincroniza aparte en segundo plano: ver historial_al_dia).
+        """
+        if sincronizar:
+            self.asegurar_historial_sincronizado()
+        return self.cache_historial.obtener("tabla", self.cargar_tabla_historial)
+
+    def cargar_tabla_historial(self):
+        """
+        Si desde la última carga solo se agregaron filas al final (lo normal: se guardó
+        un trabajo) se leen solo esas; si se borró o se recopió algo, se relee todo.
+        Las posiciones de la base nunca se reusan, por eso alcanza con contar.
+        """
+        anterior = self.tabla_historial
+        if anterior is not None and len(anterior):
+            ultima = int(anterior.posicion[-1])
+            if self.motor_local.contar_tipado_hasta(ultima) == len(anterior):
+                self.tabla_historial = anterior.con_filas(self.motor_local.leer_historial_tipado(ultima))
+                return self.tabla_historial
+        self.tabla_historial = TablaHistorial(self.motor_local.leer_historial_tipado())
+        return self.tabla_historial
+
+    def obtener_indice_historial(self, sincronizar=True):
+        """
+        Índice de búsqueda del historial (ver busqueda.py), siempre sobre la última tabla:
+        si solo se agregaron filas se indexan esas, si la tabla se rearmó se arma de nuevo.
+        """
+        tabla = self.obtener_tabla_historial(sincronizar)
+        with self.lock:
+            if self.indice_historial is None:
+                self.indice_historial = IndiceHistorial(tabla)
+            else:
+                self.indice_historial = self.indice_historial.actualizar(tabla)
+            return self.indice_historial
+
+    def buscar_historial(self, texto="", desde=None, hasta=None, minimo=None, maximo=None, limite=500):
+        """
+        Filas del historial que coinciden con la búsqueda (ver IndiceHistorial.buscar),
+        las más nuevas primero y como mucho 'limite'. Devuelve (cantidad_total, filas).
+        """
+        indice = self.obtener_indice_historial()
+        encontradas = indice.buscar(texto, desde, hasta, minimo, maximo).nonzero()[0]
+        posiciones = indice.tabla.posicion[encontradas[::-1][:limite]]
+        filas = self.motor_local.leer_historial_posiciones(posiciones)
+        return len(encontradas), [filas[int(p)] for p in posiciones if int(p) in filas]
+
+    def obtener_resumen(self, dimension, desde=None, hasta=None):
+        """
+        Ventas agrupadas por "dia", "mes", "cliente", "material" o "tipo" (ver analitica.py).
+        Sale de los resúmenes pre-agregados: no recorre el historial.
+        Para cliente / material / tipo, 'desde' / 'hasta' son meses ('2026-07') y se usa el cruce con el mes.
+        """
+        self.asegurar_historial_sincronizado()
+        return self.cache_historial.obtener(
+            ("resumen", dimension, desde, hasta), lambda: self.leer_resumen(dimension, desde, hasta)
+        )
+
+    def leer_resumen(self, dimension, desde, hasta):
+        if dimension not in analitica.CRUZADAS:
+            return self.motor_local.leer_resumen(dimension, desde, hasta)
+        # Clientes / materiales / tipos: el de más total primero
+        if desde or hasta:
+            return analitica.combinar(self.motor_local.leer_resumen("mes_" + dimension, desde, hasta), desde, hasta)
+        return sorted(self.motor_local.leer_resumen(dimension), key=lambda r: -r["total"])
+
+    def historial_al_dia(self):
+        """
+        True si la última sincronización con la Hoja 1 sigue dentro del TTL.
+        Si no, asegurar_historial_sincronizado() iría a la red: la interfaz lo usa para
+        decidir si lanza la sincronización en segundo plano.
+        """
+        return self.sync_historial.vigente("historial")
+
+    def asegurar_historial_sincronizado(self, forzar=False):
+        if forzar:
+            self.sync_historial.invalidar()
+        self.sync_historial.obtener("historial", self.sincronizar_historial_seguro)
+
+    def sincronizar_historial_seguro(self):
+        """Sincroniza si hay conexión; sin conexión (o si falla) se sigue con la copia local"""
+        if self.motor_nube:
             try:
-                datos = self.sheet_historial.get_all_values()
-                return datos
+                self.sincronizar_historial()
             except Exception as e:
-                print(f"Error leyendo historial: {e}")
-                return []
-        return []
+                print(f"Error descargando historial: {e}")
+        self.invalidar_historial()
+        return time.time()
 
-    def forzar_descarga_inventario(self):
-        """Borra la memoria local y baja todo fresco de Google Sheets"""
-        if self.sheet_inventario:
-            try:
-                nuevos_datos = self.sheet_inventario.get_all_records()
-                if nuevos_datos:
-                    self.inventario = nuevos_datos
-                    print(f"✅ Inventario actualizado: {len(self.inventario)} items.")
-                    return True
-                else:
-                    self.inventario = [] 
+    def invalidar_historial(self):
+        self.cache_historial.invalidar()
+        self.cache_paginas.invalidar()
+
+    def sincronizar_historial(self):
+        """
+        Trae de la nube solo las filas que están después de las que ya tenemos.
+        Cada VERIFICAR_HISTORIAL_CADA segundos se hace una pasada completa con
+        checksum para detectar borrados o ediciones.
+        """
+        with self.lock:
+            ultima_verificacion = float(self.motor_local.leer_meta("verificacion_historial") or 0)
+            encabezado = self.motor_local.leer_meta("encabezado_historial")
+        
+            if not encabezado or time.time() - ultima_verificacion > self.VERIFICAR_HISTORIAL_CADA:
+                valores = self.motor_nube.leer_historial()
+                if not encabezado or huella_filas(valores[1:]) != self.motor_local.huella_historial():
+                    print("🔄 Historial distinto en la nube, se vuelve a copiar completo.")
+                    with self.motor_local.transaccion():
+                        self.motor_local.reemplazar_historial(valores)
+                        self.motor_local.agregar_historial(self.cola_historial.filas_pendientes())
+                self.motor_local.guardar_meta("verificacion_historial", str(time.time()))
+                return
+        
+            desde = self.motor_local.filas_nube()
+            nuevas = self.motor_nube.leer_historial_desde(desde, len(json.loads(encabezado)))
+            self.motor_local.anexar_historial_nube(nuevas, self.cola_historial.filas_pendientes())
+
+    def forzar_descarga_inventario(self, completo=False):
+        """
+        Sincroniza el inventario con Google Sheets.
+        Primero consulta si el archivo cambió (muy barato); si no cambió no baja nada.
+        La marca es de todo el archivo (ver MotorSheets.version_remota): una venta nueva
+        en el historial también cuenta como cambio y hace bajar el inventario.
+        Si cambió, solo se actualizan en local y en memoria los rollos distintos.
+        Con completo=True se baja y reemplaza todo.
+        """
+        with self.lock:
+            if self.motor_nube and self.motor_nube.sheet_inventario:
+                # Lo hecho sin conexión sube primero; si no se pudo, no se baja nada
+                # (la copia de la nube pisaría los cambios locales)
+                if not self.subir_stock_pendiente():
+                    print("⚠️ Hay cambios de stock sin subir a Drive: se mantiene el inventario local.")
+                    return False
+                try:
+                    version = self.motor_nube.version_remota()
+                    if not completo and version is not None and version == self.version_inventario:
+                        print("✅ Inventario sin cambios en la nube.")
+                        self.sync_inventario.poner("inventario", time.time())
+                        return True
+                
+                    nuevos_datos = self.motor_nube.leer_inventario() or []
+                    if completo:
+                        self.motor_local.reemplazar_inventario(nuevos_datos)
+                        cambiados = None
+                    else:
+                        cambiados = self.motor_local.fusionar_inventario(nuevos_datos)
+                
+                    self.fusionar_en_memoria(nuevos_datos, cambiados)
+                    self.version_inventario = version
+                    self.sync_inventario.poner("inventario", time.time())
+                    if cambiados is None:
+                        print(f"✅ Inventario actualizado: {len(self.inventario)} items.")
+                    else:
+                        print(f"✅ Inventario actualizado: {len(cambiados)} cambios.")
                     return True
+                except Exception as e:
+                    print(f"❌ Error descargando inventario: {e}")
+                    return False
+            return False
+
+    def stock_en_linea(self):
+        """True si los cambios de stock pueden ir directo a la Hoja 2 (hay conexión y no quedó nada pendiente)"""
+        return bool(self.motor_nube and self.motor_nube.sheet_inventario) and self.subir_stock_pendiente()
+
+    def subir_stock_pendiente(self):
+        """
+        Sube a la Hoja 2, en orden, las altas y descuentos hechos sin conexión.
+        Los descuentos se restan al peso que tiene la nube (pudo cambiar desde otra PC).
+        Devuelve True si no queda nada pendiente.
+        """
+        with self.lock:
+            pendientes = self.motor_local.leer_stock_pendiente()
+            if not pendientes:
+                return True
+            if not (self.motor_nube and self.motor_nube.sheet_inventario):
+                return False
+            try:
+                en_nube = {str(r.get("ID")): r for r in self.motor_nube.leer_inventario()}
+                pesos = {}
+                descuentos = []
+                for seq, operacion, datos in pendientes:
+                    if operacion == "alta":
+                        # Si ya está (se cortó entre la subida y la confirmación) no se repite
+                        if str(datos[0]) not in en_nube:
+                            self.motor_nube.agregar_rollo(datos)
+                            en_nube[str(datos[0])] = dict(zip(ENCABEZADO_INVENTARIO, datos))
+                        self.motor_local.confirmar_stock_pendiente([seq])
+                        continue
+                    descuentos.append(seq)
+                    id_rollo = datos["id"]
+                    if id_rollo not in en_nube:
+                        print(f"⚠️ El rollo {id_rollo} ya no está en Drive: se descarta su descuento.")
+                        continue
+                    actual = pesos.get(id_rollo, numero(en_nube[id_rollo].get("Peso_Actual"), 0))
+                    pesos[id_rollo] = int(actual - datos["gramos"])
+                if pesos and not self.motor_nube.actualizar_pesos(pesos):
+                    raise Exception("No se pudo actualizar el stock en Drive")
+                self.motor_local.confirmar_stock_pendiente(descuentos)
+                print(f"☁️ {len(pendientes)} cambios de stock hechos sin conexión subidos a Drive.")
+                return True
             except Exception as e:
-                print(f"❌ Error descargando inventario: {e}")
+                print(f"❌ Error subiendo cambios de stock pendientes: {e}")
                 return False
-        return False
+
+    def obtener_inventario(self):
+        """
+        Inventario en memoria. Si pasaron más de TTL_INVENTARIO segundos desde la
+        última sincronización, se devuelve igual y se actualiza en segundo plano.
+        """
+        if self.motor_nube:
+            self.sync_inventario.obtener("inventario", self.sincronizar_inventario_seguro)
+        return self.inventario
+
+    def sincronizar_inventario_seguro(self):
+        self.forzar_descarga_inventario()
+        return time.time()
+
+    @property
+    def inventario(self):
+        """Lista de Rollo de la última versión publicada (no modificarla)"""
+        return self.indices.rollos
+
+    def fusionar_en_memoria(self, registros, cambiados):
+        """Vuelve a armar solo los rollos que cambiaron (o todo si cambiados es None) y publica la copia"""
+        if cambiados is None:
+            self.cargar_inventario_local()
+            return
+        
+        rollos = list(self.indices.rollos)
+        posicion_por_id = {str(r.get("ID")): i for i, r in enumerate(registros)}
+        for id_rollo in cambiados:
+            i = posicion_por_id[id_rollo]
+            rollo = Rollo.desde_registro(registros[i])
+            if i < len(rollos):
+                rollos[i] = rollo
+            else:
+                rollos.append(rollo)
+        self.indices = IndiceInventario(rollos)
+
+    def cargar_inventario_local(self):
+        """Pasa el inventario del almacén local a memoria, normalizado como Rollo"""
+        # Se arma aparte y se publica de una vez (puede correr en el hilo de conexión)
+        self.indices = IndiceInventario([Rollo.desde_registro(r) for r in self.motor_local.leer_inventario()])
+
+    def buscar_rollo(self, id_rollo):
+        """Rollo en memoria con ese ID (o None)"""
+        return self.indices.buscar(id_rollo)
+
+    def filtrar_stock(self, tipo=None, marca=None, color=None, peso_minimo=None):
+        """Rollos que cumplen los filtros (None = sin filtro), usando los índices"""
+        return self.indices.filtrar(tipo=tipo, marca=marca, color=color, peso_minimo=peso_minimo)
 
     def descontar_stock(self, id_rollo, gramos_consumidos):
         """
         Busca el rollo por ID y resta los gramos a la columna 'Peso_Actual'.
+        El peso nuevo se calcula con el valor local y se manda a la nube
+        en una sola escritura (sin find ni re-descarga del inventario).
+        Sin conexión el descuento queda anotado y se aplica en la nube al reconectar.
         """
-        if not self.sheet_inventario: return False
-        
-        try:
-            # 1. Buscar en qué fila está ese ID
-            # Nota: find devuelve la celda si la encuentra
-            celda_id = self.sheet_inventario.find(str(id_rollo))
+        self.esperar_conexion()
+        with self.lock:
+            try:
+                en_linea = self.stock_en_linea()
+                with self.motor_local.transaccion():
+                    nuevo_peso = self.motor_local.descontar_peso(id_rollo, gramos_consumidos)
+                    if nuevo_peso is None:
+                        print(f"❌ No se encontró el ID {id_rollo}")
+                        return False
+                    if en_linea:
+                        if not self.motor_nube.actualizar_pesos({id_rollo: nuevo_peso}):
+                            raise Exception(f"No se pudo actualizar el ID {id_rollo} en Drive")
+                    else:
+                        self.motor_local.anotar_stock_pendiente(
+                            "descuento", {"id": str(id_rollo), "gramos": float(gramos_consumidos)}
+                        )
+                        print("📒 Sin conexión: el descuento se aplica en Drive al reconectar.")
             
-            if celda_id:
-                fila = celda_id.row
-                # La columna de Peso_Actual es la 8 (H) en el nuevo formato:
-                # ID(1)|Fecha(2)|Marca(3)|Tipo(4)|Color(5)|Acabado(6)|Peso_In(7)|Peso_Act(8)|Precio(9)
-                col_peso_actual = 8 
-                
-                # Obtener valor actual
-                valor_actual_raw = self.sheet_inventario.cell(fila, col_peso_actual).value
-                valor_actual = float(valor_actual_raw) if valor_actual_raw else 0
-                
-                nuevo_peso = valor_actual - float(gramos_consumidos)
-                
-                # Actualizar en la nube
-                self.sheet_inventario.update_cell(fila, col_peso_actual, int(nuevo_peso))
-                
-                # Actualizar memoria local
-                self.forzar_descarga_inventario()
+                # Actualizar memoria local (copia con el rollo afectado)
+                if self.buscar_rollo(id_rollo):
+                    self.indices = self.indices.con_pesos({id_rollo: nuevo_peso})
+                else:
+                    self.cargar_inventario_local()
                 return True
-            else:
-                print(f"❌ No se encontró el ID {id_rollo} en Drive")
+            except Exception as e:
+                print(f"❌ Error descontando stock: {e}")
                 return False
-        except Exception as e:
-            print(f"❌ Error descontando stock: {e}")
-            return False
 
-    def obtener_historial_completo(self):
-        """Descarga todas las filas de la hoja Historial"""
-        if self.sheet_historial:
+    def guardar_lote(self, filas_historial, descuentos):
+        """
+        Registra un pedido completo de una vez: todas las filas del historial
+        y todos los descuentos de stock ({id_rollo: gramos}).
+        Localmente es una sola transacción (o entra todo o nada), los pesos van
+        a la nube en un único batch_update y las filas al journal en una sola escritura.
+        """
+        if descuentos:
+            self.esperar_conexion()
+        with self.lock:
             try:
-                # get_all_values devuelve una lista de listas
-                return self.sheet_historial.get_all_values()
+                nuevos_pesos = {}
+                en_linea = bool(descuentos) and self.stock_en_linea()
+                with self.motor_local.transaccion():
+                    self.motor_local.agregar_historial(filas_historial)
+                    for id_rollo, gramos in descuentos.items():
+                        nuevo_peso = self.motor_local.descontar_peso(id_rollo, gramos)
+                        if nuevo_peso is None:
+                            raise Exception(f"No se encontró el ID {id_rollo}")
+                        nuevos_pesos[id_rollo] = nuevo_peso
+                    if nuevos_pesos and en_linea:
+                        if not self.motor_nube.actualizar_pesos(nuevos_pesos):
+                            raise Exception("No se pudo actualizar el stock en Drive")
+                    elif nuevos_pesos:
+                        for id_rollo, gramos in descuentos.items():
+                            self.motor_local.anotar_stock_pendiente(
+                                "descuento", {"id": str(id_rollo), "gramos": float(gramos)}
+                            )
+                        print("📒 Sin conexión: los descuentos se aplican en Drive al reconectar.")
+                    self.cola_historial.encolar_varias(filas_historial)
+
+                # Una sola copia con todos los rollos del lote
+                if all(self.buscar_rollo(id_rollo) for id_rollo in nuevos_pesos):
+                    self.indices = self.indices.con_pesos(nuevos_pesos)
+                else:
+                    self.cargar_inventario_local()
+                self.invalidar_historial()
+                return True
             except Exception as e:
-                print(f"Error descargando historial: {e}")
-                return []
-        return []
+                print(f"❌ Error guardando el lote: {e}")
+                return False
 
-    def borrar_fila_historial(self, indice_lista):
+    def borrar_fila_historial(self, posicion, fila_esperada):
         """
-        Borra una fila basada en el índice de la lista visual.
-        NOTA: En Google Sheets, la fila 1 es el encabezado.
-        La fila 0 de tu lista visual corresponde a la fila 2 de Sheets.
+        Borra la fila del historial con esa 'posicion' (la clave del almacén local),
+        siempre que siga teniendo el contenido 'fila_esperada' (lo que el usuario vio).
+        No se borra por número de renglón: una sincronización en el medio puede correr
+        las filas y se borraría otra. En Google Sheets la fila 1 es el encabezado.
         """
-        if self.sheet_historial:
+        with self.lock:
+            # La hoja es la referencia del historial: sin conexión no se borra
+            # (borrar solo en local haría que la próxima sincronización la traiga de vuelta)
+            if not self.motor_nube:
+                print("Error borrando fila: sin conexión con Drive")
+                return False
+
+            # Antes de ubicar la fila en la hoja, la nube tiene que estar al día con la cola
+            if not self.cola_historial.vaciar():
+                print("Error borrando fila: hay filas pendientes de subir a Drive")
+                return False
+            try:
+                self.sincronizar_historial()
+            except Exception as e:
+                print(f"Error borrando fila: {e}")
+                return False
+
+            # Después de sincronizar, la fila tiene que seguir ahí y ser la misma
+            actual = self.motor_local.leer_historial_posiciones([posicion]).get(int(posicion))
+            if actual is None or fila_como_texto(actual) != fila_como_texto(fila_esperada):
+                print("⚠️ La fila cambió o ya no está en el historial: no se borra nada")
+                self.invalidar_historial()
+                return False
+            indice_lista = self.motor_local.indice_historial(posicion)
+
             try:
-                # Sumamos 2: +1 por ser base-1 (Sheets) y +1 por el encabezado
-                fila_a_borrar = indice_lista + 2 
-                self.sheet_historial.delete_rows(fila_a_borrar)
+                with self.motor_local.transaccion():
+                    self.motor_local.borrar_fila_historial(indice_lista, fila_esperada)
+                    # Si en la hoja ese renglón es otra fila, se deshace también lo local
+                    if not self.motor_nube.borrar_fila_historial(indice_lista, fila_esperada):
+                        raise RuntimeError("la fila de Drive no coincide con la local")
+                self.invalidar_historial()
                 return True
             except Exception as e:
                 print(f"Error borrando fila: {e}")
                 return False
-        return False        
\ No newline at end of file
@@ -0,0 +1,178 @@
+import os
+import json
+import time
+import random
+import threading
+
+
+class ColaEscritura:
+    """
+    Cola 'write-behind' con journal local.
+    Cada fila se anota primero en un archivo append-only (una línea JSON por fila)
+    y un hilo en segundo plano la sube a la nube en lotes, respetando el orden.
+    Si la app se cierra o se corta la conexión, las filas sin confirmar se
+    recuperan del journal al volver a abrir.
+
+    Un append que falló por un corte puede haberse aplicado igual. Por eso un lote
+    que falló (o que quedó sin confirmar en el journal) no se reenvía a ciegas: se
+    repite el mismo lote y antes se pregunta a 'ya_subido' si las filas ya están en la nube.
+    """
+
+    # Una sola cola por archivo de journal en todo el proceso
+    # (en Streamlit cada sesión crea su propio BackendGestor)
+    _compartidas = {}
+    _lock_compartidas = threading.Lock()
+
+    @classmethod
+    def compartida(cls, ruta_journal):
+        with cls._lock_compartidas:
+            ruta = os.path.abspath(ruta_journal)
+            if ruta not in cls._compartidas:
+                cls._compartidas[ruta] = cls(ruta)
+            return cls._compartidas[ruta]
+
+    def __init__(self, ruta_journal, max_lote=200, espera_lote=1.0, espera_maxima=60):
+        self.ruta = ruta_journal
+        self.max_lote = max_lote          # filas por llamada a append_rows
+        self.espera_lote = espera_lote    # segundos para juntar filas antes de subir
+        self.espera_maxima = espera_maxima
+
+        self.cond = threading.Condition()
+        self.pendientes = []   # [(seq, fila), ...] en orden de llegada
+        self.ultimo_seq = 0
+        self.destino = None    # función que recibe una lista de filas (ej: append_rows)
+        self.ya_subido = None  # función(filas) -> True si ya están en la nube
+        self.en_duda = None    # lote [(seq, fila), ...] que falló: hay que verificarlo antes de reenviar
+        self.hilo = None
+        self.intentos = 0
+
+        self.reproducir_journal()
+
+    # --- JOURNAL ---
+    def reproducir_journal(self):
+        """Lee el journal al arrancar y recupera las filas que nunca se confirmaron"""
+        if not os.path.exists(self.ruta):
+            return
+
+        confirmado = 0
+        entradas = []
+        with open(self.ruta, "r", encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    reg = json.loads(linea)
+                except ValueError:
+                    continue  # Línea cortada (ej: corte de luz a mitad de escritura)
+                if "ok" in reg:
+                    confirmado = max(confirmado, reg["ok"])
+                    self.ultimo_seq = max(self.ultimo_seq, reg["ok"])
+                else:
+                    entradas.append((reg["seq"], reg["fila"]))
+                    self.ultimo_seq = max(self.ultimo_seq, reg["seq"])
+
+        self.pendientes = [e for e in entradas if e[0] > confirmado]
+        if self.pendientes:
+            print(f"📒 {len(self.pendientes)} filas pendientes recuperadas del journal.")
+            # La app pudo cerrarse justo después de subir el lote y antes de anotar el "ok"
+            self.en_duda = self.pendientes[:self.max_lote]
+
+    def escribir_journal(self, registros):
+        with open(self.ruta, "a", encoding="utf-8") as f:
+            for reg in registros:
+                f.write(json.dumps(reg, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def compactar(self):
+        """Con todo confirmado, el journal se reduce a una sola línea (reemplazo atómico)"""
+        tmp = self.ruta + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"ok": self.ultimo_seq}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.ruta)
+
+    # --- API ---
+    def encolar(self, fila):
+        """Anota la fila en el journal y vuelve enseguida (la subida es en segundo plano)"""
+        self.encolar_varias([fila])
+
+    def encolar_varias(self, filas):
+        """Igual que encolar() pero con muchas filas y una sola escritura al journal"""
+        with self.cond:
+            registros = []
+            for fila in filas:
+                self.ultimo_seq += 1
+                registros.append({"seq": self.ultimo_seq, "fila": fila})
+            self.escribir_journal(registros)
+            self.pendientes.extend((r["seq"], r["fila"]) for r in registros)
+            self.cond.notify_all()
+
+    def filas_pendientes(self):
+        """Filas anotadas que todavía no llegaron a la nube (en orden)"""
+        with self.cond:
+            return [fila for _, fila in self.pendientes]
+
+    def iniciar(self, destino, ya_subido=None):
+        """
+        Asigna el destino (ej: MotorSheets.agregar_historial) y arranca el hilo si hace falta.
+        ya_subido (ej: MotorSheets.historial_ya_tiene) evita duplicar filas al reintentar.
+        """
+        with self.cond:
+            self.destino = destino
+            self.ya_subido = ya_subido
+            if self.hilo is None:
+                self.hilo = threading.Thread(target=self.trabajar, daemon=True)
+                self.hilo.start()
+            self.cond.notify_all()
+
+    def vaciar(self, timeout=30):
+        """Espera hasta que no queden filas pendientes. Devuelve False si no se pudo"""
+        limite = time.time() + timeout
+        with self.cond:
+            while self.pendientes:
+                restante = limite - time.time()
+                if restante <= 0 or not self.destino:
+                    return False
+                self.cond.wait(restante)
+            return True
+
+    # --- HILO DE FONDO ---
+    def trabajar(self):
+        while True:
+            with self.cond:
+                while not (self.pendientes and self.destino):
+                    self.cond.wait()
+
+            # Pequeña espera para juntar en un mismo lote las filas que llegan seguidas
+            time.sleep(self.espera_lote)
+
+            with self.cond:
+                # Después de un fallo va el mismo lote (aunque hayan llegado más filas)
+                lote = self.en_duda or self.pendientes[:self.max_lote]
+                destino = self.destino
+                ya_subido = self.ya_subido
+
+            try:
+                filas = [fila for _, fila in lote]
+                if self.en_duda and ya_subido and ya_subido(filas):
+                    print(f"☁️ {len(lote)} filas ya estaban en la nube (el envío anterior había llegado).")
+                else:
+                    destino(filas)
+            except Exception as e:
+                # Reintento con espera exponencial; el lote se repite tal cual para mantener el orden
+                self.en_duda = lote
+                self.intentos += 1
+                espera = min(self.espera_maxima, 2 ** self.intentos) + random.uniform(0, 1)
+                print(f"⚠️ Falló la subida de {len(lote)} filas ({e}). Reintento en {espera:.0f}s")
+                time.sleep(espera)
+                continue
+
+            self.intentos = 0
+            self.en_duda = None
+            with self.cond:
+                self.escribir_journal([{"ok": lote[-1][0]}])
+                self.pendientes = self.pendientes[len(lote):]
+                if not self.pendientes:
+                    self.compactar()
+                self.cond.notify_all()
+            print(f"☁️ {len(lote)} filas subidas al historial.")
@@ -0,0 +1,150 @@
+"""
+Motor de precios (sin interfaz).
+Lo usan el Cotizador de escritorio y el de la web, así la fórmula vive en un solo lugar.
+"""
+
+# --- BLOQUE DE SEGURIDAD PARA NUMPY (solo hace falta para calcular en lote) ---
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+# ------------------------------------------------------------------------------
+
+# Mismos valores por defecto que BackendGestor.default_config
+CONFIG_DEFECTO = {
+    "precio_kwh": 170,
+    "consumo_kw": 0.2,
+    "precio_hora_diseno": 8500,
+    "margen_ganancia": 100,
+    "precio_desgaste_hora": 200
+}
+
+
+def parametros(cfg=None):
+    """Configuración completa: lo que falte se toma de CONFIG_DEFECTO"""
+    return {**CONFIG_DEFECTO, **(cfg or {})}
+
+
+def partidas(peso_g, horas, precio_kg, cantidad, margen_fallo, hs_diseno, cfg):
+    """
+    La fórmula del cotizador. Funciona igual con números sueltos o con arrays
+    de NumPy (y también con arrays dentro de cfg), con las mismas operaciones
+    en el mismo orden, así el resultado da exactamente igual en los dos casos.
+    """
+    # A. Material (incluyendo el margen de fallo)
+    peso_real = peso_g * (1 + margen_fallo)
+    costo_material = (peso_real / 1000) * precio_kg
+
+    # B. Máquina y Energía
+    costo_luz = horas * cfg["consumo_kw"] * cfg["precio_kwh"]
+    costo_maq = horas * cfg["precio_desgaste_hora"]
+
+    # C. Suma de Costos Directos (Costo Puro)
+    costo_puro = costo_material + costo_luz + costo_maq
+
+    # D. Aplicar Ganancia
+    ganancia = costo_puro * (cfg["margen_ganancia"] / 100)
+    precio_unitario = costo_puro + ganancia
+
+    # E. Extras (Diseño se cobra una sola vez por lote)
+    costo_diseno = hs_diseno * cfg["precio_hora_diseno"]
+
+    # F. Totales Finales
+    total_lote = (precio_unitario * cantidad) + costo_diseno
+    unitario_final = total_lote / cantidad
+
+    return {
+        "peso_real": peso_real,
+        "costo_material": costo_material,
+        "costo_luz": costo_luz,
+        "costo_maq": costo_maq,
+        "costo_puro": costo_puro,
+        "ganancia": ganancia,
+        "precio_unitario": precio_unitario,
+        "costo_diseno": costo_diseno,
+        "total_lote": total_lote,
+        "unitario_final": unitario_final,
+    }
+
+
+def calcular(peso_g, horas, precio_kg, cantidad=1, margen_fallo=0.0, hs_diseno=0, cfg=None):
+    """
+    Cotiza una pieza.
+    peso_g: gramos por pieza | horas: tiempo por pieza | precio_kg: $/kg del material
+    margen_fallo: 0.10 = 10% | hs_diseno: horas de diseño (se cobran una vez por lote)
+    Devuelve un dict con todas las partidas (ver partidas()).
+    """
+    return partidas(
+        float(peso_g), float(horas), float(precio_kg), cantidad,
+        float(margen_fallo), hs_diseno, parametros(cfg)
+    )
+
+
+def requiere_numpy():
+    if not HAS_NUMPY:
+        raise ImportError("Para cotizar en lote hace falta numpy (pip install numpy)")
+
+
+def calcular_lote(peso_g, horas, precio_kg, cantidad=1, margen_fallo=0.0, hs_diseno=0, cfg=None):
+    """
+    Cotiza muchas combinaciones de una sola vez (vectorizado con NumPy).
+    Cada argumento puede ser un número o un array; se combinan con broadcasting.
+    Los valores de cfg también pueden ser arrays (útil para barridos de parámetros).
+    Devuelve el mismo dict que calcular(), pero con arrays.
+    """
+    requiere_numpy()
+
+    cfg = {k: np.asarray(v, dtype=float) for k, v in parametros(cfg).items()}
+    return partidas(
+        np.asarray(peso_g, dtype=float),
+        np.asarray(horas, dtype=float),
+        np.asarray(precio_kg, dtype=float),
+        np.asarray(cantidad, dtype=float),
+        np.asarray(margen_fallo, dtype=float),
+        np.asarray(hs_diseno, dtype=float),
+        cfg
+    )
+
+
+# Parámetros que se pueden variar en el análisis de sensibilidad -> etiqueta
+PARAMETROS_BARRIDO = {
+    "precio_kwh": "Precio kWh ($)",
+    "consumo_kw": "Consumo (kW)",
+    "precio_desgaste_hora": "Desgaste ($/h)",
+    "margen_ganancia": "Ganancia (%)",
+    "precio_kg": "Material ($/kg)",
+}
+
+
+def sensibilidad(trabajos, eje_x, valores_x, eje_y=None, valores_y=None, cfg=None, margen_fallo=0.0):
+    """
+    Total cobrado al variar uno o dos parámetros (ver PARAMETROS_BARRIDO).
+    trabajos: lista de dicts con peso_g, horas, precio_kg, cantidad, hs_diseno
+    (uno solo para la cotización actual, o los últimos N del historial: se suman).
+    Devuelve una matriz (len(valores_y), len(valores_x)), o un vector si no hay eje_y.
+    """
+    if eje_y is not None and eje_y == eje_x:
+        raise ValueError("Los dos ejes tienen que ser parámetros distintos")
+    requiere_numpy()
+
+    # El total es lineal en los gramos, horas y diseño de cada trabajo, así que sumar
+    # N trabajos da lo mismo que cotizar uno solo con todo acumulado (cantidad 1).
+    # La grilla entera sale de una sola llamada a calcular_lote.
+    peso = sum(t["peso_g"] * t["cantidad"] for t in trabajos)
+    horas = sum(t["horas"] * t["cantidad"] for t in trabajos)
+    hs_diseno = sum(t["hs_diseno"] for t in trabajos)
+    # $/kg promedio ponderado por gramos (si no se está variando)
+    precio_kg = sum(t["peso_g"] * t["cantidad"] * t["precio_kg"] for t in trabajos) / peso if peso else 0.0
+
+    entradas = {"precio_kg": precio_kg, **parametros(cfg)}
+    forma = (len(valores_x),)
+    entradas[eje_x] = np.asarray(valores_x, dtype=float)
+    if eje_y is not None:
+        forma = (len(valores_y), len(valores_x))
+        entradas[eje_x] = entradas[eje_x][None, :]
+        entradas[eje_y] = np.asarray(valores_y, dtype=float)[:, None]
+
+    precio_kg = entradas.pop("precio_kg")
+    r = calcular_lote(peso, horas, precio_kg, 1, margen_fallo, hs_diseno, cfg=entradas)
+    return np.broadcast_to(r["total_lote"], forma)
@@ -0,0 +1,186 @@
+"""
+Historial con tipos de verdad: cada fila se interpreta una sola vez (al guardarla)
+y se guarda con precios en float, pesos en gramos, tiempos en minutos y fechas ISO.
+TablaHistorial lo carga por columnas (arrays de NumPy) para sumar, filtrar y agrupar
+decenas de miles de filas en milisegundos, sin volver a leer textos como "$1234.50".
+"""
+import copy
+from datetime import datetime
+
+from modelos import numero, parsear_tiempo
+
+# --- BLOQUE DE SEGURIDAD PARA NUMPY (solo hace falta para la TablaHistorial) ---
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+# ------------------------------------------------------------------------------
+
+# Columnas tipadas, en el orden de la tabla 'historial_tipado' (sin la posicion)
+COLUMNAS_TEXTO = ("resp", "cliente", "modelo", "tipo", "material", "color")
+COLUMNAS_NUMERO = ("peso_g", "minutos", "cantidad", "diseno_min", "total", "unitario")
+COLUMNAS = ("fecha",) + COLUMNAS_TEXTO + COLUMNAS_NUMERO
+
+NAN = float("nan")
+VACIOS = ("", "-", "n/a", "na", "none")
+
+
+def fecha_iso(valor):
+    """'18/10/2026' (o '2026-10-18', '18/10/26', con hora o sin) -> '2026-10-18'; None si no se entiende"""
+    texto = str(valor or "").strip()[:10]
+    for formato in ("%d/%m/%Y", "%Y-%m-%d", "%d/%m/%y"):
+        try:
+            return datetime.strptime(texto.strip(), formato).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    return None
+
+
+def importe(valor, defecto=0.0):
+    """
+    '$1234.50', '$1,234.50', '$ 1.234,50', '$1.500', '1500', 1234.5 -> float.
+    El último separador es el decimal, salvo que sea el único de su tipo y tenga
+    exactamente 3 dígitos después ('1,234' / '1.500'): ahí separa los miles.
+    """
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = str(valor or "").replace("$", "").replace(" ", "")
+    ultimo = max(texto.rfind(","), texto.rfind("."))
+    if ultimo >= 0:
+        separador = texto[ultimo]
+        otro = "." if separador == "," else ","
+        decimales = texto[ultimo + 1:]
+        es_miles = otro not in texto and (texto.count(separador) > 1 or
+                                           (len(decimales) == 3 and decimales.isdigit()))
+        if es_miles:
+            texto = texto.replace(separador, "")
+        else:
+            texto = texto[:ultimo].replace(otro, "").replace(separador, "") + "." + decimales
+    return numero(texto, defecto)
+
+
+def minutos(valor):
+    """'3h', '3h 20m', '2 hs', '2:30', '1.5' (horas) -> minutos; NaN si no hay tiempo ('N/A', '-')"""
+    if valor is None or str(valor).strip().lower() in VACIOS:
+        return NAN
+    return parsear_tiempo(valor) * 60
+
+
+def tipar(fila):
+    """Una fila del historial (textos, como la hoja) -> tupla con los valores de COLUMNAS"""
+    fila = list(fila) + [""] * (13 - len(fila))
+    return (
+        fecha_iso(fila[0]),
+        str(fila[1]).strip(), str(fila[2]).strip(), str(fila[3]).strip(),
+        str(fila[4]).strip(), str(fila[5]).strip(), str(fila[6]).strip(),
+        numero(fila[7], NAN),
+        minutos(fila[8]),
+        max(1, int(numero(fila[9], 1))),
+        minutos(fila[10]),
+        importe(fila[11], NAN),
+        importe(fila[12], NAN),
+    )
+
+
+def requiere_numpy():
+    if not HAS_NUMPY:
+        raise ImportError("Para analizar el historial por columnas hace falta numpy (pip install numpy)")
+
+
+class TablaHistorial:
+    """
+    El historial por columnas. Cada columna es un array de NumPy del mismo largo:
+      fecha: datetime64[D] (NaT si no tenía) | números: float64 (NaN = no había dato)
+      cantidad: int64 | textos: como categorías (códigos int32 + lista de valores distintos),
+      así agrupar por cliente o material es un bincount y no una comparación de textos.
+    Se arma con las filas de MotorSQLite.leer_historial_tipado().
+    """
+
+    def __init__(self, filas=()):
+        requiere_numpy()
+        self.posicion = np.zeros(0, dtype=np.int64)
+        self.fecha = np.zeros(0, dtype="datetime64[D]")
+        self.indices = {nombre: {} for nombre in COLUMNAS_TEXTO}  # valor -> código
+        self.codigos = {nombre: np.zeros(0, dtype=np.int32) for nombre in COLUMNAS_TEXTO}
+        self.categorias = {nombre: np.zeros(0, dtype=object) for nombre in COLUMNAS_TEXTO}
+        for nombre in COLUMNAS_NUMERO:
+            setattr(self, nombre, np.zeros(0, dtype=np.int64 if nombre == "cantidad" else np.float64))
+        self.agregar(filas)
+
+    def agregar(self, filas):
+        """Suma filas al final (se arman arrays nuevos, los anteriores no se tocan)"""
+        columnas = list(zip(*filas))
+        if not columnas:
+            return
+        self.posicion = np.concatenate([self.posicion, np.array(columnas[0], dtype=np.int64)])
+        self.fecha = np.concatenate([self.fecha, np.array(columnas[1], dtype="datetime64[D]")])
+        for i, nombre in enumerate(COLUMNAS_TEXTO, start=2):
+            indices = self.indices[nombre]
+            nuevos = np.array([indices.setdefault(v or "", len(indices)) for v in columnas[i]], dtype=np.int32)
+            self.codigos[nombre] = np.concatenate([self.codigos[nombre], nuevos])
+            self.categorias[nombre] = np.array(list(indices), dtype=object)
+        for i, nombre in enumerate(COLUMNAS_NUMERO, start=2 + len(COLUMNAS_TEXTO)):
+            anterior = getattr(self, nombre)
+            setattr(self, nombre, np.concatenate([anterior, np.array(columnas[i], dtype=anterior.dtype)]))
+
+    def con_filas(self, filas):
+        """Copia de la tabla con 'filas' agregadas al final (la original no cambia)"""
+        copia = copy.copy(self)
+        copia.indices = {nombre: dict(v) for nombre, v in self.indices.items()}
+        copia.codigos, copia.categorias = dict(self.codigos), dict(self.categorias)
+        copia.agregar(filas)
+        return copia
+
+    def __len__(self):
+        return len(self.posicion)
+
+    def columna(self, nombre):
+        """Cualquier columna como array (las de texto se arman desde las categorías)"""
+        if nombre in self.codigos:
+            return self.categorias[nombre][self.codigos[nombre]]
+        return getattr(self, nombre)
+
+    def es(self, nombre, valor):
+        """Máscara de las filas cuyo texto en 'nombre' es exactamente 'valor'"""
+        encontrados = np.flatnonzero(self.categorias[nombre] == valor)
+        return np.isin(self.codigos[nombre], encontrados)
+
+    def entre_fechas(self, desde=None, hasta=None):
+        """Máscara de las filas con fecha entre 'desde' y 'hasta' ('2026-10-01', inclusive)"""
+        mascara = ~np.isnat(self.fecha)
+        if desde:
+            mascara &= self.fecha >= np.datetime64(desde)
+        if hasta:
+            mascara &= self.fecha <= np.datetime64(hasta)
+        return mascara
+
+    def sumar(self, columna, mascara=None):
+        """Suma de una columna numérica (los NaN no cuentan)"""
+        valores = getattr(self, columna)
+        if mascara is not None:
+            valores = valores[mascara]
+        return float(np.nansum(valores))
+
+    def agrupar(self, por, columna="total", mascara=None):
+        """
+        Suma de 'columna' por cada valor de 'por' (una columna de texto, o "mes").
+        Devuelve (claves, sumas) con la de más suma primero; las filas sin dato no cuentan.
+        """
+        valores = np.nan_to_num(getattr(self, columna).astype(np.float64))
+        validas = np.ones(len(self), dtype=bool) if mascara is None else mascara.copy()
+        if por == "mes":
+            meses = self.fecha.astype("datetime64[M]")
+            validas &= ~np.isnat(meses)
+            primero = meses[validas].min() if validas.any() else np.datetime64("2000-01", "M")
+            codigos = (meses - primero).astype(np.int64)
+            cantidad = int(codigos[validas].max()) + 1 if validas.any() else 0
+            categorias = (primero + np.arange(cantidad)).astype(str)
+        else:
+            codigos, categorias = self.codigos[por], self.categorias[por]
+            cantidad = len(categorias)
+        sumas = np.bincount(codigos[validas], weights=valores[validas], minlength=cantidad)
+        presentes = np.bincount(codigos[validas], minlength=cantidad) > 0
+        claves, sumas = categorias[presentes], sumas[presentes]
+        orden = np.argsort(-sumas, kind="stable")
+        return claves[orden], sumas[orden]
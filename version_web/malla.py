@@ -0,0 +1,203 @@
+"""
+Análisis de mallas 3D (STL / 3MF) para estimar el peso de una pieza.
+Las medidas se toman en mm (lo normal en STL y 3MF de impresión 3D).
+"""
+import io
+import os
+import zipfile
+import hashlib
+from concurrent.futures import wait, FIRST_COMPLETED
+
+import numpy as np
+import trimesh
+
+from modelos import densidad
+
+# Supuestos de laminado por defecto (se pueden cambiar en la Config)
+RELLENO_DEFECTO = 15     # %
+PAREDES_MM_DEFECTO = 1.2  # espesor de paredes + techos/pisos
+
+# Cama de la impresora (mm) para el control "¿entra?"
+VOLUMEN_IMPRESORA_MM = (220, 220, 250)
+EXTENSIONES = (".stl", ".3mf")
+
+# Triángulos máximos que se mandan al visor (un celular se traba con millones)
+PRESUPUESTO_VISTA = 150_000
+
+
+def huella(datos):
+    """Hash del contenido: la misma pieza subida dos veces se analiza una sola vez"""
+    return hashlib.sha256(datos).hexdigest()
+
+
+def cargar(datos, nombre):
+    """Lee los bytes de un STL o 3MF y devuelve un único Trimesh (las escenas se unen)"""
+    tipo = "3mf" if nombre.lower().endswith(".3mf") else "stl"
+    malla = trimesh.load(io.BytesIO(datos), file_type=tipo)
+    if isinstance(malla, trimesh.Scene):
+        malla = malla.dump(concatenate=True)
+    return malla
+
+
+def analizar(malla):
+    """Volumen, área y medidas de la malla (cm³, cm², mm)"""
+    volumen = abs(malla.volume) if malla.is_volume else abs(malla.convex_hull.volume)
+    dx, dy, dz = malla.extents if len(malla.vertices) else (0.0, 0.0, 0.0)
+    return {
+        "volumen_cm3": float(volumen) / 1000,
+        "area_cm2": float(malla.area) / 100,
+        "medidas_mm": (float(dx), float(dy), float(dz)),
+        "triangulos": len(malla.faces),
+        # Si no es cerrada el volumen sale del casco convexo (sobreestima)
+        "cerrada": bool(malla.is_volume),
+    }
+
+
+def estimar_gramos(analisis, material="PLA", relleno=RELLENO_DEFECTO, paredes_mm=PAREDES_MM_DEFECTO):
+    """
+    Gramos estimados de la pieza impresa:
+    cáscara (área x espesor de paredes) maciza + el interior al % de relleno.
+    """
+    volumen = analisis["volumen_cm3"]
+    cascara = min(volumen, analisis["area_cm2"] * paredes_mm / 10)
+    interior = volumen - cascara
+    return (cascara + interior * relleno / 100) * densidad(material)
+
+
+def agrupar_vertices(vertices, caras, celda):
+    """
+    Simplificación por grilla: los vértices que caen en la misma celda se funden
+    en su promedio y se descartan los triángulos que quedan aplastados.
+    """
+    celdas = np.floor((vertices - vertices.min(axis=0)) / celda).astype(np.int64)
+    ancho = celdas.max(axis=0) + 1
+    claves = (celdas[:, 0] * ancho[1] + celdas[:, 1]) * ancho[2] + celdas[:, 2]
+    _, inverso = np.unique(claves, return_inverse=True)
+    inverso = inverso.ravel()
+
+    cuenta = np.bincount(inverso)
+    nuevos = np.column_stack([
+        np.bincount(inverso, weights=vertices[:, eje]) / cuenta for eje in range(3)
+    ])
+
+    caras = inverso[caras]
+    sanas = (caras[:, 0] != caras[:, 1]) & (caras[:, 1] != caras[:, 2]) & (caras[:, 0] != caras[:, 2])
+    caras = caras[sanas]
+    # Triángulos repetidos (mismos 3 vértices): se deja uno, sin tocar el sentido de giro
+    _, primeros = np.unique(np.sort(caras, axis=1), axis=0, return_index=True)
+    return nuevos, caras[np.sort(primeros)]
+
+
+def reducir(malla, presupuesto=PRESUPUESTO_VISTA):
+    """
+    Copia liviana de la malla para la vista previa (las medidas se toman siempre
+    de la malla completa). Si ya entra en el presupuesto se devuelve tal cual.
+    """
+    if len(malla.faces) <= presupuesto:
+        return malla
+
+    # Con celdas de lado 'c' quedan unos 2 * área / c² triángulos: se arranca de ahí
+    # y se agranda la celda hasta entrar en el presupuesto (casi siempre 1 o 2 pasadas)
+    celda = np.sqrt(2 * malla.area / presupuesto)
+    for _ in range(6):
+        vertices, caras = agrupar_vertices(malla.vertices, malla.faces, celda)
+        if len(caras) <= presupuesto:
+            break
+        celda *= np.sqrt(len(caras) / presupuesto) * 1.05
+    return trimesh.Trimesh(vertices=vertices, faces=caras, process=False)
+
+
+# --- PEDIDOS DE VARIAS PIEZAS (ZIP / varios archivos / bandeja 3MF) ---
+# Estas funciones corren en procesos aparte: reciben y devuelven datos simples.
+
+def expandir_zip(nombre, datos):
+    """[(nombre, bytes)] de los STL/3MF dentro de un ZIP (o el archivo mismo si no es ZIP)"""
+    if not nombre.lower().endswith(".zip"):
+        return [(nombre, datos)]
+    partes = []
+    with zipfile.ZipFile(io.BytesIO(datos)) as z:
+        for info in z.infolist():
+            base = os.path.basename(info.filename)
+            if info.is_dir() or base.startswith(".") or "__MACOSX" in info.filename:
+                continue
+            if base.lower().endswith(EXTENSIONES):
+                partes.append((base, z.read(info)))
+    return partes
+
+
+def dividir(nombre, datos):
+    """
+    Una bandeja 3MF con varios objetos -> un STL binario por objeto (ya posicionado).
+    Un STL (o un 3MF de un solo objeto) vuelve tal cual.
+    """
+    if not nombre.lower().endswith(".3mf"):
+        return [(nombre, datos)]
+    escena = trimesh.load(io.BytesIO(datos), file_type="3mf", force="scene")
+    nodos = list(escena.graph.nodes_geometry)
+    if len(nodos) <= 1:
+        return [(nombre, datos)]
+
+    base = os.path.splitext(nombre)[0]
+    partes = []
+    for i, nodo in enumerate(nodos, start=1):
+        transformacion, geometria = escena.graph[nodo]
+        objeto = escena.geometry[geometria].copy()
+        objeto.apply_transform(transformacion)
+        partes.append((f"{base} / {nodo or i}", objeto.export(file_type="stl")))
+    return partes
+
+
+def controles(malla, analisis, cama=VOLUMEN_IMPRESORA_MM):
+    """Avisos de imprimibilidad (lista de textos; vacía = todo bien)"""
+    avisos = []
+    if not analisis["cerrada"]:
+        avisos.append("Malla abierta (volumen aproximado)")
+    # Se permite girar la pieza: se comparan las medidas ordenadas
+    if any(m > c for m, c in zip(sorted(analisis["medidas_mm"]), sorted(cama))):
+        avisos.append("No entra en la cama")
+    if min(analisis["medidas_mm"]) < 0.8:
+        avisos.append("Muy delgada (< 0.8 mm)")
+    cuerpos = malla.body_count
+    if cuerpos > 1:
+        avisos.append(f"{cuerpos} cuerpos separados")
+    return avisos
+
+
+def analizar_parte(nombre, datos):
+    """Mide una pieza y revisa si se puede imprimir (para el pool de procesos)"""
+    malla = cargar(datos, nombre)
+    analisis = analizar(malla)
+    analisis["medidas_mm"] = list(analisis["medidas_mm"])
+    analisis["nombre"] = nombre
+    analisis["avisos"] = controles(malla, analisis)
+    return analisis
+
+
+def analizar_en_paralelo(pool, archivos):
+    """
+    Analiza todas las piezas en un pool de procesos y va devolviendo (generador)
+    cada resultado apenas termina. archivos: [(nombre, bytes)] ya sin ZIP.
+    Las bandejas 3MF se dividen primero (también en el pool) y cada objeto
+    se analiza por separado, así se reparten entre todos los núcleos.
+    """
+    pendientes = {}
+    for nombre, datos in archivos:
+        if nombre.lower().endswith(".3mf"):
+            pendientes[pool.submit(dividir, nombre, datos)] = ("dividir", nombre)
+        else:
+            pendientes[pool.submit(analizar_parte, nombre, datos)] = ("analizar", nombre)
+
+    while pendientes:
+        listos, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+        for futuro in listos:
+            etapa, nombre = pendientes.pop(futuro)
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                yield {"nombre": nombre, "error": str(e)}
+                continue
+            if etapa == "dividir":
+                for nombre_parte, datos in resultado:
+                    pendientes[pool.submit(analizar_parte, nombre_parte, datos)] = ("analizar", nombre_parte)
+            else:
+                yield resultado
@@ -0,0 +1,298 @@
+import re
+import bisect
+import copy
+
+# Densidad del filamento en g/cm³ (para pasar volumen o metros de filamento a gramos)
+DENSIDADES = {
+    "PLA": 1.24,
+    "PETG": 1.27,
+    "ABS": 1.04,
+    "ASA": 1.07,
+    "TPU": 1.21,
+    "NYLON": 1.14,
+    "PC": 1.20,
+    "RESINA": 1.15,
+}
+DENSIDAD_DEFECTO = DENSIDADES["PLA"]
+
+# Cada material como palabra suelta (los más largos primero): "PC" no es parte de "PCTG",
+# "PLA" no es parte de "PLATA" ni de "PLATEADO", pero sí de "PLA+" o "Grilon3 PETG-CF"
+PATRON_MATERIAL = re.compile(
+    "|".join(rf"(?<![A-Z]){nombre}(?![A-Z])" for nombre in sorted(DENSIDADES, key=len, reverse=True))
+)
+
+
+def nombre_material(material):
+    """
+    'Grilon3 PETG - Plata' -> 'PETG' (una clave de DENSIDADES), o None si no se reconoce.
+    Solo se mira lo que va antes de " - ": lo de después es el color.
+    """
+    texto = str(material or "").upper().split(" - ")[0]
+    encontrado = PATRON_MATERIAL.search(texto)
+    return encontrado.group(0) if encontrado else None
+
+
+def densidad(material):
+    """Densidad para un texto de material ("PLA", "PETG Silk", ...); PLA si no se reconoce"""
+    return DENSIDADES.get(nombre_material(material), DENSIDAD_DEFECTO)
+
+
+def numero(valor, defecto=0.0):
+    """Convierte lo que venga de la hoja ("1.500", "1500,5", 1500, "") a float"""
+    if valor is None or valor == "":
+        return defecto
+    try:
+        return float(str(valor).replace(',', '.'))
+    except ValueError:
+        return defecto
+
+
+def parsear_tiempo(valor):
+    """Horas (float) a partir de los formatos habituales de los slicers y de la gente"""
+    if valor is None or valor == "":
+        return 0.0
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    t = str(valor).strip().lower()
+    if ":" in t:
+        h, _, m = t.partition(":")
+        return numero(h) + numero(m) / 60
+    h = re.search(r"([\d.,]+)\s*h", t)
+    m = re.search(r"([\d.,]+)\s*m", t)
+    if h or m:
+        return (numero(h.group(1)) if h else 0.0) + (numero(m.group(1)) / 60 if m else 0.0)
+    return numero(t)
+
+
+def texto(registro, clave):
+    """Lee un campo aceptando el encabezado con o sin mayúscula ("Marca" / "marca")"""
+    valor = registro.get(clave)
+    if valor is None or valor == "":
+        valor = registro.get(clave.lower())
+    return str(valor).strip() if valor is not None else ""
+
+
+class Rollo:
+    """
+    Un rollo del inventario, ya normalizado.
+    Se arma una sola vez al descargar el inventario; las pestañas leen
+    los campos directamente sin volver a parsear textos.
+    """
+    __slots__ = (
+        "id", "fecha", "marca", "tipo", "color", "acabado",
+        "peso_inicial", "peso_actual", "precio_rollo",
+        # Calculados
+        "precio_kg", "porcentaje", "estado"
+    )
+
+    def __init__(self, id, fecha="", marca="", tipo="", color="", acabado="",
+                 peso_inicial=1000.0, peso_actual=None, precio_rollo=0.0):
+        self.id = id
+        self.fecha = fecha
+        self.marca = marca
+        self.tipo = tipo
+        self.color = color
+        self.acabado = acabado
+        self.peso_inicial = peso_inicial
+        self.precio_rollo = precio_rollo
+
+        if peso_inicial > 0:
+            self.precio_kg = (precio_rollo / peso_inicial) * 1000
+        else:
+            self.precio_kg = 0
+
+        # Si no existe el peso actual, asumimos lleno
+        self.fijar_peso(peso_inicial if peso_actual is None else peso_actual)
+
+    @classmethod
+    def desde_registro(cls, registro):
+        """Crea el Rollo a partir de un registro de la hoja (dict de get_all_records)"""
+        peso_inicial = numero(registro.get("Peso_Inicial"), 1000.0)
+        return cls(
+            id=registro.get("ID"),
+            fecha=texto(registro, "Fecha"),
+            marca=texto(registro, "Marca"),
+            tipo=texto(registro, "Tipo"),
+            color=texto(registro, "Color"),
+            acabado=texto(registro, "Acabado"),
+            peso_inicial=peso_inicial,
+            peso_actual=numero(registro.get("Peso_Actual"), peso_inicial),
+            precio_rollo=numero(registro.get("Precio_Rollo"), 0.0),
+        )
+
+    def fijar_peso(self, peso_actual):
+        """Cambia el peso restante y recalcula porcentaje y estado"""
+        self.peso_actual = peso_actual
+
+        # Lógica de Estado (Semáforo)
+        self.porcentaje = (peso_actual / self.peso_inicial * 100) if self.peso_inicial > 0 else 0
+        self.estado = "🟢 Lleno"
+        if self.porcentaje < 50: self.estado = "🟡 Medio"
+        if self.porcentaje < 20: self.estado = "🔴 Poco"
+        if peso_actual <= 0: self.estado = "⚫ Vacío"
+
+    def como_registro(self):
+        """Vuelve al formato de la hoja (para tablas / DataFrames)"""
+        return {
+            "ID": self.id, "Fecha": self.fecha, "Marca": self.marca, "Tipo": self.tipo,
+            "Color": self.color, "Acabado": self.acabado, "Peso_Inicial": self.peso_inicial,
+            "Peso_Actual": self.peso_actual, "Precio_Rollo": self.precio_rollo
+        }
+
+    def __repr__(self):
+        return f"Rollo({self.id}, {self.marca} {self.tipo} {self.color}, {int(self.peso_actual)}g)"
+
+
+class IndiceInventario:
+    """
+    Índices en memoria sobre el inventario para no recorrer la lista entera:
+    por ID, por material (tipo), marca y color, y una lista ordenada por peso restante.
+    Una vez armado no se modifica (lo leen varias sesiones a la vez, sin candado):
+    en altas, descuentos y sincronizaciones el backend arma uno nuevo con con_rollo /
+    con_pesos y reemplaza la referencia de una sola vez.
+    """
+    CAMPOS = ("tipo", "marca", "color")
+
+    def __init__(self, rollos=()):
+        self.reconstruir(rollos)
+
+    def reconstruir(self, rollos):
+        self.rollos = list(rollos)  # El inventario, en el orden de la hoja
+        self.posiciones = {}  # id -> lugar en self.rollos
+        self.por_id = {}
+        # campo -> clave normalizada -> {id: Rollo} (dict para conservar el orden del inventario)
+        self.por_campo = {campo: {} for campo in self.CAMPOS}
+        # clave normalizada -> texto original (para mostrar en los filtros)
+        self.etiquetas = {campo: {} for campo in self.CAMPOS}
+        self.por_peso = []  # [(peso_actual, id), ...] siempre ordenada
+        # Grupos de por_campo que son de este índice (los demás se comparten con el original)
+        self.propios = set()
+        for i, rollo in enumerate(self.rollos):
+            self.posiciones[str(rollo.id)] = i
+            self.agregar(rollo)
+
+    @staticmethod
+    def clave(valor):
+        return str(valor).strip().lower()
+
+    def grupo(self, campo, k):
+        """El grupo (campo, k) listo para modificar: si se comparte con otro índice se copia antes"""
+        grupos = self.por_campo[campo]
+        if (campo, k) not in self.propios:
+            grupos[k] = dict(grupos.get(k, {}))
+            self.propios.add((campo, k))
+        return grupos[k]
+
+    def agregar(self, rollo):
+        id_rollo = str(rollo.id)
+        anterior = self.por_id.get(id_rollo)
+        if anterior is not None:
+            # Reemplazo: se mantiene su lugar en el orden del inventario
+            self.quitar_de_grupos(anterior, reemplazo=rollo)
+        self.por_id[id_rollo] = rollo
+        for campo in self.CAMPOS:
+            valor = getattr(rollo, campo)
+            k = self.clave(valor)
+            grupo = self.grupo(campo, k)
+            ultimo = None if id_rollo in grupo else next(reversed(grupo), None)
+            grupo[id_rollo] = rollo
+            if ultimo is not None and self.posiciones[ultimo] > self.posiciones[id_rollo]:
+                # Cambió de grupo (ej: se editó el color): se reordena para seguir el inventario
+                self.por_campo[campo][k] = dict(sorted(grupo.items(), key=lambda e: self.posiciones[e[0]]))
+            self.etiquetas[campo].setdefault(k, valor)
+        bisect.insort(self.por_peso, (rollo.peso_actual, id_rollo))
+
+    def quitar_de_grupos(self, rollo, reemplazo=None):
+        id_rollo = str(rollo.id)
+        for campo in self.CAMPOS:
+            k = self.clave(getattr(rollo, campo))
+            if reemplazo is not None and self.clave(getattr(reemplazo, campo)) == k:
+                continue  # Sigue en el mismo grupo, no se mueve
+            grupo = self.grupo(campo, k)
+            grupo.pop(id_rollo, None)
+            if not grupo:
+                self.por_campo[campo].pop(k, None)
+                self.etiquetas[campo].pop(k, None)
+                self.propios.discard((campo, k))
+        self.sacar_de_por_peso(rollo.peso_actual, id_rollo)
+
+    def sacar_de_por_peso(self, peso, id_rollo):
+        i = bisect.bisect_left(self.por_peso, (peso, id_rollo))
+        if i < len(self.por_peso) and self.por_peso[i] == (peso, id_rollo):
+            del self.por_peso[i]
+
+    # --- COPIAS (el índice publicado no se toca) ---
+    def copia(self):
+        """
+        Copia para modificar: las listas y los dicts de primer nivel son nuevos, pero los
+        grupos de por_campo y los Rollo se comparten hasta que se tocan (ver grupo()).
+        Así un alta o un descuento no vuelven a normalizar ni a ordenar todo el inventario.
+        """
+        nuevo = copy.copy(self)
+        nuevo.rollos = list(self.rollos)
+        nuevo.posiciones = dict(self.posiciones)
+        nuevo.por_id = dict(self.por_id)
+        nuevo.por_campo = {campo: dict(grupos) for campo, grupos in self.por_campo.items()}
+        nuevo.etiquetas = {campo: dict(v) for campo, v in self.etiquetas.items()}
+        nuevo.por_peso = list(self.por_peso)
+        nuevo.propios = set()
+        return nuevo
+
+    def poner(self, rollo):
+        """Pone 'rollo' en lugar del de su mismo ID, o al final si no estaba (solo en una copia)"""
+        id_rollo = str(rollo.id)
+        if id_rollo in self.posiciones:
+            self.rollos[self.posiciones[id_rollo]] = rollo
+        else:
+            self.posiciones[id_rollo] = len(self.rollos)
+            self.rollos.append(rollo)
+        self.agregar(rollo)
+
+    def con_rollo(self, rollo):
+        """Índice nuevo con 'rollo' en lugar del de su mismo ID (o agregado al final si no estaba)"""
+        nuevo = self.copia()
+        nuevo.poner(rollo)
+        return nuevo
+
+    def con_pesos(self, pesos):
+        """Índice nuevo con el Peso_Actual cambiado ({id_rollo: peso}); los Rollo originales no cambian"""
+        nuevo = self.copia()
+        for id_rollo, peso in pesos.items():
+            anterior = nuevo.por_id.get(str(id_rollo))
+            if anterior is None:
+                continue
+            rollo = copy.copy(anterior)
+            rollo.fijar_peso(peso)
+            nuevo.poner(rollo)
+        return nuevo
+
+    # --- CONSULTAS ---
+    def buscar(self, id_rollo):
+        return self.por_id.get(str(id_rollo))
+
+    def valores(self, campo):
+        """Valores distintos de un campo (ej: todos los materiales), para armar filtros"""
+        return sorted(v for v in self.etiquetas[campo].values() if v)
+
+    def con_peso_minimo(self, gramos):
+        """IDs con al menos 'gramos' restantes (búsqueda binaria sobre la lista ordenada)"""
+        i = bisect.bisect_left(self.por_peso, (gramos, ""))
+        return {id_rollo for _, id_rollo in self.por_peso[i:]}
+
+    def filtrar(self, tipo=None, marca=None, color=None, peso_minimo=None):
+        """
+        Rollos que cumplen todos los filtros dados (None = sin filtro).
+        Se parte del grupo más chico y se verifica contra los demás.
+        """
+        grupos = []
+        for campo, valor in (("tipo", tipo), ("marca", marca), ("color", color)):
+            if valor:
+                grupos.append(self.por_campo[campo].get(self.clave(valor), {}))
+
+        # La base tiene que ser un grupo ordenado para respetar el orden del inventario
+        base = min(grupos, key=len) if grupos else self.por_id
+        if peso_minimo is not None:
+            grupos.append(self.con_peso_minimo(peso_minimo))
+
+        return [rollo for id_rollo, rollo in base.items()
+                if all(id_rollo in g for g in grupos if g is not base)]
@@ -0,0 +1,170 @@
+import time
+import heapq
+import random
+import itertools
+import threading
+from contextlib import contextmanager
+
+import requests
+
+# Errores de Google que vale la pena reintentar (cuota excedida o falla del servidor)
+CODIGOS_REINTENTABLES = (429, 500, 502, 503, 504)
+
+
+def codigo_error(e):
+    """Código HTTP de un error de gspread (APIError trae la respuesta), o None"""
+    respuesta = getattr(e, "response", None)
+    return getattr(respuesta, "status_code", None)
+
+
+def es_reintentable(e, idempotente=True):
+    """
+    Un 429 es seguro de repetir siempre (Google rechazó el pedido sin ejecutarlo).
+    Un corte, timeout o 5xx no dice si el pedido llegó a aplicarse: solo se repiten
+    las llamadas idempotentes. Un append o un borrado repetido duplicaría o borraría de más.
+    """
+    if codigo_error(e) == 429:
+        return True
+    if not idempotente:
+        return False
+    if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    return codigo_error(e) in CODIGOS_REINTENTABLES
+
+
+class Llamada:
+    """Una lectura en curso; las que piden lo mismo esperan este resultado"""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class PlanificadorSheets:
+    """
+    Todas las llamadas a Google Sheets pasan por acá.
+    - Limitador 'token bucket' ajustado a la cuota de la API (por defecto 60 pedidos/minuto).
+    - Lecturas iguales en curso se juntan: diez sesiones refrescando el inventario
+      comparten una sola descarga.
+    - Reintentos con espera exponencial y jitter ante 429 / 5xx / cortes de red
+      (las escrituras no idempotentes, como append_rows, solo ante 429).
+    - Prioridad: escrituras primero, después lecturas, y al final las recargas de fondo.
+    """
+    ESCRITURA, LECTURA, FONDO = 0, 1, 2
+
+    # Uno solo por proceso: la cuota es por cuenta de servicio, no por sesión
+    _compartido = None
+    _lock_compartido = threading.Lock()
+
+    @classmethod
+    def compartido(cls):
+        with cls._lock_compartido:
+            if cls._compartido is None:
+                cls._compartido = cls()
+            return cls._compartido
+
+    def __init__(self, por_minuto=60, rafaga=10, max_intentos=5, espera_base=1.0, espera_maxima=64):
+        self.tasa = por_minuto / 60.0   # fichas por segundo
+        self.capacidad = rafaga         # cuántas llamadas seguidas se permiten de golpe
+        self.max_intentos = max_intentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+
+        self.fichas = float(rafaga)
+        self.ultima_recarga = time.monotonic()
+        self.cond = threading.Condition()
+        self.fila = []                  # heap de (prioridad, turno) esperando ficha
+        self.turnos = itertools.count()
+        self.en_curso = {}              # clave -> Llamada
+        self.local = threading.local()
+
+    @contextmanager
+    def de_fondo(self):
+        """Las llamadas hechas dentro de este bloque (en este hilo) van con prioridad baja"""
+        anterior = getattr(self.local, "fondo", False)
+        self.local.fondo = True
+        try:
+            yield
+        finally:
+            self.local.fondo = anterior
+
+    # --- TOKEN BUCKET ---
+    def recargar_fichas(self):
+        ahora = time.monotonic()
+        self.fichas = min(self.capacidad, self.fichas + (ahora - self.ultima_recarga) * self.tasa)
+        self.ultima_recarga = ahora
+
+    def tomar_ficha(self, prioridad):
+        """Espera su turno (por prioridad y orden de llegada) y una ficha disponible"""
+        with self.cond:
+            turno = (prioridad, next(self.turnos))
+            heapq.heappush(self.fila, turno)
+            while True:
+                self.recargar_fichas()
+                primero = self.fila[0] == turno
+                if primero and self.fichas >= 1:
+                    heapq.heappop(self.fila)
+                    self.fichas -= 1
+                    self.cond.notify_all()
+                    return
+                if primero:
+                    self.cond.wait((1 - self.fichas) / self.tasa)
+                else:
+                    self.cond.wait()
+
+    # --- EJECUCIÓN ---
+    def ejecutar(self, funcion, *args, clave=None, escritura=False, idempotente=True, **kwargs):
+        """
+        Ejecuta una llamada remota respetando cuota, prioridad y reintentos.
+        Si es una lectura con 'clave' y ya hay otra igual en curso, se espera esa.
+        El resultado compartido no se debe modificar.
+        idempotente=False (agregar o borrar filas): ante un corte no se reintenta a ciegas,
+        el error sube y quien llama verifica si la escritura se aplicó.
+        """
+        if escritura or clave is None:
+            return self.con_reintentos(funcion, args, kwargs, escritura, idempotente)
+
+        with self.cond:
+            llamada = self.en_curso.get(clave)
+            propia = llamada is None
+            if propia:
+                llamada = self.en_curso[clave] = Llamada()
+
+        if not propia:
+            llamada.evento.wait()
+            if llamada.error is not None:
+                raise llamada.error
+            return llamada.resultado
+
+        try:
+            llamada.resultado = self.con_reintentos(funcion, args, kwargs, escritura)
+            return llamada.resultado
+        except Exception as e:
+            llamada.error = e
+            raise
+        finally:
+            with self.cond:
+                self.en_curso.pop(clave, None)
+            llamada.evento.set()
+
+    def con_reintentos(self, funcion, args, kwargs, escritura, idempotente=True):
+        if escritura:
+            prioridad = self.ESCRITURA
+        elif getattr(self.local, "fondo", False):
+            prioridad = self.FONDO
+        else:
+            prioridad = self.LECTURA
+
+        for intento in range(self.max_intentos):
+            self.tomar_ficha(prioridad)
+            try:
+                return funcion(*args, **kwargs)
+            except Exception as e:
+                if not es_reintentable(e, idempotente) or intento == self.max_intentos - 1:
+                    raise
+                # Espera exponencial con jitter: mitad fija + mitad al azar
+                tope = min(self.espera_maxima, self.espera_base * 2 ** intento)
+                espera = tope / 2 + random.uniform(0, tope / 2)
+                print(f"⏳ Google respondió {codigo_error(e) or e}. Reintento en {espera:.1f}s")
+                time.sleep(espera)